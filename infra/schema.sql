@@ -6,12 +6,17 @@ CREATE TABLE IF NOT EXISTS players (
     birth_date DATE,
     nationality TEXT,
     position TEXT,
-    current_club TEXT
+    current_club TEXT,
     current_competition TEXT,
-    current_pays_de_competition TEXT;
-
+    current_pays_de_competition TEXT
 );
 
+-- Un joueur par page profil Transfermarkt (clé des upserts groupés du scraper) ;
+-- deux homonymes ont deux profils, donc deux lignes
+ALTER TABLE players ADD COLUMN IF NOT EXISTS profile_url TEXT;
+DROP INDEX IF EXISTS players_name_key;
+CREATE UNIQUE INDEX IF NOT EXISTS players_profile_url_key ON players (profile_url);
+
 -- Exemple table pour matchs
 CREATE TABLE IF NOT EXISTS matches (
     match_id SERIAL PRIMARY KEY,
@@ -28,7 +33,83 @@ CREATE TABLE IF NOT EXISTS performances (
     perf_id SERIAL PRIMARY KEY,
     player_id INT REFERENCES players(player_id),
     match_id INT REFERENCES matches(match_id),
+    saison TEXT,                   -- lignes agrégées : career | 2025/2026
     minutes_played INT,
     goals INT,
     assists INT
 );
+
+-- Bases créées avant la colonne saison
+ALTER TABLE performances ADD COLUMN IF NOT EXISTS saison TEXT;
+
+-- Une seule ligne agrégée (match_id NULL) par joueur et par saison
+CREATE UNIQUE INDEX IF NOT EXISTS performances_saison_key
+    ON performances (player_id, saison) WHERE match_id IS NULL;
+
+-- Détail des stats par saison, compétition et club (lignes des tableaux leistungsdatendetails)
+CREATE TABLE IF NOT EXISTS performances_competition (
+    player_id INT NOT NULL REFERENCES players(player_id),
+    saison TEXT NOT NULL,          -- 2024/2025, ou 2024 pour les compétitions sur une année
+    competition TEXT NOT NULL,
+    club TEXT NOT NULL DEFAULT '',
+    matches_played INT,
+    goals INT,
+    assists INT,
+    minutes_played INT,            -- minutes réelles
+    PRIMARY KEY (player_id, saison, competition, club)
+);
+
+-- Points de reprise du scraping (créée aussi par scripts/checkpoint.py)
+CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+    job TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL,          -- done | skipped_nationality | failed
+    reason TEXT,
+    attempts INT NOT NULL DEFAULT 1,
+    run_id TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (job, url)
+);
+
+CREATE TABLE IF NOT EXISTS scrape_freshness (
+    url TEXT NOT NULL,
+    part TEXT NOT NULL,            -- profile | stats:<portée>
+    fetched_at TIMESTAMPTZ NOT NULL,
+    content_hash TEXT NOT NULL,
+    data JSONB,
+    PRIMARY KEY (url, part)
+);
+
+-- Détection des changements pour le nettoyage incrémental (créés aussi par scripts/data_cleaning.py)
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = clock_timestamp();
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE players ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp();
+ALTER TABLE matches ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp();
+ALTER TABLE performances ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp();
+CREATE INDEX IF NOT EXISTS players_updated_at_idx ON players (updated_at);
+CREATE INDEX IF NOT EXISTS matches_updated_at_idx ON matches (updated_at);
+CREATE INDEX IF NOT EXISTS performances_updated_at_idx ON performances (updated_at);
+CREATE INDEX IF NOT EXISTS performances_player_idx ON performances (player_id);
+
+DROP TRIGGER IF EXISTS players_touch ON players;
+CREATE TRIGGER players_touch BEFORE UPDATE ON players
+    FOR EACH ROW WHEN (OLD IS DISTINCT FROM NEW) EXECUTE FUNCTION touch_updated_at();
+DROP TRIGGER IF EXISTS matches_touch ON matches;
+CREATE TRIGGER matches_touch BEFORE UPDATE ON matches
+    FOR EACH ROW WHEN (OLD IS DISTINCT FROM NEW) EXECUTE FUNCTION touch_updated_at();
+DROP TRIGGER IF EXISTS performances_touch ON performances;
+CREATE TRIGGER performances_touch BEFORE UPDATE ON performances
+    FOR EACH ROW WHEN (OLD IS DISTINCT FROM NEW) EXECUTE FUNCTION touch_updated_at();
+
+-- Watermark (updated_at) du dernier nettoyage réussi de chaque table source
+CREATE TABLE IF NOT EXISTS clean_watermarks (
+    source TEXT PRIMARY KEY,
+    watermark TIMESTAMPTZ NOT NULL,
+    rows INT,
+    cleaned_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
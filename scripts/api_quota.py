@@ -0,0 +1,264 @@
+import heapq
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from rate_limit import parse_retry_after
+
+# ===============================================================
+#  Quotas RapidAPI : planification de l'ingestion API-Football
+# ===============================================================
+# Le plan limite les requêtes par minute et par jour. QuotaScheduler ne
+# laisse partir une requête que s'il reste une place dans la fenêtre
+# glissante d'une minute et dans le quota du jour, recalé sur les en-têtes
+# x-ratelimit-* de chaque réponse. Un 429 suspend tous les threads jusqu'à la
+# fin de la fenêtre, au lieu de laisser chacun retomber sur un 429.
+# IngestionPlan ordonne les pages (saison en cours d'abord) et se sauvegarde
+# dans data/raw/api_football_plan.json : le lendemain, le run reprend là où le
+# quota du jour l'a arrêté.
+
+PLAN_PATH = Path("data/raw/api_football_plan.json")
+
+# Plan gratuit API-Football : 10 requêtes/minute, 100 par jour
+DEFAULT_PER_MINUTE = 10
+DEFAULT_PER_DAY = 100
+WINDOW = 61.0          # secondes ; une de plus que la minute de l'API (latence réseau)
+MAX_ATTEMPTS = 3
+
+# En-têtes RapidAPI : fenêtre d'une minute et quota du jour (remis à zéro à minuit UTC)
+MINUTE_LIMIT = "X-RateLimit-Limit"
+MINUTE_REMAINING = "X-RateLimit-Remaining"
+DAY_LIMIT = "X-RateLimit-Requests-Limit"
+DAY_REMAINING = "X-RateLimit-Requests-Remaining"
+
+
+class QuotaExhausted(Exception):
+    """Quota du jour atteint : reprendre après minuit UTC"""
+
+
+def today():
+    return datetime.now(timezone.utc).date().isoformat()
+
+def next_reset():
+    """Prochaine remise à zéro du quota du jour (minuit UTC)"""
+    now = datetime.now(timezone.utc)
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+
+def current_season(now=None):
+    """Saison API-Football en cours (année de début) : de juillet à juin"""
+    now = now or datetime.now()
+    return now.year if now.month >= 7 else now.year - 1
+
+def header_int(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class QuotaScheduler:
+    """Fenêtre glissante d'une minute + quota du jour, partagés par les threads d'ingestion"""
+
+    def __init__(self, per_minute=DEFAULT_PER_MINUTE, per_day=DEFAULT_PER_DAY, used_today=0, reserve=0):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.used = used_today
+        self.reserve = reserve          # requêtes du jour laissées aux autres usages de la clé
+        self.day_remaining = per_day - used_today
+        self.day = today()
+        self.sent = deque()             # instants (monotonic) des requêtes de la dernière fenêtre
+        self.hold_until = 0.0
+        self.throttles = 0
+        self.waited = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Attend une place dans la fenêtre d'une minute ; QuotaExhausted si le jour est épuisé"""
+        with self.condition:
+            while True:
+                if self.day != today():
+                    # Minuit UTC passé pendant le run : nouveau quota
+                    self.day, self.used, self.day_remaining = today(), 0, self.per_day
+                if self.day_remaining <= self.reserve:
+                    raise QuotaExhausted(f"quota du jour atteint ({self.used} requêtes)")
+                now = time.monotonic()
+                while self.sent and now - self.sent[0] >= WINDOW:
+                    self.sent.popleft()
+                wait = self.hold_until - now
+                if wait <= 0 and len(self.sent) >= self.per_minute:
+                    wait = WINDOW - (now - self.sent[0])
+                if wait <= 0:
+                    break
+                self.condition.wait(wait)
+                self.waited += time.monotonic() - now
+            self.sent.append(now)
+            self.used += 1
+            self.day_remaining -= 1
+
+    def observe(self, headers, status):
+        """Recale les quotas sur les en-têtes de la réponse ; un 429 suspend tout le monde"""
+        minute_limit = header_int(headers, MINUTE_LIMIT)
+        minute_remaining = header_int(headers, MINUTE_REMAINING)
+        day_limit = header_int(headers, DAY_LIMIT)
+        day_remaining = header_int(headers, DAY_REMAINING)
+        with self.condition:
+            now = time.monotonic()
+            if minute_limit:
+                self.per_minute = minute_limit
+            if day_limit:
+                self.per_day = day_limit
+            if day_limit or day_remaining is not None:
+                # Les requêtes en vol sont déjà décomptées dans `used` : garder la valeur la plus prudente
+                left = self.per_day - self.used
+                self.day_remaining = left if day_remaining is None else min(left, day_remaining)
+            if status == 429:
+                self.throttles += 1
+                hold = parse_retry_after(headers.get("Retry-After"))
+                self.hold_until = max(self.hold_until, now + (WINDOW if hold is None else hold))
+            elif minute_remaining == 0:
+                # Fenêtre pleine côté API (autre client sur la même clé ?) : attendre qu'elle se vide
+                start = self.sent[0] if self.sent else now
+                self.hold_until = max(self.hold_until, start + WINDOW)
+            self.condition.notify_all()
+
+    def summary(self):
+        return (f"🎫 Quota: {self.used} requêtes aujourd'hui sur {self.per_day} | {self.per_minute}/min | "
+                f"{self.throttles} × 429 | {self.waited:.1f}s d'attente de fenêtre (tous threads)")
+
+
+class IngestionPlan:
+    """Pages restantes de chaque (ligue, saison), par priorité, sauvegardées d'un run à l'autre"""
+
+    def __init__(self, leagues, seasons, path=PLAN_PATH, current=None, max_attempts=MAX_ATTEMPTS):
+        self.leagues = list(leagues)
+        self.seasons = list(seasons)
+        self.path = Path(path) if path else None
+        self.current = current_season() if current is None else current
+        self.max_attempts = max_attempts
+        self.totals = {}      # "ligue:saison" → paging.total
+        self.done = {}        # "ligue:saison" → pages téléchargées
+        self.attempts = {}    # "ligue:saison:page" → échecs
+        self.usage = {"day": today(), "requests": 0}   # requêtes déjà faites aujourd'hui (runs précédents)
+        self.heap = []
+        self.lock = threading.Lock()
+        self.load()
+        for league_id in self.leagues:
+            for season in self.seasons:
+                self.schedule(league_id, season)
+
+    def load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️  {self.path} illisible, plan reparti de zéro")
+            return
+        self.totals = saved.get("totals", {})
+        self.done = {key: set(pages) for key, pages in saved.get("done", {}).items()}
+        self.attempts = saved.get("attempts", {})
+        if saved.get("usage", {}).get("day") == today():
+            self.usage = saved["usage"]
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            state = {
+                "saved_at": datetime.now().isoformat(timespec="seconds"),
+                "current_season": self.current,
+                "totals": self.totals,
+                "done": {key: sorted(pages) for key, pages in self.done.items()},
+                "attempts": self.attempts,
+                "usage": self.usage,
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def priority(self, league_id, season, page):
+        """Saison en cours d'abord, puis de la plus récente à la plus ancienne"""
+        return (season != self.current, -season, self.leagues.index(league_id), page)
+
+    def push(self, league_id, season, page):
+        heapq.heappush(self.heap, (self.priority(league_id, season, page), (league_id, season, page)))
+
+    def schedule(self, league_id, season):
+        """Met en file les pages pas encore téléchargées (page 1 seule si le total est inconnu)"""
+        key = f"{league_id}:{season}"
+        total = self.totals.get(key)
+        done = self.done.get(key, set())
+        for page in range(1, (total or 1) + 1):
+            if page not in done and self.attempts.get(f"{key}:{page}", 0) < self.max_attempts:
+                self.push(league_id, season, page)
+
+    def reset(self):
+        """Tout re-télécharger (--force) : les totaux connus sont gardés"""
+        with self.lock:
+            self.done = {}
+            self.attempts = {}
+            self.heap = []
+        for league_id in self.leagues:
+            for season in self.seasons:
+                self.schedule(league_id, season)
+
+    def next_task(self):
+        with self.lock:
+            return heapq.heappop(self.heap)[1] if self.heap else None
+
+    def release(self, task):
+        """Tâche non partie (quota du jour atteint) : reste à faire"""
+        with self.lock:
+            self.push(*task)
+
+    def complete(self, task, total=None):
+        league_id, season, page = task
+        key = f"{league_id}:{season}"
+        with self.lock:
+            self.done.setdefault(key, set()).add(page)
+            if total is not None and self.totals.get(key) != total:
+                known = self.totals.get(key) or 1
+                self.totals[key] = total
+                for next_page in range(known + 1, total + 1):
+                    if next_page not in self.done[key]:
+                        self.push(league_id, season, next_page)
+
+    def fail(self, task):
+        """Échec compté (get_page a déjà réessayé) : la page repasse au prochain run tant qu'il reste des tentatives"""
+        key = "{}:{}:{}".format(*task)
+        with self.lock:
+            self.attempts[key] = self.attempts.get(key, 0) + 1
+
+    def remaining(self):
+        """(pages restantes connues, couples ligue/saison dont le total est encore inconnu)"""
+        pending = 0
+        unknown = 0
+        for league_id in self.leagues:
+            for season in self.seasons:
+                key = f"{league_id}:{season}"
+                if key not in self.totals:
+                    unknown += 1
+                else:
+                    pending += self.totals[key] - len(self.done.get(key, ()))
+        return pending, unknown
+
+    def estimate(self, per_minute, per_day, used_today=0):
+        """Une ligne : pages restantes, minutes et jours de quota nécessaires"""
+        pending, unknown = self.remaining()
+        known = [self.totals[f"{l}:{s}"] for l in self.leagues for s in self.seasons if f"{l}:{s}" in self.totals]
+        guess = pending + unknown * (round(sum(known) / len(known)) if known else 1)
+        today_left = max(0, per_day - used_today)
+        text = f"🗓️  Plan: ~{guess} requêtes restantes"
+        if unknown:
+            text += f" ({unknown} ligue/saison au total encore inconnu)"
+        text += f" | ~{guess / per_minute:.0f} min à {per_minute}/min"
+        if guess <= today_left:
+            return text + " | dans le quota du jour"
+        return text + f" | {-(-(guess - today_left) // per_day)} jour(s) de quota en plus"
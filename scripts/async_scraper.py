@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+from checkpoint import DONE, FAILED, SKIPPED, CheckpointStore
+from club_lookup import ClubLookup
+from freshness import PROFILE, FreshnessStore, stats_part
+from http_cache import CachedSession
+from rate_limit import DEFAULT_BURST, MAX_RATE, AdaptiveRateLimiter, RateLimitedSession
+from telemetry import InstrumentedSession, metrics
+from db_writer import CAREER, DEFAULT_BATCH_SIZE, PlayerBuffer
+from scraper_players import (
+    DEFAULT_RATE, add_run_arguments, fetch_player, get_connection, no_delay, run_options, season_label,
+)
+
+# ===============================================================
+#  Scraping concurrent : N joueurs en vol, débit fixé par hôte
+# ===============================================================
+# Les fonctions de scraper_players sont réutilisées telles quelles (mêmes
+# enregistrements) ; la cadence vient d'un seau à jetons adaptatif partagé
+# par hôte, qui impose la politesse envers Transfermarkt.
+
+PLAYERS_CSV = "data/raw/senegal_players_list.csv"
+DEFAULT_CONCURRENCY = 4
+
+
+class SessionPool:
+    """Une requests.Session par thread worker, toutes derrière le même limiteur et le cache disque"""
+
+    def __init__(self, limiter, offline=False):
+        self.limiter = limiter
+        self.offline = offline
+        self.local = threading.local()
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            # Le cache est devant le limiteur : une page en cache ne consomme pas de jeton
+            session = CachedSession(
+                RateLimitedSession(InstrumentedSession(requests.Session(), metrics), self.limiter),
+                offline=self.offline,
+            )
+            self.local.session = session
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    @property
+    def pages(self):
+        return sum(s.hits + s.revalidated + s.misses for s in self.sessions)
+
+    @property
+    def network_pages(self):
+        return sum(s.session.pages for s in self.sessions)
+
+    @property
+    def waited(self):
+        """Temps cumulé d'attente de jetons (tous threads confondus)"""
+        return sum(s.session.waited for s in self.sessions)
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
+
+
+def record_outcome(buffer, url, status, info, stats, reason):
+    """Statut de reprise d'une URL (et joueur ajouté au tampon) ; peut écrire en base"""
+    checkpoints = buffer.checkpoints
+    if status == "success":
+        checkpoints.record(url, DONE, batched=True)
+        buffer.add(info, stats, url)
+    elif status == "unchanged":
+        checkpoints.record(url, DONE)
+    elif status == "skipped":
+        checkpoints.record(url, SKIPPED)
+    else:
+        checkpoints.record(url, FAILED, reason)
+
+
+async def scrape_one(url, pool, clubs, buffer, semaphore, db_lock, counts, scopes, force):
+    async with semaphore:
+        reason = "infos manquantes"
+        try:
+            status, info, stats = await asyncio.to_thread(
+                lambda: fetch_player(url, pool.get(), buffer.freshness, scopes, pause=no_delay,
+                                     retry=1 if pool.offline else 3, clubs=clubs, force=force)
+            )
+        except Exception as e:
+            print(f"   ❌ Erreur: {type(e).__name__}")
+            status, info, stats, reason = "error", None, None, type(e).__name__
+        # Un seul tampon (et une seule connexion) : statuts et écritures sérialisés, échecs compris
+        async with db_lock:
+            try:
+                await asyncio.to_thread(record_outcome, buffer, url, status, info, stats, reason)
+            except Exception as e:
+                # Lot déjà marqué en échec par PlayerBuffer
+                print(f"   ❌ Erreur DB: {type(e).__name__}")
+                status = "error"
+        counts[status] += 1
+
+
+async def scrape_urls(urls, buffer, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, burst=DEFAULT_BURST, replay=False,
+                      scopes=(CAREER,), force=True, max_rate=MAX_RATE):
+    """Scrape une liste d'URLs avec au plus `concurrency` joueurs en vol"""
+    limiter = AdaptiveRateLimiter(rate, burst, max_rate=max_rate)
+    pool = SessionPool(limiter, offline=replay)
+    clubs = ClubLookup()
+    semaphore = asyncio.Semaphore(concurrency)
+    db_lock = asyncio.Lock()
+    counts = {"success": 0, "unchanged": 0, "skipped": 0, "error": 0}
+
+    # Le pool de threads par défaut doit pouvoir porter tous les joueurs en vol
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency + 1))
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(scrape_one(url, pool, clubs, buffer, semaphore, db_lock, counts, scopes, force) for url in urls))
+        await asyncio.to_thread(buffer.flush)
+    finally:
+        pool.close()
+        clubs.save()
+    elapsed = time.perf_counter() - start
+    metrics.add_sleep("rate_limit", pool.waited)
+
+    counts["pages"] = pool.pages
+    counts["network_pages"] = pool.network_pages
+    counts["clubs"] = clubs.summary()
+    counts["pacing"] = limiter.summary()
+    counts["rates"] = limiter.rates()
+    counts["throttles"] = limiter.throttles
+    counts["elapsed"] = elapsed
+    counts["pages_per_second"] = pool.pages / elapsed if elapsed > 0 else 0.0
+    return counts
+
+
+def scrape_all_players_async(concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, burst=DEFAULT_BURST, replay=False,
+                             batch_size=DEFAULT_BATCH_SIZE, mode="all", max_ages=None, scopes=(CAREER,), job="players",
+                             max_rate=MAX_RATE):
+    """Équivalent concurrent de scrape_all_players (mêmes points de reprise et même fraîcheur)"""
+    if not os.path.exists(PLAYERS_CSV):
+        print(f"❌ Fichier {PLAYERS_CSV} introuvable")
+        return
+
+    metrics.reset()
+    conn = get_connection()
+    checkpoints = CheckpointStore(conn, job=job)
+    freshness = FreshnessStore(conn, max_ages)
+    buffer = PlayerBuffer(conn, batch_size, checkpoints=checkpoints, freshness=freshness)
+
+    all_urls = pd.read_csv(PLAYERS_CSV)["url"].tolist()
+    urls = checkpoints.select_urls(all_urls, "all" if mode == "refresh" else mode)
+    freshness.load(urls)
+    print(f"\n{'='*70}")
+    print(f"🚀 SCRAPING TRANSFERMARKT (async) - JOUEURS SÉNÉGALAIS")
+    print(f"{'='*70}")
+    print(f"📋 {len(urls)} joueurs à traiter (sur {len(all_urls)}, mode {mode})")
+    print(f"📅 Portées: {', '.join(season_label(scope) for scope in scopes)}")
+    if mode == "refresh":
+        stale = freshness.stale_counts(urls, [PROFILE] + [stats_part(scope) for scope in scopes])
+        stale_stats = sum(count for part, count in stale.items() if part != PROFILE)
+        print(f"🕒 À rafraîchir: {stale[PROFILE]} profils, {stale_stats} pages de stats")
+    print(f"🔀 {concurrency} joueurs en parallèle")
+    print(f"🚦 Débit adaptatif par hôte: {rate} req/s au départ, jusqu'à {max_rate} req/s (rafale {burst})\n")
+
+    try:
+        counts = asyncio.run(scrape_urls(urls, buffer, concurrency, rate, burst, replay, scopes,
+                                         force=mode != "refresh", max_rate=max_rate))
+
+        print(f"\n{'='*70}")
+        print(f"✅ SCRAPING TERMINÉ!")
+        print(f"{'='*70}")
+        checkpoints.print_summary(all_urls)
+    finally:
+        conn.close()
+
+    print(f"   🌐 Pages:              {counts['pages']} en {counts['elapsed']:.1f}s "
+          f"({counts['pages_per_second']:.2f} pages/s, {counts['network_pages']} via le réseau)")
+    print(f"   {counts['pacing']}")
+    print(f"   {counts['clubs']}")
+    print(f"   {buffer.summary()}")
+    print(f"   {metrics.report()}")
+    print(f"   {metrics.skip_report()}")
+    extra = {"players": len(urls), "concurrency": concurrency, "pages": counts["pages"],
+             "pages_per_second": round(counts["pages_per_second"], 3),
+             "pacing": {"rates": counts["rates"], "throttles": counts["throttles"]}}
+    print(f"   📈 Télémétrie: {metrics.write(job, extra=extra)}")
+    print(f"{'='*70}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraping Transfermarkt concurrent")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="joueurs traités en parallèle")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST, help="rafale maximale par hôte")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+    scrape_all_players_async(args.concurrency, burst=args.burst, **run_options(args))
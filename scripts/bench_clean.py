@@ -0,0 +1,207 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from clean_transforms import MATCHES, PERFORMANCES, PLAYERS, transform
+
+# ===============================================================
+#  Benchmark du nettoyage : code ligne à ligne (ancien) vs règles vectorielles
+# ===============================================================
+# Tables synthétiques au format de la base (dates en objets date comme les
+# renvoie psycopg2, textes avec espaces et valeurs manquantes, peu de valeurs
+# distinctes pour les clubs, postes et dates de match), nettoyées par les deux
+# implémentations ; les résultats doivent être identiques.
+#   python scripts/bench_clean.py --sizes 10000,1000000,10000000
+
+NATIONALITIES = [" senegal ", "france", " SENEGAL", "mali ", "guinée"]
+POSITIONS = ["Position: Attaquant", "Position: Milieu", "Position: Défenseur", "Position: Gardien", None]
+COMPETITIONS = ["Ligue 1", "Premier League", "CAN", None]
+
+
+# ---- Implémentation actuelle de data_cleaning.py (référence) ----
+
+def legacy_players(players_df):
+    players_df = players_df.fillna({'position': 'Position: Attaquant', 'current_club': 'Non défini', 'current_competition':'Non défini', 'current_pays_de_competition':'Non défini'})
+    players_df['name'] = players_df['name'].str.strip().str.title()
+    players_df['nationality'] = players_df['nationality'].str.strip().str.title()
+    players_df['current_club'] = players_df['current_club'].str.strip().str.title()
+    players_df['position'] = (players_df['position'].str.replace('Position:', '', regex=False).str.strip().str.lower())
+    players_df['birth_date'] = pd.to_datetime(players_df['birth_date'], errors='coerce')
+    return players_df
+
+def legacy_matches(matches_df):
+    matches_df = matches_df.fillna({'competition': 'Inconnue'})
+    matches_df['home_team'] = matches_df['home_team'].str.strip().str.title()
+    matches_df['away_team'] = matches_df['away_team'].str.strip().str.title()
+    matches_df['date'] = pd.to_datetime(matches_df['date'], errors='coerce')
+    matches_df['saison'] = matches_df['date'].apply(lambda d: f"{d.year}/{d.year+1}" if pd.notnull(d) else None)
+    return matches_df
+
+def legacy_performances(performances_df, players_lookup):
+    performances_df = performances_df.fillna({'minutes_played': 0, 'goals': 0, 'assists': 0})
+    return performances_df.merge(
+        players_lookup[['player_id', 'position', 'current_club']],
+        on='player_id',
+        how='left'
+    )
+
+IMPLEMENTATIONS = {
+    "actuel (apply, str sur chaque ligne, merge)": {
+        "players": legacy_players, "matches": legacy_matches, "performances": legacy_performances,
+    },
+    "règles vectorielles (clean_transforms)": {
+        "players": lambda df: transform(df, PLAYERS),
+        "matches": lambda df: transform(df, MATCHES),
+        "performances": lambda df, lookup: transform(df, PERFORMANCES, lookup),
+    },
+}
+
+
+# ---- Données synthétiques ----
+
+def dates(rng, rows, start, days, missing):
+    values = (np.datetime64(start) + rng.integers(0, days, rows)).astype(object)
+    values[rng.random(rows) < missing] = None
+    return values
+
+def pick(rng, choices, rows):
+    return np.array(choices, dtype=object)[rng.integers(0, len(choices), rows)]
+
+def synthetic_players(rows, rng):
+    clubs = [f" fc club {i} " for i in range(500)] + [None]
+    return pd.DataFrame({
+        "player_id": np.arange(1, rows + 1),
+        "name": [f" joueur {i} " for i in range(rows)],
+        "birth_date": dates(rng, rows, "1985-01-01", 7000, 0.02),
+        "nationality": pick(rng, NATIONALITIES, rows),
+        "position": pick(rng, POSITIONS, rows),
+        "current_club": pick(rng, clubs, rows),
+        "current_competition": pick(rng, COMPETITIONS, rows),
+        "current_pays_de_competition": pick(rng, ["Sénégal", "France", None], rows),
+    })
+
+def synthetic_matches(rows, rng):
+    teams = [f"team {i} " for i in range(300)]
+    return pd.DataFrame({
+        "match_id": np.arange(1, rows + 1),
+        "date": dates(rng, rows, "2010-08-01", 5000, 0.01),
+        "competition": pick(rng, COMPETITIONS, rows),
+        "home_team": pick(rng, teams, rows),
+        "away_team": pick(rng, teams, rows),
+        "home_score": rng.integers(0, 6, rows),
+        "away_score": rng.integers(0, 6, rows),
+    })
+
+def synthetic_performances(rows, rng):
+    minutes = rng.integers(0, 91, rows).astype(float)
+    minutes[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "perf_id": np.arange(1, rows + 1),
+        "player_id": rng.integers(1, rows // 10 + rows // 500 + 2, rows),   # ~2 % de références inexistantes
+        "match_id": rng.integers(1, rows + 1, rows),
+        "saison": pick(rng, ["career", "2024/2025"], rows),
+        "minutes_played": minutes,
+        "goals": rng.integers(0, 3, rows),
+        "assists": rng.integers(0, 2, rows),
+    })
+
+
+def small_tables():
+    """Petits blocs (incrémental, petites tables) : plus de 50 % de valeurs distinctes et des manquants,
+    donc le chemin sans encodage en dictionnaire"""
+    rng = np.random.default_rng(1)
+    matches = pd.DataFrame({
+        "match_id": [1, 2, 3],
+        "date": np.array([np.datetime64("2020-01-01"), np.datetime64("2021-02-02"), None], dtype=object),
+        "competition": ["CAN", None, "Ligue 1"],
+        "home_team": [" team a", "team b ", None],
+        "away_team": ["team c", " team d", "team e"],
+        "home_score": [1, 0, 2],
+        "away_score": [0, 0, 1],
+    })
+    players = synthetic_players(3, rng)
+    players.loc[0, "birth_date"] = None
+    return {"players": (players,), "matches": (matches,),
+            "performances": (synthetic_performances(20, rng), transform(players, PLAYERS))}
+
+
+# ---- Mesure ----
+
+def same(reference, result):
+    try:
+        pd.testing.assert_frame_equal(reference, result, check_dtype=False)
+        return True
+    except AssertionError:
+        return False
+
+def bench_table(table, size, seed=0):
+    """({implémentation: durée}, résultats identiques ?) ; une table à la fois pour borner la mémoire"""
+    rng = np.random.default_rng(seed)
+    if table == "performances":
+        # Référentiel : joueurs nettoyés (un joueur pour 10 lignes de performances)
+        players = transform(synthetic_players(size // 10 + 1, rng), PLAYERS)
+        args = (synthetic_performances(size, rng), players[['player_id', 'position', 'current_club']])
+        del players
+    else:
+        args = ({"players": synthetic_players, "matches": synthetic_matches}[table](size, rng),)
+    timings = {}
+    reference = None
+    same_result = True
+    for label, impl in IMPLEMENTATIONS.items():
+        start = time.perf_counter()
+        result = impl[table](*args)     # ni l'une ni l'autre ne modifie son entrée
+        timings[label] = time.perf_counter() - start
+        if reference is None:
+            reference = result
+        else:
+            same_result = same(reference, result)
+        del result
+    return timings, same_result
+
+def check_small():
+    """Tables concernées par une différence de résultat sur les petits blocs"""
+    diffs = []
+    for table, args in small_tables().items():
+        results = [impl[table](*(arg.copy() for arg in args)) for impl in IMPLEMENTATIONS.values()]
+        if not all(same(results[0], result) for result in results[1:]):
+            diffs.append(table)
+    return diffs
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du nettoyage players / matches / performances")
+    parser.add_argument("--sizes", default="10000,1000000", help="lignes par table, séparées par des virgules")
+    args = parser.parse_args()
+
+    diffs = check_small()
+    if diffs:
+        print(f"⚠️  Petits blocs : résultats différents de l'implémentation actuelle : {', '.join(diffs)}")
+    else:
+        print("✅ Petits blocs : résultats identiques à l'implémentation actuelle")
+    for size in (int(value) for value in args.sizes.split(",")):
+        print(f"📄 {size} lignes par table")
+        totals = dict.fromkeys(IMPLEMENTATIONS, 0.0)
+        diffs = []
+        details = {label: [] for label in IMPLEMENTATIONS}
+        for table in ("players", "matches", "performances"):
+            timings, same_result = bench_table(table, size)
+            for label, seconds in timings.items():
+                totals[label] += seconds
+                details[label].append(f"{table} {seconds:.2f}s")
+            if not same_result:
+                diffs.append(table)
+        base = None
+        for label, total in totals.items():
+            speed = 3 * size / total
+            ratio = f" | x{speed / base:.1f}" if base else ""
+            base = base or speed
+            print(f"   {label:<44} {speed:10.0f} lignes/s ({' | '.join(details[label])}){ratio}")
+        if diffs:
+            print(f"   ⚠️  Résultats différents de l'implémentation actuelle : {', '.join(diffs)}")
+        else:
+            print(f"   ✅ Résultats identiques à l'implémentation actuelle")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from bulk_writer import TableSwap
+
+# ===============================================================
+#  Benchmark du chargement : to_sql (actuel) vs COPY + échange de table
+# ===============================================================
+# Charge un DataFrame synthétique au format de performances_clean dans une
+# table de test (bench_load), avec les deux chemins, et affiche le débit.
+#   python scripts/bench_load.py --sizes 10000,100000,1000000
+
+load_dotenv()
+
+DB_NAME = os.getenv("POSTGRES_DB")
+DB_USER = os.getenv("POSTGRES_USER")
+DB_PASSWORD = os.getenv("POSTGRES_PASSWORD")
+DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
+
+TABLE = "bench_load"
+CLUBS = ["Fc Metz", "Olympique Lyonnais", "Al-Hilal", "Chelsea Fc", "Non Défini"]
+POSITIONS = ["attaquant", "milieu", "défenseur", "gardien"]
+
+
+def get_connection():
+    return psycopg2.connect(dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST)
+
+def get_engine():
+    # Mêmes paramètres de connexion que le chemin COPY
+    return create_engine("postgresql+psycopg2://", creator=get_connection)
+
+def synthetic_performances(rows, seed=0):
+    """performances_clean synthétique (ids, saison, stats avec NaN, position et club)"""
+    rng = np.random.default_rng(seed)
+    minutes = rng.integers(0, 3400, rows).astype(float)
+    minutes[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "perf_id": np.arange(1, rows + 1),
+        "player_id": rng.integers(1, max(2, rows // 20), rows),
+        "match_id": np.nan,
+        "saison": [f"{year}/{year + 1}" for year in rng.integers(2010, 2026, rows)],
+        "minutes_played": minutes,
+        "goals": rng.integers(0, 30, rows),
+        "assists": rng.integers(0, 20, rows),
+        "position": np.array(POSITIONS)[rng.integers(0, len(POSITIONS), rows)],
+        "current_club": np.array(CLUBS)[rng.integers(0, len(CLUBS), rows)],
+    })
+
+def load_to_sql(df, engine, conn):
+    df.to_sql(TABLE, engine, if_exists="replace", index=False)
+
+def load_copy_swap(df, engine, conn):
+    swap = TableSwap(conn, TABLE, key="perf_id")
+    swap.write(df)
+    swap.swap()
+    conn.commit()
+
+LOADERS = {
+    "to_sql (replace)": load_to_sql,
+    "COPY + échange (bulk_writer)": load_copy_swap,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du chargement des tables *_clean")
+    parser.add_argument("--sizes", default="10000,100000", help="tailles de DataFrame, séparées par des virgules")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    conn = get_connection()
+    for size in (int(value) for value in args.sizes.split(",")):
+        df = synthetic_performances(size)
+        print(f"📄 {size} lignes")
+        reference = None
+        for label, load in LOADERS.items():
+            with conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            conn.commit()
+            start = time.perf_counter()
+            load(df, engine, conn)
+            elapsed = time.perf_counter() - start
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT count(*) FROM {TABLE}")
+                loaded = cur.fetchone()[0]
+            conn.commit()
+            speed = size / elapsed
+            ratio = f" | x{speed / reference:.1f}" if reference else ""
+            reference = reference or speed
+            print(f"   {label:<32} {elapsed:7.2f}s {speed:10.0f} lignes/s ({loaded} chargées){ratio}")
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    conn.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
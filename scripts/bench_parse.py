@@ -0,0 +1,187 @@
+import argparse
+import re
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from html_extract import (
+    PARSER, clean_text, extract_club, extract_profile, extract_stats_table,
+    first_flag_title, page_type, parse_date,
+)
+from http_cache import CACHE_DIR, ResponseCache
+
+# ===============================================================
+#  Benchmark du parsing : arbre complet (ancien code) vs extraction ciblée
+# ===============================================================
+# Pages lues depuis un dossier de fixtures (<type>_*.html, type = profile,
+# club, competition ou stats) ou directement depuis le cache HTTP.
+#   python scripts/bench_parse.py --dir data/raw/fixtures
+#   python scripts/bench_parse.py --cache data/raw/http_cache --repeat 5
+
+PAGE_TYPES = ["profile", "club", "competition", "stats"]
+
+
+# ---- Implémentation actuelle des scrapers (référence) ----
+
+def legacy_profile(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    name = None
+    name_elem = soup.find("h1", class_="data-header__headline-wrapper")
+    if name_elem:
+        name = re.sub(r'#\d+\s*', '', name_elem.get_text()).strip()
+    birth_date = None
+    birth_elem = soup.find("span", itemprop="birthDate")
+    if birth_elem:
+        birth_date = parse_date(birth_elem.get_text())
+    if not birth_date:
+        birth_match = re.search(r'(\d{1,2})\s+(\w+\.?)\s+(\d{4})\s*\((\d+)\)', soup.get_text())
+        if birth_match:
+            birth_date = parse_date(birth_match.group(0))
+    nationality = None
+    nationality_elem = soup.find("span", itemprop="nationality")
+    if nationality_elem:
+        nationality = clean_text(nationality_elem.get_text())
+    if not nationality:
+        for img in soup.find_all("img", class_="flaggenrahmen"):
+            alt_text = img.get('alt', '')
+            if 'Sénégal' in alt_text or 'Senegal' in alt_text:
+                nationality = 'Sénégal'
+                break
+    position = None
+    for label in soup.find_all("li", class_="data-header__label"):
+        text = label.get_text()
+        if any(keyword in text for keyword in ["Arrière", "Milieu", "Attaquant", "Gardien", "Défenseur"]):
+            position = clean_text(text)
+            break
+    club = None
+    club_href = None
+    club_elem = soup.find("span", class_="data-header__club")
+    if club_elem:
+        club_link = club_elem.find("a")
+        if club_link:
+            club = clean_text(club_link.get_text())
+            club_href = club_link.get("href")
+    return {"name": name, "birth_date": birth_date, "nationality": nationality,
+            "position": position, "current_club": club, "club_href": club_href}
+
+def legacy_club(html):
+    club_soup = BeautifulSoup(html, "html.parser")
+    competition = None
+    competition_href = None
+    pays = None
+    comp_elem = club_soup.find("span", class_="data-header__club")
+    if not comp_elem:
+        comp_elem = club_soup.find("span", class_="data-header__league")
+    if comp_elem:
+        comp_link = comp_elem.find("a")
+        if comp_link:
+            competition = clean_text(comp_link.get_text())
+            competition_href = comp_link.get("href")
+            flag = club_soup.find("img", class_="flaggenrahmen")
+            if flag and flag.get("title"):
+                pays = clean_text(flag.get("title"))
+    return {"competition": competition, "competition_href": competition_href, "pays": pays}
+
+def legacy_competition(html):
+    comp_soup = BeautifulSoup(html, "html.parser")
+    flag = comp_soup.find("img", class_="flaggenrahmen")
+    if flag and flag.get("title"):
+        return clean_text(flag.get("title"))
+    return None
+
+def legacy_stats(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    table = soup.find("table", class_="items")
+    if not table:
+        return None
+    footer = table.find("tfoot")
+    tbody = table.find("tbody")
+    return {
+        "footer": [clean_text(c.get_text()) for c in footer.find_all("td")] if footer else None,
+        "rows": [[c.get_text() for c in row.find_all("td")] for row in tbody.find_all("tr")] if tbody else None,
+    }
+
+IMPLEMENTATIONS = {
+    "actuel (html.parser, arbre complet)": {
+        "profile": legacy_profile, "club": legacy_club,
+        "competition": legacy_competition, "stats": legacy_stats,
+    },
+    f"ciblé ({PARSER}, fragments)": {
+        "profile": extract_profile, "club": extract_club,
+        "competition": first_flag_title, "stats": extract_stats_table,
+    },
+}
+
+
+# ---- Chargement des pages ----
+
+def load_fixture_dir(directory):
+    pages = []
+    for path in sorted(Path(directory).glob("*.htm*")):
+        kind = path.name.split("_", 1)[0]
+        if kind in PAGE_TYPES:
+            pages.append((kind, path.read_text(encoding="utf-8", errors="replace")))
+    return pages
+
+def load_cache(cache_dir):
+    cache = ResponseCache(cache_dir)
+    pages = []
+    for meta in cache.entries():
+        kind = page_type(meta["url"])
+        if kind in PAGE_TYPES:
+            pages.append((kind, cache.read_body(meta).decode(meta.get("encoding") or "utf-8", errors="replace")))
+    return pages
+
+
+# ---- Mesure ----
+
+def run(impl, pages, repeat):
+    """Débit mesuré sans tracemalloc (qui ralentit tout), pic mémoire sur une passe séparée"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for kind, html in pages:
+            impl[kind](html)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    results = [impl[kind](html) for kind, html in pages]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return results, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du parsing des pages Transfermarkt")
+    parser.add_argument("--dir", help="dossier de pages sauvegardées (<type>_*.html)")
+    parser.add_argument("--cache", default=str(CACHE_DIR), help="cache HTTP à utiliser si --dir est absent")
+    parser.add_argument("--repeat", type=int, default=3, help="nombre de passes sur l'ensemble des pages")
+    args = parser.parse_args()
+
+    pages = load_fixture_dir(args.dir) if args.dir else load_cache(args.cache)
+    if not pages:
+        print("❌ Aucune page à parser")
+        return
+
+    counts = {kind: sum(1 for k, _ in pages if k == kind) for kind in PAGE_TYPES}
+    size = sum(len(html) for _, html in pages)
+    print(f"📄 {len(pages)} pages ({size / 1024:.0f} Ko) : " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+    print(f"🔁 {args.repeat} passes\n")
+
+    reference = None
+    for label, impl in IMPLEMENTATIONS.items():
+        results, elapsed, peak = run(impl, pages, args.repeat)
+        pages_per_second = len(pages) * args.repeat / elapsed
+        print(f"   {label:<40} {pages_per_second:8.1f} pages/s | pic mémoire {peak / 1024 / 1024:6.1f} Mo")
+        if reference is None:
+            reference = results
+        else:
+            diffs = sum(1 for ref, res in zip(reference, results) if ref != res)
+            if diffs:
+                print(f"   ⚠️  {diffs} pages donnent un résultat différent de l'implémentation actuelle")
+            else:
+                print(f"   ✅ Résultats identiques à l'implémentation actuelle")
+
+
+if __name__ == "__main__":
+    main()
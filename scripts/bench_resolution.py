@@ -0,0 +1,129 @@
+import argparse
+import time
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from entity_resolution import resolve_players
+
+# ===============================================================
+#  Benchmark de la résolution d'entités : temps et qualité sur données synthétiques
+# ===============================================================
+# Joueurs générés (noms de syllabes, dates de naissance), puis ~10 % de
+# variantes du même joueur (accents, casse, ordre des jetons, apostrophes,
+# lettres doublées, initiale du prénom, date manquante) et ~2 % d'homonymes
+# (même nom, autre date), dont la moitié avec aussi une fiche sans date du
+# premier joueur qui relie les deux homonymes. Précision / rappel mesurés sur
+# les paires de joueurs regroupées, comparés à drop_duplicates(subset=['name']) ;
+# aucun groupe ne doit réunir deux dates de naissance.
+#   python scripts/bench_resolution.py --sizes 10000,100000,200000
+
+SYLLABLES = ["ma", "dou", "ba", "ka", "sa", "li", "né", "fa", "ti", "ous", "se", "ni", "di", "al",
+             "lo", "gue", "ye", "ko", "ya", "té", "mba", "ndia", "kou", "cheik", "ha", "ra", "bi", "mou"]
+
+
+def synthetic_name(rng):
+    def token():
+        return "".join(rng.choice(SYLLABLES, rng.integers(2, 4))).capitalize()
+    return f"{token()} {token()}"
+
+def variant(name, rng):
+    """Autre graphie du même joueur"""
+    first, last = name.split(" ", 1)
+    choices = [
+        lambda: name.replace("é", "e").replace("è", "e"),
+        lambda: name.upper(),
+        lambda: f"{last} {first}",
+        lambda: name.replace("Mba", "M'Ba").replace("Ndia", "N'Dia") if ("Mba" in name or "Ndia" in name) else name.lower(),
+        lambda: name.replace("l", "ll", 1) if "l" in name else name.replace("s", "ss", 1),
+        lambda: f"{first[0]}. {last}",
+        lambda: name.replace("ou", "u", 1) if "ou" in name else f" {name} ",
+    ]
+    return choices[rng.integers(0, len(choices))]()
+
+def synthetic_players(rows, seed=0):
+    """(players, entité réelle de chaque ligne)"""
+    rng = np.random.default_rng(seed)
+    names, births, entities = [], [], []
+    birth_days = np.datetime64("1985-01-01") + rng.integers(0, 7000, rows)
+    while len(names) < rows:
+        entity = len(names)
+        name = synthetic_name(rng)
+        birth = birth_days[entity]
+        names.append(name)
+        births.append(birth)
+        entities.append(entity)
+        draw = rng.random()
+        if draw < 0.10 and len(names) < rows:
+            # Même joueur, autre graphie (date parfois manquante)
+            names.append(variant(name, rng))
+            births.append(None if rng.random() < 0.2 else birth)
+            entities.append(entity)
+        elif draw < 0.12 and len(names) < rows:
+            # Homonyme : même nom, autre joueur
+            names.append(name)
+            births.append(birth + int(rng.integers(30, 3000)))
+            entities.append(-entity - 1)
+            if rng.random() < 0.5 and len(names) < rows:
+                # Fiche sans date : ne doit pas réunir les deux homonymes
+                names.append(variant(name, rng))
+                births.append(None)
+                entities.append(entity)
+    order = rng.permutation(rows)
+    players = pd.DataFrame({
+        "player_id": np.arange(1, rows + 1),
+        "name": np.array(names, dtype=object)[order],
+        "birth_date": np.array(births, dtype=object)[order],
+    })
+    return players, np.array(entities)[order]
+
+def same_pairs(groups):
+    """Paires de lignes d'un même groupe"""
+    pairs = set()
+    for members in pd.Series(np.arange(len(groups))).groupby(groups):
+        pairs.update(combinations(members[1].tolist(), 2))
+    return pairs
+
+def quality(predicted, truth):
+    predicted_pairs, true_pairs = same_pairs(predicted), same_pairs(truth)
+    found = len(predicted_pairs & true_pairs)
+    precision = found / len(predicted_pairs) if predicted_pairs else 1.0
+    recall = found / len(true_pairs) if true_pairs else 1.0
+    return precision, recall
+
+def conflicting_groups(groups, players):
+    """Groupes prédits qui réunissent deux dates de naissance connues différentes (homonymes fusionnés)"""
+    births = pd.Series(pd.to_datetime(players["birth_date"]).to_numpy())
+    return int((births.groupby(groups).nunique() > 1).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la résolution d'entités joueurs")
+    parser.add_argument("--sizes", default="10000,100000", help="nombre de joueurs, séparés par des virgules")
+    args = parser.parse_args()
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        players, truth = synthetic_players(size)
+        print(f"📄 {size} joueurs ({size - len(set(truth))} doublons réels)")
+
+        start = time.perf_counter()
+        kept = players.drop_duplicates(subset=["name"])
+        elapsed = time.perf_counter() - start
+        by_name = players["name"].map(kept.set_index("name")["player_id"]).to_numpy()
+        precision, recall = quality(by_name, truth)
+        print(f"   {'drop_duplicates(name)':<24} {elapsed:7.2f}s | précision {precision:.3f} | rappel {recall:.3f} "
+              f"| {conflicting_groups(by_name, players)} groupes à deux dates")
+
+        start = time.perf_counter()
+        mapping, counts = resolve_players(players)
+        elapsed = time.perf_counter() - start
+        canonical = mapping["canonical_id"].to_numpy()
+        precision, recall = quality(canonical, truth)
+        print(f"   {'entity_resolution':<24} {elapsed:7.2f}s | précision {precision:.3f} | rappel {recall:.3f} "
+              f"| {conflicting_groups(canonical, players)} groupes à deux dates "
+              f"| {counts['pairs']} paires comparées ({counts['pairs'] / size:.1f} par joueur)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+import scraper_players
+from club_lookup import ClubLookup
+from mock_transfermarkt import add_site_arguments, site_from_args, start_in_thread
+from rate_limit import DEFAULT_BURST, MAX_RATE, AdaptiveRateLimiter, RateLimitedSession
+from scraper_players import fetch_player, no_delay, parse_scopes, random_delay
+from telemetry import LOG_DIR, InstrumentedSession, metrics
+
+# ===============================================================
+#  Benchmark de bout en bout du scraper contre le faux Transfermarkt
+# ===============================================================
+# Le vrai code de scraping (fetch_player : profil, club, compétition, stats,
+# parsing) tourne contre mock_transfermarkt.py, démarré ici en arrière-plan
+# ou déjà lancé (--url). Sans base ni cache HTTP : on mesure la collecte.
+# Les résultats sont ajoutés à data/logs/bench_scraper.json et comparés au
+# run précédent de même taille.
+#   python scripts/bench_scraper.py --sizes 100,1000,10000 --latency 50
+#   python scripts/bench_scraper.py --sizes 1000 --concurrency 8 --error-rate 0.02
+
+DEFAULT_SIZES = "100,1000,10000"
+RESULTS_PATH = LOG_DIR / "bench_scraper.json"
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run_size(base_url, size, scopes, concurrency, delays, verbose=False, rate=None, max_rate=MAX_RATE):
+    """Scrape `size` joueurs fictifs, retourne les mesures de débit (limiteur adaptatif si `rate`)"""
+    metrics.reset()
+    limiter = AdaptiveRateLimiter(rate, DEFAULT_BURST, max_rate=max_rate) if rate else None
+    urls = [f"{base_url}/joueur-{i}/profil/spieler/{i}" for i in range(1, size + 1)]
+    pause = random_delay if delays else no_delay
+    local = threading.local()
+    durations = []
+    statuses = {}
+    lock = threading.Lock()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clubs = ClubLookup(Path(tmp) / "club_lookup.json")
+
+        def one(url):
+            session = getattr(local, "session", None)
+            if session is None:
+                session = InstrumentedSession(requests.Session(), metrics)
+                if limiter:
+                    session = RateLimitedSession(session, limiter)
+                local.session = session
+            start = time.perf_counter()
+            try:
+                status, _, _ = fetch_player(url, session, scopes=scopes, pause=pause, clubs=clubs)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                durations.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        # Les lignes de progression du scraper sont masquées (sauf --verbose)
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        start = time.perf_counter()
+        with output, ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, urls))
+        wall = time.perf_counter() - start
+
+    summary = metrics.summary()
+    pages = sum(stats["count"] for stats in summary["requests"].values())
+    return {
+        "players": size,
+        "wall_seconds": round(wall, 3),
+        "players_per_second": round(size / wall, 3),
+        "pages": pages,
+        "pages_per_second": round(pages / wall, 3),
+        "p50_player_seconds": round(percentile(durations, 0.5), 4),
+        "p95_player_seconds": round(percentile(durations, 0.95), 4),
+        "statuses": statuses,
+        "retries": sum(summary["retries"].values()),
+        "time": summary["time"],
+        "pacing": {"rates": limiter.rates(), "throttles": limiter.throttles} if limiter else None,
+    }
+
+def load_history(path):
+    if not path.exists():
+        return []
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return []
+
+def previous_result(history, size, options):
+    """Dernier résultat de même taille et mêmes options du faux site"""
+    for run in reversed(history):
+        if run["options"] == options and str(size) in run["results"]:
+            return run["results"][str(size)]
+    return None
+
+def delta(current, previous, key):
+    if not previous or not previous.get(key):
+        return ""
+    change = (current[key] - previous[key]) / previous[key] * 100
+    return f" ({change:+.1f}%)"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du scraper contre le faux Transfermarkt")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="tailles de liste de joueurs, ex. 100,1000,10000")
+    parser.add_argument("--scopes", default="career", help="portées des stats (comme scraper_players.py)")
+    parser.add_argument("--concurrency", type=int, default=1, help="joueurs traités en parallèle")
+    parser.add_argument("--delays", action="store_true", help="garder les pauses aléatoires du scraper")
+    parser.add_argument("--rate", type=float, help="passer par le limiteur adaptatif, débit de départ (req/s)")
+    parser.add_argument("--max-rate", type=float, default=MAX_RATE, help="débit maximal du limiteur adaptatif (req/s)")
+    parser.add_argument("--verbose", action="store_true", help="afficher la progression du scraper")
+    parser.add_argument("--url", help="faux site déjà lancé (sinon démarré ici)")
+    parser.add_argument("--results", default=str(RESULTS_PATH), help="historique des résultats (JSON)")
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        server, base_url = start_in_thread(site_from_args(args))
+    # Les liens relatifs (club, compétition) doivent pointer vers le faux site
+    scraper_players.BASE_URL = base_url
+
+    options = {
+        "scopes": args.scopes, "concurrency": args.concurrency, "delays": args.delays,
+        "rate": args.rate, "max_rate": args.max_rate if args.rate else None,
+        "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+        "slow_body_rate": args.slow_body_rate, "fixtures": args.fixtures, "url": args.url,
+    }
+    results_path = Path(args.results)
+    history = load_history(results_path)
+
+    print(f"🧪 Faux Transfermarkt: {base_url}")
+    print(f"🔀 {args.concurrency} joueur(s) en parallèle | latence {args.latency:.0f}±{args.jitter:.0f} ms | "
+          f"erreurs {args.error_rate:.0%}\n")
+
+    results = {}
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            result = run_size(base_url, size, parse_scopes(args.scopes), args.concurrency, args.delays, args.verbose,
+                              args.rate, args.max_rate)
+            previous = previous_result(history, size, options)
+            results[str(size)] = result
+            print(f"   {size:>6} joueurs: {result['players_per_second']:8.2f} joueurs/s{delta(result, previous, 'players_per_second')} | "
+                  f"{result['pages_per_second']:8.2f} pages/s | "
+                  f"p50 {result['p50_player_seconds'] * 1000:7.1f} ms{delta(result, previous, 'p50_player_seconds')} | "
+                  f"p95 {result['p95_player_seconds'] * 1000:7.1f} ms{delta(result, previous, 'p95_player_seconds')} | "
+                  f"{result['retries']} retries")
+            if result["pacing"]:
+                rates = ", ".join(f"{rate:.2f}" for rate in result["pacing"]["rates"].values())
+                print(f"          🚦 débit final {rates} req/s | {result['pacing']['throttles']} ralentissements")
+    finally:
+        if server:
+            server.shutdown()
+
+    history.append({"date": datetime.now().isoformat(timespec="seconds"), "options": options, "results": results})
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    results_path.write_text(json.dumps(history, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n📈 Résultats ajoutés à {results_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import io
+import re
+
+# ===============================================================
+#  Chargement en masse : COPY vers une table de staging + échange
+# ===============================================================
+# to_sql(if_exists="replace") insère ligne à ligne et supprime la table avant
+# de la recréer : index perdus, table absente ou à moitié remplie pendant le
+# chargement, et impossible dès qu'une clé étrangère la référence
+# (players_kpis → players_clean). TableSwap charge les DataFrames par
+# COPY FROM STDIN dans <table>__staging (mêmes types que la table en place),
+# y recrée clé primaire, contraintes et index, puis l'échange avec l'ancienne
+# dans la transaction de l'appelant : les lecteurs voient l'ancienne table
+# jusqu'au commit, puis la nouvelle. Les clés étrangères qui pointaient vers
+# l'ancienne table sont recréées sur la nouvelle (et vérifiées : un échec
+# annule tout, l'ancienne table reste en place).
+#   swap = TableSwap(conn, "players_clean", key="player_id")
+#   for chunk in chunks: swap.write(chunk)
+#   swap.swap(); conn.commit()
+
+STAGING_SUFFIX = "__staging"
+NEW_SUFFIX = "__new"
+NULL = r"\N"            # marqueur NULL du COPY (les chaînes vides restent des chaînes vides)
+COPY_ROWS = 100_000     # lignes converties en CSV par COPY (mémoire du tampon bornée)
+
+# Types Postgres des colonnes créées depuis un DataFrame (comme to_sql)
+PG_TYPES = [
+    ("bool", "BOOLEAN"),
+    ("int", "BIGINT"),
+    ("uint", "BIGINT"),
+    ("float", "DOUBLE PRECISION"),
+    ("datetime64[ns, ", "TIMESTAMPTZ"),
+    ("datetime", "TIMESTAMP"),
+]
+INTEGER_TYPES = ("bigint", "integer", "smallint")    # comparés en minuscules (pg_type renvoie BIGINT)
+
+INDEX_RE = re.compile(r"^CREATE (UNIQUE )?INDEX (\S+) ON (\S+) ")
+
+
+def pg_type(dtype):
+    name = str(dtype).lower()
+    for prefix, pg in PG_TYPES:
+        if name.startswith(prefix):
+            return pg
+    return "TEXT"
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def table_columns(cur, table):
+    """[(colonne, type)] d'une table existante, [] sinon"""
+    cur.execute("""
+        SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+    """, (table,))
+    return cur.fetchall()
+
+def copy_dataframe(cur, df, table, columns=None):
+    """COPY FROM STDIN d'un DataFrame, par tranches de COPY_ROWS lignes"""
+    columns = list(df.columns) if columns is None else columns
+    sql = (f"COPY {table} ({', '.join(quote(c) for c in columns)}) "
+           f"FROM STDIN WITH (FORMAT csv, NULL '{NULL}')")
+    for start in range(0, len(df), COPY_ROWS):
+        buffer = io.StringIO()
+        df.iloc[start:start + COPY_ROWS].to_csv(buffer, index=False, header=False, na_rep=NULL)
+        buffer.seek(0)
+        cur.copy_expert(sql, buffer)
+
+def export_csv(conn, query, path):
+    """Résultat d'une requête (ou table) vers un CSV avec en-tête, via COPY TO STDOUT côté serveur"""
+    with open(path, "w", encoding="utf-8", newline="") as f, conn.cursor() as cur:
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+
+
+class TableSwap:
+    """Table rechargée entièrement : COPY dans une table de staging, échangée avec l'ancienne au swap()"""
+
+    def __init__(self, conn, table, key=None, indexes=()):
+        self.conn = conn
+        self.table = table
+        self.staging = table + STAGING_SUFFIX
+        self.key = key                    # clé primaire si la table en place n'en a pas
+        self.indexes = list(indexes)      # colonnes à indexer en plus de celles de la table en place
+        self.columns = None
+        self.integers = []
+        self.rows = 0
+
+    def create(self, df):
+        """Table de staging aux types de la table en place (si mêmes colonnes), sinon déduits du DataFrame"""
+        with self.conn.cursor() as cur:
+            existing = table_columns(cur, self.table)
+            if [name for name, _ in existing] == list(df.columns):
+                types = existing
+            else:
+                types = [(column, pg_type(dtype)) for column, dtype in df.dtypes.items()]
+            cur.execute(f"DROP TABLE IF EXISTS {self.staging}")
+            cur.execute(f"CREATE TABLE {self.staging} ({', '.join(f'{quote(c)} {t}' for c, t in types)})")
+        self.columns = [column for column, _ in types]
+        # Entiers devenus flottants à cause d'un NaN (45.0) : réécrits en entiers pour COPY
+        self.integers = [column for column, kind in types if kind.lower() in INTEGER_TYPES]
+
+    def write(self, df):
+        if self.columns is None:
+            self.create(df)
+        for column in self.integers:
+            if df[column].dtype.kind == "f":
+                df = df.assign(**{column: df[column].astype("Int64")})
+        with self.conn.cursor() as cur:
+            copy_dataframe(cur, df, self.staging, self.columns)
+        self.rows += len(df)
+
+    def constraints(self, cur):
+        """Contraintes de la table en place : les siennes (clé primaire d'abord) et les clés étrangères
+        d'autres tables qui la référencent"""
+        cur.execute("""
+            SELECT conname, contype, conrelid::regclass::text, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = to_regclass(%(table)s)
+               OR (confrelid = to_regclass(%(table)s) AND conrelid <> confrelid)
+            ORDER BY contype <> 'p', contype <> 'u', conname
+        """, {"table": self.table})
+        return cur.fetchall()
+
+    def swap(self):
+        """Index sur la staging puis échange ; ne commite pas (les swaps d'un même run passent ensemble)"""
+        if self.columns is None:
+            return
+        with self.conn.cursor() as cur:
+            constraints = self.constraints(cur)
+            own = [(name, definition) for name, kind, owner, definition in constraints if owner == self.table]
+            incoming = [(name, owner, definition) for name, kind, owner, definition in constraints if owner != self.table]
+            cur.execute("""
+                SELECT indexname, indexdef FROM pg_indexes i
+                WHERE tablename = %s AND schemaname = current_schema()
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = to_regclass(i.indexname))
+            """, (self.table,))
+            indexes = cur.fetchall()
+
+            # ---- Contraintes et index construits sur la staging (noms provisoires) ----
+            renames = []
+            if self.key and not any(definition.startswith("PRIMARY KEY") for _, definition in own):
+                own.insert(0, (f"{self.table}_pkey", f"PRIMARY KEY ({self.key})"))
+            for name, definition in own:
+                cur.execute(f"ALTER TABLE {self.staging} ADD CONSTRAINT {quote(name + NEW_SUFFIX)} {definition}")
+                renames.append(f"ALTER TABLE {self.table} RENAME CONSTRAINT {quote(name + NEW_SUFFIX)} TO {quote(name)}")
+            names = {name for name, _ in indexes}
+            for columns in self.indexes:
+                columns = [columns] if isinstance(columns, str) else list(columns)
+                name = f"{self.table}_{'_'.join(columns)}_idx"
+                if name not in names:
+                    indexes.append((name, f"CREATE INDEX {name} ON {self.table} ({', '.join(map(quote, columns))})"))
+            for name, definition in indexes:
+                unique = INDEX_RE.match(definition).group(1) or ""
+                definition = INDEX_RE.sub(f"CREATE {unique}INDEX {quote(name + NEW_SUFFIX)} ON {self.staging} ", definition)
+                cur.execute(definition)
+                renames.append(f"ALTER INDEX {quote(name + NEW_SUFFIX)} RENAME TO {quote(name)}")
+            cur.execute(f"ANALYZE {self.staging}")
+
+            # ---- Échange : verrou exclusif seulement à partir d'ici, jusqu'au commit ----
+            for name, owner, _ in incoming:
+                cur.execute(f"ALTER TABLE {owner} DROP CONSTRAINT {quote(name)}")
+            cur.execute(f"DROP TABLE IF EXISTS {self.table}")
+            cur.execute(f"ALTER TABLE {self.staging} RENAME TO {self.table}")
+            for statement in renames:
+                cur.execute(statement)
+            for name, owner, definition in incoming:
+                cur.execute(f"ALTER TABLE {owner} ADD CONSTRAINT {quote(name)} {definition}")
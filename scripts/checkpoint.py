@@ -0,0 +1,157 @@
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+# ===============================================================
+#  Points de reprise du scraping (une ligne par URL et par job)
+# ===============================================================
+# Chaque URL traitée est enregistrée avec son statut, la raison d'un échec,
+# le nombre d'échecs consécutifs, le run et l'horodatage. Le statut « done »
+# d'un joueur à écrire est écrit dans la même transaction que son lot (voir
+# db_writer) : une URL n'est « done » que si ses données sont réellement en
+# base. Les autres statuts (échecs, autre nationalité, inchangés) sont écrits
+# tous les FLUSH_EVERY statuts, sans attendre un lot : un arrêt brutal n'en
+# perd que quelques-uns.
+
+DONE = "done"
+SKIPPED = "skipped_nationality"
+FAILED = "failed"
+
+MAX_ATTEMPTS = 3         # échecs consécutifs avant d'abandonner l'URL
+FLUSH_EVERY = 25         # statuts hors lot écrits par paquets de cette taille
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+        job TEXT NOT NULL,
+        url TEXT NOT NULL,
+        status TEXT NOT NULL,
+        reason TEXT,
+        attempts INT NOT NULL DEFAULT 1,
+        run_id TEXT,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (job, url)
+    )
+"""
+
+UPSERT_SQL = """
+    INSERT INTO scrape_checkpoints (job, url, status, reason, attempts, run_id, updated_at)
+    VALUES %s
+    ON CONFLICT (job, url) DO UPDATE
+    SET status = EXCLUDED.status,
+        reason = EXCLUDED.reason,
+        -- échecs consécutifs : un succès (ou un saut) remet le compteur à zéro
+        attempts = CASE WHEN EXCLUDED.status <> '{failed}' THEN 0
+                        WHEN scrape_checkpoints.status = '{failed}' THEN scrape_checkpoints.attempts + 1
+                        ELSE 1 END,
+        run_id = EXCLUDED.run_id,
+        updated_at = EXCLUDED.updated_at
+""".format(failed=FAILED)
+
+
+class CheckpointStore:
+    """Statuts durables des URLs d'un job de scraping"""
+
+    def __init__(self, conn, job, run_id=None, max_attempts=MAX_ATTEMPTS, flush_every=FLUSH_EVERY):
+        self.conn = conn
+        self.job = job
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.max_attempts = max_attempts
+        self.flush_every = flush_every
+        self.pending = {}       # statuts liés au prochain lot de joueurs
+        self.standalone = {}    # statuts sans données à écrire
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA_SQL)
+        conn.commit()
+
+    def select_urls(self, urls, mode="all"):
+        """URLs à traiter : toutes, en attente + échecs réessayables (resume), ou échecs seuls"""
+        if mode == "all":
+            return list(urls)
+
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT url, status, attempts FROM scrape_checkpoints WHERE job = %s AND url = ANY(%s)",
+                (self.job, list(urls)),
+            )
+            known = {url: (status, attempts) for url, status, attempts in cur.fetchall()}
+        self.conn.commit()
+
+        def retryable(url):
+            status, attempts = known[url]
+            return status == FAILED and attempts < self.max_attempts
+
+        if mode == "resume":
+            return [url for url in urls if url not in known or retryable(url)]
+        return [url for url in urls if url in known and retryable(url)]
+
+    def record(self, url, status, reason=None, batched=False):
+        """Met un statut en attente d'écriture ; batched : joueur ajouté au lot en cours (statut écrit
+        avec lui), sinon écrit dès que FLUSH_EVERY statuts hors lot sont en attente"""
+        row = (self.job, url, status, reason, 1 if status == FAILED else 0, self.run_id, datetime.now())
+        if batched:
+            self.pending[url] = row
+            return
+        self.pending.pop(url, None)
+        self.standalone[url] = row
+        if len(self.standalone) >= self.flush_every:
+            self.flush_standalone()
+
+    def fail_pending(self, reason):
+        """Lot non écrit en base : les URLs « done » en attente repassent en échec"""
+        for url, (job, _, status, _, _, run_id, at) in list(self.pending.items()):
+            if status == DONE:
+                self.pending[url] = (job, url, FAILED, reason, 1, run_id, at)
+
+    def write(self, cur):
+        """Écrit les statuts en attente avec le curseur fourni (sans commit)"""
+        rows = list(self.standalone.values()) + list(self.pending.values())
+        if not rows:
+            return
+        execute_values(cur, UPSERT_SQL, rows, page_size=len(rows))
+        self.pending = {}
+        self.standalone = {}
+
+    def flush_standalone(self):
+        """Écrit les seuls statuts hors lot dans leur propre transaction (le lot en cours n'est pas touché)"""
+        if not self.standalone:
+            return
+        rows = list(self.standalone.values())
+        with self.conn.cursor() as cur:
+            execute_values(cur, UPSERT_SQL, rows, page_size=len(rows))
+        self.conn.commit()
+        self.standalone = {}
+
+    def flush(self):
+        """Écrit les statuts en attente dans leur propre transaction"""
+        if not (self.pending or self.standalone):
+            return
+        with self.conn.cursor() as cur:
+            self.write(cur)
+        self.conn.commit()
+
+    def summary(self, urls):
+        """Compte des statuts pour ces URLs : {done, skipped_nationality, failed, pending, this_run}"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT status, count(*), count(*) FILTER (WHERE run_id = %s)
+                FROM scrape_checkpoints
+                WHERE job = %s AND url = ANY(%s)
+                GROUP BY status
+            """, (self.run_id, self.job, list(urls)))
+            rows = cur.fetchall()
+        self.conn.commit()
+
+        counts = {DONE: 0, SKIPPED: 0, FAILED: 0, "this_run": 0}
+        for status, total, this_run in rows:
+            counts[status] = total
+            counts["this_run"] += this_run
+        counts["pending"] = len(set(urls)) - sum(total for _, total, _ in rows)
+        return counts
+
+    def print_summary(self, urls):
+        counts = self.summary(urls)
+        print(f"   ✓ Succès:              {counts[DONE]} joueurs")
+        print(f"   ⊘ Autre nationalité:   {counts[SKIPPED]} joueurs")
+        print(f"   ✗ Erreurs:             {counts[FAILED]} joueurs")
+        print(f"   … Jamais traités:      {counts['pending']} joueurs")
+        print(f"   🔖 Run {self.run_id}: {counts['this_run']} URLs traitées")
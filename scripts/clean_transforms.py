@@ -0,0 +1,100 @@
+import pandas as pd
+
+# ===============================================================
+#  Règles de nettoyage déclaratives, appliquées en vectoriel
+# ===============================================================
+# Chaque table est décrite par ses règles (valeurs par défaut, colonnes texte
+# et leur normalisation, dates, saison dérivée, enrichissement par jointure) ;
+# transform() les applique dans cet ordre. Les colonnes texte ont peu de
+# valeurs distinctes (clubs, nationalités, postes) : elles sont encodées en
+# dictionnaire (pd.factorize) et la normalisation ne porte que sur les
+# valeurs distinctes, redistribuées ensuite par les codes ; la saison est
+# calculée une fois par année.
+# L'enrichissement est une recherche dans l'index du référentiel, sans merge.
+#   from clean_transforms import PLAYERS, transform
+#   players_df = transform(players_df, PLAYERS)
+
+SAMPLE_ROWS = 10_000     # lignes examinées pour estimer la part de valeurs distinctes
+DISTINCT_RATIO = 0.5
+
+# Normalisations de texte, appliquées à une Series de valeurs distinctes
+STRING_RULES = {
+    "title": lambda s: s.str.strip().str.title(),
+    "position": lambda s: s.str.replace("Position:", "", regex=False).str.strip().str.lower(),
+}
+
+PLAYERS = {
+    "fill": {"position": "Position: Attaquant", "current_club": "Non défini",
+             "current_competition": "Non défini", "current_pays_de_competition": "Non défini"},
+    "strings": {"name": "title", "nationality": "title", "current_club": "title", "position": "position"},
+    "dates": ["birth_date"],
+}
+
+MATCHES = {
+    "fill": {"competition": "Inconnue"},
+    "strings": {"home_team": "title", "away_team": "title"},
+    "dates": ["date"],
+    "seasons": {"saison": "date"},      # colonne créée : colonne date source
+}
+
+PERFORMANCES = {
+    "fill": {"minutes_played": 0, "goals": 0, "assists": 0},
+    "enrich": {"on": "player_id", "columns": ["position", "current_club"]},
+}
+
+
+# ===============================================================
+#  Opérations vectorielles
+# ===============================================================
+
+def by_dictionary(series, fn):
+    """fn appliquée aux seules valeurs distinctes de la colonne, puis redistribuée (NaN conservés) ;
+    colonne presque sans doublons (noms) : fn appliquée directement, l'encodage ne ferait que coûter"""
+    sample = series.iloc[:SAMPLE_ROWS]
+    if len(sample) and sample.nunique() > DISTINCT_RATIO * len(sample):
+        return fn(series)
+    codes, uniques = pd.factorize(series)
+    result = fn(pd.Series(uniques)).reindex(codes)   # code -1 (valeur manquante) → NaN
+    result.index = series.index
+    return result
+
+def parse_dates(series):
+    # to_datetime convertit déjà une seule fois chaque valeur distincte (cache=True)
+    return pd.to_datetime(series, errors="coerce")
+
+def season_labels(dates):
+    """« 2024/2025 » à partir de l'année de chaque date (une étiquette par année distincte)"""
+    # Toujours par factorize (pas by_dictionary) : années distinctes sans NaN, même quand
+    # un petit bloc a plus de 50 % d'années distinctes
+    codes, years = pd.factorize(dates.dt.year)
+    labels = pd.Series([f"{int(year)}/{int(year) + 1}" for year in years], dtype=object).reindex(codes)
+    # None sans date, type inféré par pandas comme pour l'ancien apply
+    return pd.Series(labels.where(labels.notna(), None).to_numpy(), index=dates.index)
+
+def enrich(df, lookup, on, columns):
+    """Colonnes `columns` du référentiel ajoutées par clé `on` (comme un merge left, clé unique)"""
+    lookup = lookup.drop_duplicates(on)
+    positions = pd.Index(lookup[on]).get_indexer(df[on])     # -1 : clé absente du référentiel
+    df = df.reset_index(drop=True)
+    for column in columns:
+        values = lookup[column].reset_index(drop=True).reindex(positions)
+        values.index = df.index
+        df[column] = values
+    return df
+
+
+def transform(df, rules, lookup=None):
+    """Applique les règles d'une table à un DataFrame (ou un bloc) ; lookup : référentiel de l'enrichissement"""
+    if rules.get("fill"):
+        df = df.fillna(rules["fill"])
+    else:
+        df = df.copy()
+    for column, rule in rules.get("strings", {}).items():
+        df[column] = by_dictionary(df[column], STRING_RULES[rule])
+    for column in rules.get("dates", []):
+        df[column] = parse_dates(df[column])
+    for column, source in rules.get("seasons", {}).items():
+        df[column] = season_labels(df[source])
+    if rules.get("enrich"):
+        df = enrich(df, lookup, **rules["enrich"])
+    return df
@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# ===============================================================
+#  Table club → (compétition, pays) partagée entre joueurs et runs
+# ===============================================================
+# Beaucoup de joueurs partagent le même club (Fc Metz, Le Havre Ac...) :
+# la page club (et parfois la page compétition) n'est lue qu'une fois,
+# puis réutilisée tant que l'entrée a moins de MAX_AGE secondes.
+# Le fichier est fusionné à l'enregistrement (entrée la plus récente gardée) :
+# plusieurs scrapers sur la même machine ne s'écrasent pas. Les workers de
+# work_queue.py, répartis sur plusieurs machines, partagent en plus la table
+# Postgres club_lookup (SharedClubLookup).
+
+LOOKUP_PATH = Path("data/raw/club_lookup.json")
+MAX_AGE = 30 * 24 * 3600  # 30 jours : les clubs changent rarement de championnat
+
+
+class ClubLookup:
+    """Mémo persistant club_url → (compétition, pays)"""
+
+    def __init__(self, path=LOOKUP_PATH, max_age=MAX_AGE):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.entries = self.read()
+
+    def read(self):
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️  {self.path} illisible, table des clubs repartie de zéro")
+            return {}
+
+    def get(self, club_url):
+        """Retourne (compétition, pays) si l'entrée existe et n'est pas périmée, sinon None"""
+        with self.lock:
+            entry = self.entries.get(club_url)
+            if entry and time.time() - entry["fetched_at"] < self.max_age:
+                self.hits += 1
+                return entry["competition"], entry["pays"]
+            self.misses += 1
+            return None
+
+    def merge(self, club_url, entry):
+        """Garde l'entrée la plus récente (appelé sous self.lock)"""
+        mine = self.entries.get(club_url)
+        if mine is None or mine["fetched_at"] < entry["fetched_at"]:
+            self.entries[club_url] = entry
+
+    def put(self, club_url, competition, pays):
+        with self.lock:
+            self.entries[club_url] = {
+                "competition": competition,
+                "pays": pays,
+                "fetched_at": time.time(),
+            }
+
+    def save(self):
+        """Fusionne avec le fichier actuel (entrée la plus récente de chaque club) puis le remplace"""
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            for club_url, entry in self.read().items():
+                self.merge(club_url, entry)
+            # Un fichier temporaire par processus et par thread (comme http_cache)
+            tmp = self.path.with_suffix(f".json.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+
+    def summary(self):
+        return f"🏟️  Table des clubs: {self.hits} réutilisés | {self.misses} consultés ({len(self.entries)} en mémoire)"
+
+
+# Verrou consultatif : plusieurs workers qui démarrent ensemble ne créent pas la table en même temps
+SHARED_SCHEMA_SQL = """
+    SELECT pg_advisory_xact_lock(hashtext('club_lookup'));
+    CREATE TABLE IF NOT EXISTS club_lookup (
+        club_url TEXT PRIMARY KEY,
+        competition TEXT,
+        pays TEXT,
+        fetched_at DOUBLE PRECISION NOT NULL    -- secondes epoch, comme le fichier JSON
+    )
+"""
+
+# L'entrée la plus récente gagne, quel que soit l'ordre d'arrivée des workers
+SHARED_PUT_SQL = """
+    INSERT INTO club_lookup (club_url, competition, pays, fetched_at) VALUES (%s, %s, %s, %s)
+    ON CONFLICT (club_url) DO UPDATE
+    SET competition = EXCLUDED.competition, pays = EXCLUDED.pays, fetched_at = EXCLUDED.fetched_at
+    WHERE club_lookup.fetched_at < EXCLUDED.fetched_at
+"""
+
+
+class SharedClubLookup(ClubLookup):
+    """ClubLookup partagé par la base (table club_lookup) entre workers de plusieurs machines :
+    un club lu par un worker n'est pas relu par les autres. `conn` doit être une connexion
+    dédiée en autocommit ; le fichier JSON local reste mis à jour par save()."""
+
+    def __init__(self, conn, path=LOOKUP_PATH, max_age=MAX_AGE):
+        super().__init__(path, max_age)
+        self.conn = conn
+        with conn.cursor() as cur:
+            cur.execute(SHARED_SCHEMA_SQL)
+            cur.execute("SELECT club_url, competition, pays, fetched_at FROM club_lookup")
+            rows = cur.fetchall()
+        with self.lock:
+            for club_url, competition, pays, fetched_at in rows:
+                self.merge(club_url, {"competition": competition, "pays": pays, "fetched_at": fetched_at})
+
+    def get(self, club_url):
+        with self.lock:
+            entry = self.entries.get(club_url)
+            if not entry or time.time() - entry["fetched_at"] >= self.max_age:
+                # Absent ou périmé ici : peut-être lu entre-temps par un autre worker
+                with self.conn.cursor() as cur:
+                    cur.execute("SELECT competition, pays, fetched_at FROM club_lookup WHERE club_url = %s", (club_url,))
+                    row = cur.fetchone()
+                if row:
+                    self.merge(club_url, {"competition": row[0], "pays": row[1], "fetched_at": row[2]})
+                    entry = self.entries[club_url]
+            if entry and time.time() - entry["fetched_at"] < self.max_age:
+                self.hits += 1
+                return entry["competition"], entry["pays"]
+            self.misses += 1
+            return None
+
+    def put(self, club_url, competition, pays):
+        super().put(club_url, competition, pays)
+        with self.conn.cursor() as cur:
+            cur.execute(SHARED_PUT_SQL, (club_url, competition, pays, self.entries[club_url]["fetched_at"]))
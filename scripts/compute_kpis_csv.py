@@ -3,6 +3,8 @@ import pandas as pd
 import psycopg2
 from dotenv import load_dotenv
 
+from bulk_writer import TableSwap
+
 # ------------------------------
 # Charger .env
 # ------------------------------
@@ -22,6 +24,8 @@ DB_PORT = os.getenv("POSTGRES_PORT", "5432")
 # ------------------------------
 PERF_CSV = "data/performances_clean.csv"
 OUTPUT_CSV = "data/processed/players_kpis.csv"
+# Lignes agrégées retenues pour les KPIs : carrière ou une saison (ex. 2025/2026)
+KPI_SAISON = os.getenv("KPI_SAISON", "career")
 
 # ------------------------------
 # Fonctions
@@ -40,6 +44,10 @@ def safe_div(a, b):
 print(" - Chargement des données...")
 perf = pd.read_csv(PERF_CSV)
 
+# Une ligne par joueur et par saison : ne garder que la portée des KPIs
+if "saison" in perf.columns:
+    perf = perf[perf["saison"] == KPI_SAISON]
+
 # Aggregation par joueur
 agg = perf.groupby("player_id").agg({
     "minutes_played": "sum",
@@ -111,10 +119,6 @@ try:
     """)
     print("✅ Table players_kpis prête")
     
-    # On vide avant de réinsérer
-    cur.execute("DELETE FROM players_kpis;")
-    print(" Table vidée")
-    
 except psycopg2.Error as e:
     print(f"❌ Erreur lors de la création de la table : {e}")
     conn.rollback()
@@ -123,35 +127,15 @@ except psycopg2.Error as e:
     exit(1)
 
 # ------------------------------
-# Insertion
+# Insertion : COPY dans une table de staging, échangée avec players_kpis au commit
+# (clé primaire et clé étrangère vers players_clean recréées, pas de table vide entre-temps)
 # ------------------------------
 try:
-    inserted_count = 0
-    for _, row in agg.iterrows():
-        cur.execute("""
-            INSERT INTO players_kpis (
-                player_id, minutes_played, goals, assists, nb_matches, efficiency, score_global
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (player_id)
-            DO UPDATE SET
-                minutes_played = EXCLUDED.minutes_played,
-                goals = EXCLUDED.goals,
-                assists = EXCLUDED.assists,
-                nb_matches = EXCLUDED.nb_matches,
-                efficiency = EXCLUDED.efficiency,
-                score_global = EXCLUDED.score_global;
-        """, (
-            int(row["player_id"]),
-            int(row["minutes_played"]),
-            int(row["goals"]),
-            int(row["assists"]),
-            int(row["nb_matches"]),
-            float(row["efficiency"]),
-            float(row["score_global"])
-        ))
-        inserted_count += 1
-    
+    kpis = TableSwap(conn, "players_kpis", key="player_id")
+    kpis.write(agg[["player_id", "minutes_played", "goals", "assists", "nb_matches", "efficiency", "score_global"]])
+    kpis.swap()
+    inserted_count = kpis.rows
+
     conn.commit()
     print(f"✅ {inserted_count} KPIs insérés dans PostgreSQL")
     
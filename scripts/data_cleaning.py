@@ -1,12 +1,35 @@
+import argparse
 import os
+import numpy as np
 import psycopg2
 import pandas as pd
-from sqlalchemy import create_engine
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
+from bulk_writer import TableSwap, export_csv, table_columns
+from clean_transforms import MATCHES, PERFORMANCES, PLAYERS, transform
+from entity_resolution import apply_mapping, resolve_players
+
 # ===============================================================
 #  Jour 4 - Nettoyage et standardisation des données
 # ===============================================================
+# Par défaut chaque table est chargée entière en DataFrame. Avec --chunked,
+# les tables sont lues par blocs via des curseurs serveur nommés, les mêmes
+# étapes (doublons, valeurs manquantes, formats, enrichissement) sont
+# appliquées à chaque bloc et les résultats écrits au fil de l'eau : la
+# mémoire reste stable quelle que soit la taille des tables.
+# Avec --incremental, seules les lignes modifiées depuis le dernier run
+# (colonne updated_at, tenue à jour par trigger) sont nettoyées puis
+# upsertées par clé primaire dans les tables *_clean ; le watermark de chaque
+# table source est gardé dans clean_watermarks. Sans watermark (premier
+# run), ou avec --full, les tables *_clean sont reconstruites.
+# Les doublons de joueurs sont résolus par entity_resolution.py (noms
+# approchés + date de naissance) : un seul joueur canonique par groupe dans
+# players_clean, performances rattachées à son id, correspondance complète
+# dans players_canonical.
+#   python scripts/data_cleaning.py
+#   python scripts/data_cleaning.py --chunked --chunk-size 50000
+#   python scripts/data_cleaning.py --incremental
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -16,112 +39,537 @@ DB_USER = os.getenv("POSTGRES_USER")
 DB_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
 
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Clé primaire (ordre de lecture des blocs) et clés de doublons de chaque table (players : entity_resolution)
+PRIMARY_KEYS = {"players": "player_id", "matches": "match_id", "performances": "perf_id"}
+DEDUP_KEYS = {
+    "matches": ["date", "home_team", "away_team"],
+    "performances": ["player_id", "match_id", "saison"],
+}
+# Colonne de détection des changements, retirée des sorties
+WATERMARK_COLUMN = "updated_at"
+# Table nettoyée et CSV de sortie
+OUTPUTS = {
+    "players": ("players_clean", "data/players_clean.csv"),
+    "matches": ("matches_clean", "data/matches_clean.csv"),
+    "performances": ("performances_clean", "data/performances_clean.csv"),
+}
+# Correspondance player_id → id canonique (doublons de joueurs regroupés)
+CANONICAL_OUTPUT = ("players_canonical", "data/players_canonical.csv")
+
+
 # ===============================================================
 #  Connexion à la base PostgreSQL
 # ===============================================================
-try:
-    conn = psycopg2.connect(
+def get_connection():
+    return psycopg2.connect(
         dbname=DB_NAME,
         user=DB_USER,
         password=DB_PASSWORD,
         host=DB_HOST
     )
-    print("Connexion PostgreSQL réussie !")
-except Exception as e:
-    print("❌ Erreur de connexion :", e)
-    exit()
+
 
 # ===============================================================
-#  Chargement des tables dans des DataFrames
+#  Détection des changements (updated_at + watermarks)
 # ===============================================================
-players_df = pd.read_sql("SELECT * FROM players", conn)
-matches_df = pd.read_sql("SELECT * FROM matches", conn)
-performances_df = pd.read_sql("SELECT * FROM performances", conn)
+# updated_at est posé à l'insertion et à chaque UPDATE qui change la ligne
+# (y compris les ON CONFLICT DO UPDATE des scrapers) ; clock_timestamp() et
+# non now() : une transaction longue estampille ses lignes au moment de
+# l'écriture, pas à son début.
+SCHEMA_SQL = """
+    SELECT pg_advisory_xact_lock(hashtext('clean_watermarks'));
+    CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_at = clock_timestamp();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    CREATE TABLE IF NOT EXISTS clean_watermarks (
+        source TEXT PRIMARY KEY,
+        watermark TIMESTAMPTZ NOT NULL,
+        rows INT,
+        cleaned_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS performances_player_idx ON performances (player_id);
+""" + "".join(f"""
+    ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp();
+    CREATE INDEX IF NOT EXISTS {table}_updated_at_idx ON {table} (updated_at);
+    DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = '{table}_touch') THEN
+            CREATE TRIGGER {table}_touch BEFORE UPDATE ON {table}
+                FOR EACH ROW WHEN (OLD IS DISTINCT FROM NEW) EXECUTE FUNCTION touch_updated_at();
+        END IF;
+    END $$;
+""" for table in PRIMARY_KEYS)
+
+# Watermark du run : début du snapshot de lecture, ou plus tôt si une transaction
+# d'écriture est encore ouverte (ses lignes, invisibles ici, seront plus récentes
+# que son début). xact_start des autres sessions n'est visible que pour le même
+# utilisateur Postgres (ou pg_read_all_stats).
+WATERMARK_SQL = """
+    SELECT LEAST(now(), min(xact_start)) FROM pg_stat_activity
+    WHERE backend_xid IS NOT NULL AND pid <> pg_backend_pid()
+"""
+
+SAVE_WATERMARK_SQL = """
+    INSERT INTO clean_watermarks (source, watermark, rows) VALUES %s
+    ON CONFLICT (source) DO UPDATE
+    SET watermark = EXCLUDED.watermark, rows = EXCLUDED.rows, cleaned_at = now()
+"""
+
+
+# Tout est en place : pas de DDL (un ALTER TABLE attendrait la fin des transactions des scrapers)
+SCHEMA_READY_SQL = """
+    SELECT to_regclass('clean_watermarks') IS NOT NULL
+       AND to_regclass('performances_player_idx') IS NOT NULL
+       AND (SELECT count(*) FROM pg_trigger WHERE tgname = ANY(%s)) = %s
+"""
+
+
+def ensure_schema(conn):
+    """Colonnes updated_at, triggers et table des watermarks (idempotent)"""
+    triggers = [f"{table}_touch" for table in PRIMARY_KEYS]
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_READY_SQL, (triggers, len(triggers)))
+        if not cur.fetchone()[0]:
+            cur.execute(SCHEMA_SQL)
+    conn.commit()
+
+def load_watermarks(conn):
+    """{table source: watermark du dernier run réussi}"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT source, watermark FROM clean_watermarks")
+        return dict(cur.fetchall())
+
+def clean_tables_exist(conn):
+    """Tables *_clean présentes, avec toutes les colonnes de leur source (une colonne ajoutée à la
+    source, comme players.profile_url, impose une reconstruction : l'upsert ne la connaît pas)"""
+    with conn.cursor() as cur:
+        tables = [table for table, _ in OUTPUTS.values()] + [CANONICAL_OUTPUT[0]]
+        cur.execute("SELECT " + ", ".join(f"to_regclass('{table}') IS NOT NULL" for table in tables))
+        if not all(cur.fetchone()):
+            return False
+        for source, (table, _) in OUTPUTS.items():
+            columns = {name for name, _ in table_columns(cur, source)} - {WATERMARK_COLUMN}
+            if not columns <= {name for name, _ in table_columns(cur, table)}:
+                return False
+        return True
+
+def load_canonical(conn):
+    """Correspondance player_id → canonical_id du dernier run"""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT player_id, canonical_id FROM {CANONICAL_OUTPUT[0]}")
+        return pd.DataFrame(cur.fetchall(), columns=["player_id", "canonical_id"])
+
+def canonical_changed(previous, mapping):
+    """Un joueur déjà résolu change-t-il d'id canonique (deux groupes fusionnés) ?"""
+    if previous.empty:
+        return False
+    current = apply_mapping(previous["player_id"].to_numpy(), mapping)
+    return bool((current != previous["canonical_id"].to_numpy()).any())
 
-print(f" Players : {len(players_df)} lignes")
-print(f" Matches : {len(matches_df)} lignes")
-print(f" Performances : {len(performances_df)} lignes")
 
 # ===============================================================
-#  Nettoyage et standardisation
+#  Lecture par blocs et index des clés déjà vues
 # ===============================================================
+def read_chunks(conn, table, chunk_size=None, where=None, params=None):
+    """DataFrames successifs d'une table (éventuellement filtrée par `where`) : un seul sans
+    chunk_size, sinon des blocs de chunk_size lignes lus par un curseur serveur nommé"""
+    # Ordre de la clé primaire : le doublon gardé est toujours le plus ancien, quel que soit le mode
+    query = f"SELECT * FROM {table}" + (f" WHERE {where}" if where else "") + f" ORDER BY {PRIMARY_KEYS[table]}"
+    if not chunk_size:
+        yield pd.read_sql(query, conn, params=params).drop(columns=[WATERMARK_COLUMN], errors="ignore")
+        return
+    # Curseur nommé : Postgres garde le résultat, seul un bloc à la fois transite
+    with conn.cursor(name=f"clean_{table}") as cur:
+        cur.itersize = chunk_size
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            df = pd.DataFrame(rows, columns=[column.name for column in cur.description])
+            yield df.drop(columns=[WATERMARK_COLUMN], errors="ignore")
+
+def key_hashes(df, columns):
+    """Hash 64 bits des clés de chaque ligne (valeurs en texte : même hash d'un bloc à l'autre)"""
+    return pd.util.hash_pandas_object(df[columns].astype("string"), index=False).to_numpy()
 
-# ---- Supprimer doublons ----
-players_df.drop_duplicates(subset=['name'], inplace=True)
-matches_df.drop_duplicates(subset=['date', 'home_team', 'away_team'], inplace=True)
-performances_df.drop_duplicates(subset=['player_id', 'match_id'], inplace=True)
 
-# ---- Gérer valeurs manquantes ----
-players_df.fillna({'position': 'Position: Attaquant', 'current_club': 'Non défini', 'current_competition':'Non défini', 'current_pays_de_competition':'Non défini'}, inplace=True)
-matches_df.fillna({'competition': 'Inconnue'}, inplace=True)
-performances_df.fillna({'minutes_played': 0, 'goals': 0, 'assists': 0}, inplace=True)
+class KeyIndex:
+    """Ensemble compact d'entiers 64 bits (8 octets par clé) : tableaux triés fusionnés
+    par tailles doublantes, recherche par dichotomie dans chacun"""
 
-# ---- Uniformiser formats ----
-players_df['name'] = players_df['name'].str.strip().str.title()
-players_df['nationality'] = players_df['nationality'].str.strip().str.title()
-players_df['current_club'] = players_df['current_club'].str.strip().str.title()
-players_df['position'] = (players_df['position'].str.replace('Position:', '', regex=False).str.strip().str.lower())
+    def __init__(self):
+        self.runs = []
 
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
 
-matches_df['home_team'] = matches_df['home_team'].str.strip().str.title()
-matches_df['away_team'] = matches_df['away_team'].str.strip().str.title()
+    def contains(self, values):
+        found = np.zeros(len(values), dtype=bool)
+        for run in self.runs:
+            positions = np.searchsorted(run, values).clip(max=len(run) - 1)
+            found |= run[positions] == values
+        return found
 
-# ---- Conversion des dates ----
-players_df['birth_date'] = pd.to_datetime(players_df['birth_date'], errors='coerce')
-matches_df['date'] = pd.to_datetime(matches_df['date'], errors='coerce')
+    def add(self, values):
+        run = np.unique(np.asarray(values, dtype=np.uint64))
+        if not len(run):
+            return
+        # Fusion tant que le dernier tableau n'est pas deux fois plus grand : O(log n) tableaux
+        while self.runs and len(self.runs[-1]) <= 2 * len(run):
+            run = np.union1d(self.runs.pop(), run)
+        self.runs.append(run)
 
-# ---- Ajouter colonne saison ----
-matches_df['saison'] = matches_df['date'].apply(lambda d: f"{d.year}/{d.year+1}" if pd.notnull(d) else None)
+    def drop_seen(self, df, columns):
+        """Retire les lignes dont la clé est déjà vue (dans ce bloc ou un précédent), comme drop_duplicates"""
+        hashes = key_hashes(df, columns)
+        keep = ~(pd.Series(hashes).duplicated().to_numpy() | self.contains(hashes))
+        self.add(hashes[keep])
+        return df[keep]
 
-# ---- Enrichir performances avec position et club ----
-performances_df = performances_df.merge(
-    players_df[['player_id', 'position', 'current_club']],
-    on='player_id',
-    how='left'
-)
 
 # ===============================================================
-#  Tests de cohérence
+#  Nettoyage et standardisation
 # ===============================================================
+# Règles par table (valeurs manquantes, formats, dates, saison, enrichissement) : clean_transforms.py
+def clean_players(players_df):
+    return transform(players_df, PLAYERS)
+
+def clean_matches(matches_df):
+    return transform(matches_df, MATCHES)
+
+def clean_performances(performances_df, players_lookup):
+    return transform(performances_df, PERFORMANCES, players_lookup)
 
-invalid_perf = performances_df[
-    ~performances_df['player_id'].isin(players_df['player_id']) |
-    ~performances_df['match_id'].isin(matches_df['match_id'])
-]
-if len(invalid_perf) > 0:
-    print(f"⚠️ {len(invalid_perf)} performances non valides détectées (références inexistantes).")
-else:
-    print("✅ Toutes les performances ont des références valides.")
-
-# Vérification des scores
-if (matches_df['home_score'] < 0).any() or (matches_df['away_score'] < 0).any():
-    print("⚠️ Attention : certains scores sont négatifs.")
-else:
-    print("✅ Scores cohérents (>= 0).")
 
 # ===============================================================
-#  Sauvegarde des données nettoyées
+#  Sauvegarde des données nettoyées (au fil des blocs)
 # ===============================================================
+# Les CSV sont écrits à côté (.tmp) et ne remplacent les anciens qu'après le commit :
+# un run annulé laisse tables et CSV dans leur état précédent
+CSV_TMP_SUFFIX = ".tmp"
 
-# --- Créer moteur SQLAlchemy ---
-engine = create_engine(f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}")
 
-# --- Sauvegarde dans PostgreSQL ---
-players_df.to_sql("players_clean", engine, if_exists="replace", index=False)
-matches_df.to_sql("matches_clean", engine, if_exists="replace", index=False)
-performances_df.to_sql("performances_clean", engine, if_exists="replace", index=False)
+class CleanOutput:
+    """Table *_clean rechargée par COPY puis échangée en fin de run (bulk_writer), CSV écrit au fil des blocs"""
 
-# --- Sauvegarde en CSV ---
-os.makedirs("data", exist_ok=True)
-players_df.to_csv("data/players_clean.csv", index=False)
-matches_df.to_csv("data/matches_clean.csv", index=False)
-performances_df.to_csv("data/performances_clean.csv", index=False)
+    def __init__(self, conn, table, csv_path, key):
+        # Clé primaire : cible des upserts incrémentaux et de la clé étrangère de players_kpis
+        self.swap = TableSwap(conn, table, key=key)
+        self.table = table
+        self.csv_path = csv_path
+        self.key = key
+        self.rows = 0
 
-print("\n✅ Données nettoyées et enregistrées avec succès !")
-print("📁 Tables : players_clean, matches_clean, performances_clean")
-print("📂 CSV : data/players_clean.csv, data/matches_clean.csv, data/performances_clean.csv")
+    def write(self, df):
+        first = self.rows == 0
+        self.swap.write(df)
+        df.to_csv(self.csv_path + CSV_TMP_SUFFIX, index=False, mode="w" if first else "a", header=first)
+        self.rows += len(df)
 
-# ===============================================================
-#  Fermeture de la connexion
-# ===============================================================
-conn.close()
+    def finish(self, conn):
+        self.swap.swap()
+
+    def publish(self):
+        """Après le commit : le CSV du run remplace l'ancien"""
+        if os.path.exists(self.csv_path + CSV_TMP_SUFFIX):
+            os.replace(self.csv_path + CSV_TMP_SUFFIX, self.csv_path)
+
+
+class UpsertOutput:
+    """Table *_clean mise à jour par clé primaire (mode incrémental) ; CSV réexporté en fin de run"""
+
+    def __init__(self, conn, table, csv_path, key):
+        self.conn = conn
+        self.table = table
+        self.csv_path = csv_path
+        self.key = key
+        self.rows = 0
+
+    def write(self, df):
+        if df.empty:
+            return
+        columns = ", ".join(f'"{column}"' for column in df.columns)
+        updates = ", ".join(f'"{column}" = EXCLUDED."{column}"' for column in df.columns if column != self.key)
+        values = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        with self.conn.cursor() as cur:
+            execute_values(cur, f"INSERT INTO {self.table} ({columns}) VALUES %s "
+                                f"ON CONFLICT ({self.key}) DO UPDATE SET {updates}", list(values), page_size=1000)
+        self.rows += len(df)
+
+    def finish(self, conn):
+        """CSV de la table complète, exporté côté serveur (COPY), seulement si elle a changé"""
+        if not self.rows and os.path.exists(self.csv_path):
+            return
+        export_csv(conn, f"SELECT * FROM {self.table} ORDER BY {self.key}", self.csv_path + CSV_TMP_SUFFIX)
+
+    def publish(self):
+        if os.path.exists(self.csv_path + CSV_TMP_SUFFIX):
+            os.replace(self.csv_path + CSV_TMP_SUFFIX, self.csv_path)
+
+
+def drop_orphan_kpis(conn, players_output):
+    """Supprime de players_kpis les joueurs absents du nouveau players_clean (doublons regroupés,
+    joueurs supprimés) : la clé étrangère recréée par le swap échouerait sinon ; compute_kpis_csv.py
+    recalcule les KPIs des joueurs canoniques sur les performances rattachées"""
+    staging = players_output.swap
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('players_kpis') IS NOT NULL")
+        if staging.columns is None or not cur.fetchone()[0]:
+            return 0
+        cur.execute(f"DELETE FROM players_kpis k WHERE NOT EXISTS "
+                    f"(SELECT 1 FROM {staging.staging} p WHERE p.player_id = k.player_id)")
+        return cur.rowcount
+
+
+def lookup_frame(rows):
+    """Référentiel joueurs (id, position, club) ; player_id entier même vide, pour la jointure"""
+    return pd.DataFrame(rows, columns=['player_id', 'position', 'current_club']).astype({'player_id': 'int64'})
+
+def known_ids(conn, table, key, ids):
+    """Ids parmi `ids` présents dans une table *_clean (contrôle des références en incrémental)"""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {key} FROM {table} WHERE {key} = ANY(%s)", ([int(i) for i in ids],))
+        return np.array([row[0] for row in cur.fetchall()], dtype=np.int64)
+
+
+# Lignes du bloc dont la clé de doublon est déjà dans performances_clean sous un perf_id plus ancien
+EXISTING_PERF_SQL = """
+    SELECT k.perf_id FROM unnest(%s::int[], %s::int[], %s::int[], %s::text[]) AS k(perf_id, player_id, match_id, saison)
+    WHERE EXISTS (SELECT 1 FROM performances_clean p
+                  WHERE p.player_id = k.player_id AND p.perf_id < k.perf_id
+                    AND p.match_id IS NOT DISTINCT FROM k.match_id AND p.saison IS NOT DISTINCT FROM k.saison)
+"""
+
+def drop_existing(conn, df):
+    """Retire (et supprime de performances_clean) les performances déjà présentes sous un id plus
+    ancien, comme le ferait la reconstruction complète (ex. celles d'un nouveau doublon de joueur)"""
+    if df.empty:
+        return df
+    columns = [[None if pd.isna(value) else value for value in df[column]]
+               for column in ["perf_id", "player_id", "match_id", "saison"]]
+    columns[:3] = [[None if value is None else int(value) for value in column] for column in columns[:3]]
+    with conn.cursor() as cur:
+        cur.execute(EXISTING_PERF_SQL, columns)
+        duplicates = [row[0] for row in cur.fetchall()]
+        if duplicates:
+            cur.execute("DELETE FROM performances_clean WHERE perf_id = ANY(%s)", (duplicates,))
+    return df[~df['perf_id'].isin(duplicates)]
+
+
+# Matchs du bloc (clé brute, comme drop_seen) : doublons d'un match plus ancien déjà dans matches_clean,
+# et matchs plus récents de matches_clean devenus leurs doublons
+MATCH_KEYS_SQL = "unnest(%s::int[], %s::date[], %s::text[], %s::text[]) AS k(match_id, date, home_team, away_team)"
+SAME_MATCH_SQL = """m.date IS NOT DISTINCT FROM k.date AND m.home_team IS NOT DISTINCT FROM k.home_team
+                    AND m.away_team IS NOT DISTINCT FROM k.away_team"""
+EXISTING_MATCH_SQL = f"""
+    SELECT k.match_id FROM {MATCH_KEYS_SQL}
+    WHERE EXISTS (SELECT 1 FROM matches m JOIN matches_clean c ON c.match_id = m.match_id
+                  WHERE m.match_id < k.match_id AND {SAME_MATCH_SQL})
+"""
+NEWER_MATCH_SQL = f"""
+    DELETE FROM matches_clean c USING matches m, {MATCH_KEYS_SQL}
+    WHERE c.match_id = m.match_id AND m.match_id > k.match_id AND {SAME_MATCH_SQL}
+"""
+
+def match_keys(df):
+    """Colonnes (match_id, date, home_team, away_team) du bloc en listes pour MATCH_KEYS_SQL"""
+    columns = [[None if pd.isna(value) else value for value in df[column]]
+               for column in ["match_id", "date", "home_team", "away_team"]]
+    columns[0] = [int(value) for value in columns[0]]
+    return columns
+
+def drop_existing_matches(conn, df, dropped=()):
+    """Retire (et supprime de matches_clean) les matchs déjà présents sous un id plus ancien, avec ceux
+    déjà retirés du bloc (`dropped`), puis supprime les matchs plus récents devenus doublons de ceux du
+    bloc : mêmes lignes que la reconstruction complète. Retourne (bloc, lignes supprimées)"""
+    dropped = [int(value) for value in dropped]
+    if df.empty and not dropped:
+        return df, 0
+    with conn.cursor() as cur:
+        cur.execute(EXISTING_MATCH_SQL, match_keys(df))
+        duplicates = [row[0] for row in cur.fetchall()]
+        df = df[~df['match_id'].isin(duplicates)]
+        cur.execute("DELETE FROM matches_clean WHERE match_id = ANY(%s)", (duplicates + dropped,))
+        deleted = cur.rowcount
+        cur.execute(NEWER_MATCH_SQL, match_keys(df))
+        deleted += cur.rowcount
+    return df, deleted
+
+
+def run_cleaning(chunk_size=None, incremental=False):
+    """Nettoie players, matches puis performances ; chunk_size : lecture par blocs (curseurs serveur) ;
+    incremental : seulement les lignes modifiées depuis le dernier run, upsertées dans les *_clean"""
+    try:
+        conn = get_connection()
+        writer = get_connection()
+        print("Connexion PostgreSQL réussie !")
+    except Exception as e:
+        print("❌ Erreur de connexion :", e)
+        exit()
+
+    ensure_schema(writer)
+    # Un seul snapshot pour toutes les lectures : le watermark correspond exactement à ce qui est lu
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    with conn.cursor() as cur:
+        cur.execute(WATERMARK_SQL)
+        watermark = cur.fetchone()[0]
+    since = load_watermarks(writer) if incremental else {}
+    if incremental and not (all(source in since for source in PRIMARY_KEYS) and clean_tables_exist(writer)):
+        print("ℹ️  Pas de watermark pour toutes les tables (ou tables *_clean d'un ancien schéma) : reconstruction complète")
+        incremental = False
+
+    # Résolution des doublons sur tous les joueurs (un nouveau peut doubler un ancien) :
+    # colonnes d'identité seules, dans le même snapshot que les lectures qui suivent
+    identities = pd.read_sql("SELECT player_id, name, birth_date FROM players ORDER BY player_id", conn)
+    mapping, counts = resolve_players(identities)
+    del identities
+    print(f"🧬 Joueurs : {counts['merged']} doublons regroupés ({counts['pairs']} paires comparées)")
+    if incremental and canonical_changed(load_canonical(writer), mapping):
+        # Les lignes déjà écrites sous l'ancien id canonique seraient à réécrire
+        print("ℹ️  Des groupes de joueurs ont fusionné : reconstruction complète")
+        incremental = False
+
+    os.makedirs("data", exist_ok=True)
+    if incremental:
+        outputs = {source: UpsertOutput(writer, *OUTPUTS[source], PRIMARY_KEYS[source]) for source in OUTPUTS}
+    else:
+        outputs = {source: CleanOutput(writer, *OUTPUTS[source], PRIMARY_KEYS[source]) for source in OUTPUTS}
+    canonical_output = CleanOutput(writer, *CANONICAL_OUTPUT, "player_id")
+    canonical_output.write(mapping)
+    mode = f"par blocs de {chunk_size} lignes" if chunk_size else "tables entières"
+    if incremental:
+        mode = f"incrémental depuis {min(since.values()):%Y-%m-%d %H:%M:%S}, {mode}"
+    print(f"🧹 Nettoyage ({mode})")
+
+    def changed(source):
+        """Filtre des lignes modifiées depuis le dernier run (aucun en reconstruction complète)"""
+        if not incremental:
+            return {}
+        return {"where": f"{WATERMARK_COLUMN} >= %(since)s", "params": {"since": since[source]}}
+
+    # ---- Players : le référentiel (id, position, club) sert à enrichir les performances ----
+    # Seul le joueur canonique de chaque groupe est gardé (le plus ancien, comme drop_duplicates)
+    lookups = []
+    read = 0
+    for chunk in read_chunks(conn, "players", chunk_size, **changed("players")):
+        read += len(chunk)
+        ids = chunk['player_id'].to_numpy()
+        chunk = clean_players(chunk[apply_mapping(ids, mapping) == ids])
+        lookups.append(chunk[['player_id', 'position', 'current_club']])
+        outputs["players"].write(chunk)
+    players_lookup = pd.concat(lookups, ignore_index=True) if lookups else lookup_frame([])
+    print(f" Players : {read} lignes")
+
+    # ---- Matches : seuls les ids sont gardés pour les tests de cohérence ----
+    seen = KeyIndex()
+    match_ids = KeyIndex()
+    negative_scores = False
+    read = 0
+    removed = 0
+    for chunk in read_chunks(conn, "matches", chunk_size, **changed("matches")):
+        read += len(chunk)
+        kept = seen.drop_seen(chunk, DEDUP_KEYS["matches"])
+        if incremental:
+            # Doublons avec les matchs déjà nettoyés (pas seulement entre matchs modifiés)
+            kept, deleted = drop_existing_matches(writer, kept, chunk['match_id'][~chunk.index.isin(kept.index)])
+            removed += deleted
+        chunk = clean_matches(kept)
+        match_ids.add(chunk['match_id'].dropna().astype('int64').to_numpy())
+        negative_scores |= bool((chunk['home_score'] < 0).any() or (chunk['away_score'] < 0).any())
+        outputs["matches"].write(chunk)
+    print(f" Matches : {read} lignes" + (f" ({removed} doublons retirés de matches_clean)" if removed else ""))
+
+    # ---- Performances ----
+    # En incrémental : performances modifiées + celles des joueurs modifiés (position, club à ré-enrichir)
+    perf_filter = changed("performances")
+    if incremental:
+        # ... y compris celles enregistrées sous l'id d'un doublon de ces joueurs
+        members = mapping.loc[mapping['canonical_id'].isin(players_lookup['player_id']), 'player_id']
+        perf_filter["where"] += " OR player_id = ANY(%(players)s)"
+        perf_filter["params"]["players"] = [int(i) for i in members]
+    seen = KeyIndex()
+    player_ids = players_lookup['player_id'].astype('int64').to_numpy()
+    invalid = 0
+    read = 0
+    for chunk in read_chunks(conn, "performances", chunk_size, **perf_filter):
+        read += len(chunk)
+        # Performances d'un doublon rattachées au joueur canonique (puis doublons de performances retirés)
+        chunk['player_id'] = apply_mapping(chunk['player_id'].to_numpy(), mapping)
+        chunk = seen.drop_seen(chunk, DEDUP_KEYS["performances"])
+        if incremental:
+            chunk = drop_existing(writer, chunk)
+        has_match = chunk['match_id'].notna().to_numpy()
+        chunk_match_ids = chunk['match_id'][has_match].astype('int64').to_numpy()
+        if incremental:
+            # Référentiels lus dans les *_clean (mises à jour de ce run comprises)
+            player_ids = known_ids(writer, "players_clean", "player_id", chunk['player_id'].dropna().unique())
+            with writer.cursor() as cur:
+                cur.execute("SELECT player_id, position, current_club FROM players_clean WHERE player_id = ANY(%s)",
+                            ([int(i) for i in player_ids],))
+                players_lookup = lookup_frame(cur.fetchall())
+            match_valid_ids = np.isin(chunk_match_ids, known_ids(writer, "matches_clean", "match_id", np.unique(chunk_match_ids)))
+        else:
+            match_valid_ids = match_ids.contains(chunk_match_ids.astype(np.uint64))
+        chunk = clean_performances(chunk, players_lookup)
+        match_valid = np.zeros(len(chunk), dtype=bool)
+        match_valid[has_match] = match_valid_ids
+        invalid += int((~chunk['player_id'].isin(player_ids).to_numpy() | ~match_valid).sum())
+        outputs["performances"].write(chunk)
+    print(f" Performances : {read} lignes")
+
+    # ---- Échange des tables, puis watermarks : tout est visible au même commit ----
+    orphans = 0 if incremental else drop_orphan_kpis(writer, outputs["players"])
+    for output in outputs.values():
+        output.finish(writer)
+    canonical_output.finish(writer)
+    with writer.cursor() as cur:
+        execute_values(cur, SAVE_WATERMARK_SQL, [(source, watermark, outputs[source].rows) for source in PRIMARY_KEYS])
+    writer.commit()
+    # CSV remplacés seulement une fois le commit passé
+    for output in [*outputs.values(), canonical_output]:
+        output.publish()
+    if orphans:
+        print(f"ℹ️  {orphans} KPIs de joueurs regroupés ou supprimés retirés de players_kpis (relancer compute_kpis_csv.py)")
+
+    # ===============================================================
+    #  Tests de cohérence
+    # ===============================================================
+    if invalid > 0:
+        print(f"⚠️ {invalid} performances non valides détectées (références inexistantes).")
+    else:
+        print("✅ Toutes les performances ont des références valides.")
+
+    # Vérification des scores
+    if negative_scores:
+        print("⚠️ Attention : certains scores sont négatifs.")
+    else:
+        print("✅ Scores cohérents (>= 0).")
+
+    print("\n✅ Données nettoyées et enregistrées avec succès !")
+    print(f"📁 Tables : {', '.join(output.table for output in outputs.values())} "
+          f"({', '.join(str(output.rows) for output in outputs.values())} lignes"
+          + (" mises à jour)" if incremental else ")"))
+    print(f"📂 CSV : {', '.join(output.csv_path for output in outputs.values())}")
+    print(f"🔖 Watermark : {watermark:%Y-%m-%d %H:%M:%S}")
+
+    # ===============================================================
+    #  Fermeture de la connexion
+    # ===============================================================
+    conn.close()
+    writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nettoyage des tables players, matches et performances")
+    parser.add_argument("--chunked", action="store_true", help="lire par blocs via des curseurs serveur (mémoire bornée)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="lignes par bloc en mode --chunked")
+    parser.add_argument("--incremental", action="store_true", help="ne nettoyer que les lignes modifiées depuis le dernier run (upsert)")
+    parser.add_argument("--full", action="store_true", help="reconstruire les tables *_clean (annule --incremental)")
+    args = parser.parse_args()
+
+    run_cleaning(args.chunk_size if args.chunked else None, args.incremental and not args.full)
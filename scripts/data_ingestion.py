@@ -1,15 +1,31 @@
-import requests
-import os
+import argparse
+import gzip
 import json
-from dotenv import load_dotenv
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from api_quota import (
+    DEFAULT_PER_DAY, DEFAULT_PER_MINUTE, PLAN_PATH, IngestionPlan, QuotaExhausted, QuotaScheduler, current_season,
+    next_reset,
+)
+from landing_zone import LandingZone
+from rate_limit import parse_retry_after
+from telemetry import metrics
+
 # Charger les variables d'environnement
 load_dotenv()
 
 API_KEY = os.getenv("RAPIDAPI_KEY")
 
-BASE_URL = "https://api-football-v1.p.rapidapi.com/v3/"
+# Surchargeable pour viser le faux API local (mock_api_football.py)
+BASE_URL = os.getenv("API_FOOTBALL_BASE_URL", "https://api-football-v1.p.rapidapi.com/v3/")
 RAW_DIR = Path("data/raw")
 RAW_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -18,24 +34,214 @@ HEADERS = {
     "X-RapidAPI-Host": "api-football-v1.p.rapidapi.com"
 }
 
+# ===============================================================
+#  Ingestion API-Football : toutes les pages, ligues × saisons
+# ===============================================================
+# La page 1 de chaque couple (ligue, saison) donne paging.total ; les pages
+# suivantes partent aussitôt, en parallèle, sur une session à connexions
+# réutilisées. Chaque page est écrite en JSON compact, une ligne par joueur,
+# compressé gzip : players_league<l>_season<s>_page<p>.ndjson.gz
+# Les requêtes passent par le planificateur de quotas (api_quota.py) : saison
+# en cours d'abord, arrêt propre au quota du jour, reprise le lendemain.
+#   python scripts/data_ingestion.py --leagues 39,61,140 --seasons 2015-2024 --concurrency 8
+
+DEFAULT_LEAGUES = "39"
+DEFAULT_SEASONS = "2020"
+DEFAULT_CONCURRENCY = 8
+MAX_RETRIES = 3
+TIMEOUT = 30
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class ApiError(Exception):
+    """Réponse inexploitable de l'API (code HTTP ou champ `errors` non vide)"""
 
-def fetch_players(league_id=39, season=2020, page=1):
-    """Récupère les joueurs d'une ligue et saison"""
+
+def parse_ids(text):
+    """« 39,61,2015-2017 » → [39, 61, 2015, 2016, 2017]"""
+    ids = []
+    for item in str(text).split(","):
+        item = item.strip()
+        if "-" in item:
+            first, last = (int(value) for value in item.split("-"))
+            ids.extend(range(first, last + 1))
+        elif item:
+            ids.append(int(item))
+    return list(dict.fromkeys(ids))
+
+def make_session(concurrency=DEFAULT_CONCURRENCY):
+    """Session partagée par les threads, avec autant de connexions gardées ouvertes que de threads"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+def page_path(league_id, season, page, raw_dir=RAW_DIR):
+    return Path(raw_dir) / f"players_league{league_id}_season{season}_page{page}.ndjson.gz"
+
+def write_page(data, path):
+    """Une ligne JSON compacte par entrée de `response`, gzip, écriture atomique"""
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        for item in data.get("response", []):
+            f.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+    os.replace(tmp, path)
+    return path
+
+def get_page(session, league_id, season, page, retries=MAX_RETRIES, scheduler=None):
+    """GET /players avec nouvelles tentatives (429/5xx/timeout, Retry-After respecté) ;
+    avec `scheduler`, chaque tentative attend sa place dans les quotas (QuotaExhausted sinon)"""
     url = f"{BASE_URL}players"
     params = {"league": league_id, "season": season, "page": page}
-    r = requests.get(url, headers=HEADERS, params=params)
-    if r.status_code == 200:
-        data = r.json()
-        file_path = RAW_DIR / f"players_league{league_id}_season{season}_page{page}.json"
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        print(f"✅ Données sauvegardées dans {file_path}")
+    for attempt in range(1, retries + 1):
+        if scheduler:
+            scheduler.acquire()
+        start = time.perf_counter()
+        try:
+            r = session.get(url, params=params, timeout=TIMEOUT)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            metrics.observe_request("api_players", time.perf_counter() - start, 0, "timeout")
+            if attempt == retries:
+                raise ApiError(f"{type(e).__name__} après {retries} tentatives") from e
+            metrics.count_retry("api_players")
+            metrics.sleep(2 ** attempt, "retry")
+            continue
+        metrics.observe_request("api_players", time.perf_counter() - start, len(r.content), r.status_code)
+        if scheduler:
+            scheduler.observe(r.headers, r.status_code)
+        if r.status_code in RETRY_STATUSES and attempt < retries:
+            metrics.count_retry("api_players")
+            # Sur 429, le planificateur fait déjà attendre tous les threads
+            if not (scheduler and r.status_code == 429):
+                hold = parse_retry_after(r.headers.get("Retry-After"))
+                metrics.sleep(2 ** attempt if hold is None else hold, "retry")
+            continue
+        if r.status_code != 200:
+            raise ApiError(f"Erreur {r.status_code}: {r.text[:200]}")
+        try:
+            data = r.json()
+        except ValueError as e:
+            # 200 avec un corps non JSON (page d'erreur d'un proxy, réponse tronquée)
+            raise ApiError(f"Réponse non JSON: {r.text[:200]}") from e
+        # L'API répond 200 avec un champ `errors` rempli (clé invalide, page hors limites...)
+        if data.get("errors"):
+            raise ApiError(f"Erreurs API: {data['errors']}")
         return data
-    else:
-        print(f"❌ Erreur {r.status_code}: {r.text}")
+
+def fetch_players(league_id=39, season=2020, page=1, session=None, raw_dir=RAW_DIR):
+    """Récupère une page de joueurs d'une ligue et saison, l'écrit en .ndjson.gz"""
+    try:
+        data = get_page(session or make_session(1), league_id, season, page)
+    except ApiError as e:
+        print(f"❌ {e}")
         return None
+    file_path = write_page(data, page_path(league_id, season, page, raw_dir))
+    print(f"✅ Données sauvegardées dans {file_path}")
+    return data
+
+def ingest(leagues, seasons, concurrency=DEFAULT_CONCURRENCY, force=False, raw_dir=RAW_DIR, scheduler=None, plan=None):
+    """Pages restantes du plan (toutes les ligues × saisons sans plan sauvegardé), par priorité ;
+    retourne les compteurs du run et les échecs. S'arrête proprement au quota du jour."""
+    raw_dir = Path(raw_dir)
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    plan = plan or IngestionPlan(leagues, seasons, path=None)
+    if force:
+        plan.reset()
+    session = make_session(concurrency)
+    # Pages déjà présentes, en vrac ou compactées dans un segment
+    zone = LandingZone(raw_dir)
+    counts = {"pages": 0, "players": 0, "existing": 0, "failed": 0}
+    failures = []
+    exhausted = False
+
+    def one(league_id, season, page):
+        data = get_page(session, league_id, season, page, scheduler=scheduler)
+        write_page(data, page_path(league_id, season, page, raw_dir))
+        return data
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        running = {}
+        while True:
+            # Pas plus de requêtes en vol que de threads : la priorité du plan est respectée
+            while not exhausted and len(running) < concurrency:
+                task = plan.next_task()
+                if task is None:
+                    break
+                league_id, season, page = task
+                known = plan.totals.get(f"{league_id}:{season}")
+                # Page d'un run sans plan : déjà là (la page 1 n'est sautée que si le total est connu)
+                if not force and (page > 1 or known) and zone.exists(page_path(league_id, season, page).name):
+                    counts["existing"] += 1
+                    plan.complete(task)
+                    continue
+                running[pool.submit(one, *task)] = task
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                league_id, season, page = task
+                try:
+                    data = future.result()
+                except QuotaExhausted:
+                    exhausted = True
+                    plan.release(task)
+                    continue
+                except Exception as e:
+                    # ApiError, mais aussi écriture du fichier ou autre erreur requests : la page seule échoue
+                    reason = str(e) if isinstance(e, ApiError) else f"{type(e).__name__}: {e}"
+                    counts["failed"] += 1
+                    failures.append((league_id, season, page, reason))
+                    plan.fail(task)
+                    print(f"   ❌ Ligue {league_id} saison {season} page {page}: {reason}")
+                    continue
+                counts["pages"] += 1
+                counts["players"] += data.get("results", len(data.get("response", [])))
+                total = data.get("paging", {}).get("total", 1)
+                if page == 1 and total != plan.totals.get(f"{league_id}:{season}"):
+                    print(f"   📄 Ligue {league_id} saison {season}: {total} pages")
+                plan.complete(task, total if page == 1 else None)
+                if counts["pages"] % 50 == 0:
+                    plan.save()
+    session.close()
+    if scheduler:
+        plan.usage = {"day": scheduler.day, "requests": scheduler.used}
+    plan.save()
+    counts["exhausted"] = exhausted
+    return counts, failures
 
 
 if __name__ == "__main__":
-    print("Récupération des joueurs (Premier League 2020)...")
-    fetch_players(league_id=39, season=2020)
+    parser = argparse.ArgumentParser(description="Ingestion paginée des joueurs API-Football")
+    parser.add_argument("--leagues", default=DEFAULT_LEAGUES, help="ids de ligues, ex. 39,61,140")
+    parser.add_argument("--seasons", default=DEFAULT_SEASONS, help="saisons, ex. 2015-2024")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="requêtes en parallèle")
+    parser.add_argument("--force", action="store_true", help="re-télécharger les pages déjà présentes")
+    parser.add_argument("--per-minute", type=int, default=DEFAULT_PER_MINUTE, help="quota par minute (recalé sur les en-têtes)")
+    parser.add_argument("--per-day", type=int, default=DEFAULT_PER_DAY, help="quota par jour (recalé sur les en-têtes)")
+    parser.add_argument("--reserve", type=int, default=0, help="requêtes du jour à ne pas consommer")
+    parser.add_argument("--current-season", type=int, default=current_season(), help="saison prioritaire")
+    parser.add_argument("--plan", default=str(PLAN_PATH), help="plan sauvegardé (reprise le lendemain)")
+    args = parser.parse_args()
+
+    leagues, seasons = parse_ids(args.leagues), parse_ids(args.seasons)
+    plan = IngestionPlan(leagues, seasons, args.plan, current=args.current_season)
+    scheduler = QuotaScheduler(args.per_minute, args.per_day, plan.usage["requests"], args.reserve)
+    print(f"Récupération des joueurs: ligues {leagues}, saisons {seasons} ({args.concurrency} requêtes en parallèle)...")
+    print(f"   {plan.estimate(args.per_minute, args.per_day, plan.usage['requests'])}")
+    metrics.reset()
+    start = time.perf_counter()
+    counts, failures = ingest(leagues, seasons, args.concurrency, args.force, scheduler=scheduler, plan=plan)
+    elapsed = time.perf_counter() - start
+    metrics.add_sleep("quota", scheduler.waited)
+    print(f"✅ {counts['pages']} pages ({counts['players']} joueurs) en {elapsed:.1f}s | "
+          f"{counts['existing']} déjà présentes | {counts['failed']} en échec")
+    print(f"   {scheduler.summary()}")
+    if counts["exhausted"]:
+        print(f"   ⏸️  Quota du jour atteint : relancer après {next_reset():%Y-%m-%d %H:%M} UTC pour reprendre le plan")
+    print(f"   {plan.estimate(scheduler.per_minute, scheduler.per_day, scheduler.used)}")
+    print(f"   {metrics.report()}")
+    print(f"   📈 Télémétrie: {metrics.write('api_football', extra={**counts, 'failures': failures})}")
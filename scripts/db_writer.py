@@ -0,0 +1,234 @@
+from psycopg2.extras import execute_values
+
+from telemetry import metrics
+
+# ===============================================================
+#  Écriture groupée des joueurs scrapés (players + performances)
+# ===============================================================
+# Les enregistrements sont accumulés puis vidés tous les `batch_size`
+# joueurs : un seul INSERT multi-lignes vers une table de staging
+# temporaire, puis deux INSERT ... ON CONFLICT ensemblistes et un commit.
+# Une ligne performances agrégée (match_id NULL) par joueur et par saison
+# (« career » pour la carrière complète, « 2025/2026 » pour une saison),
+# plus le détail par saison, compétition et club dans performances_competition.
+# Un joueur est identifié par l'URL de son profil (pas par son nom : deux
+# homonymes sont deux joueurs) ; les lignes d'avant la colonne profile_url
+# sont rattachées à leur URL par nom et date de naissance compatible.
+
+DEFAULT_BATCH_SIZE = 25
+
+CAREER = "career"
+
+PLAYER_FIELDS = [
+    "name", "birth_date", "nationality", "position", "current_club",
+    "current_competition", "current_pays_de_competition",
+]
+
+SCHEMA_SQL = """
+    ALTER TABLE players ADD COLUMN IF NOT EXISTS profile_url TEXT;
+    DROP INDEX IF EXISTS players_name_key;
+    CREATE UNIQUE INDEX IF NOT EXISTS players_profile_url_key ON players (profile_url);
+    ALTER TABLE performances ADD COLUMN IF NOT EXISTS saison TEXT;
+    UPDATE performances SET saison = 'career' WHERE match_id IS NULL AND saison IS NULL;
+    DROP INDEX IF EXISTS performances_aggregate_key;
+    CREATE UNIQUE INDEX IF NOT EXISTS performances_saison_key
+        ON performances (player_id, saison) WHERE match_id IS NULL;
+    CREATE TABLE IF NOT EXISTS performances_competition (
+        player_id INT NOT NULL REFERENCES players(player_id),
+        saison TEXT NOT NULL,
+        competition TEXT NOT NULL,
+        club TEXT NOT NULL DEFAULT '',
+        matches_played INT,
+        goals INT,
+        assists INT,
+        minutes_played INT,
+        PRIMARY KEY (player_id, saison, competition, club)
+    );
+"""
+
+STAGE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS scraped_players_stage (
+        seq INT,
+        profile_url TEXT,
+        name TEXT,
+        birth_date DATE,
+        nationality TEXT,
+        position TEXT,
+        current_club TEXT,
+        current_competition TEXT,
+        current_pays_de_competition TEXT,
+        saison TEXT,
+        minutes_played INT,
+        goals INT,
+        assists INT
+    ) ON COMMIT DELETE ROWS;
+    CREATE TEMP TABLE IF NOT EXISTS scraped_competitions_stage (
+        seq INT,
+        profile_url TEXT,
+        saison TEXT,
+        competition TEXT,
+        club TEXT,
+        matches_played INT,
+        goals INT,
+        assists INT,
+        minutes_played INT
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Lignes créées avant profile_url : même nom, date de naissance compatible, URL pas encore en base
+ATTACH_PROFILES_SQL = """
+    UPDATE players p SET profile_url = s.profile_url
+    FROM (SELECT DISTINCT ON (profile_url) profile_url, name, birth_date
+          FROM scraped_players_stage ORDER BY profile_url, seq DESC) s
+    WHERE p.profile_url IS NULL AND p.name = s.name
+      AND (p.birth_date IS NULL OR s.birth_date IS NULL OR p.birth_date = s.birth_date)
+      AND NOT EXISTS (SELECT 1 FROM players q WHERE q.profile_url = s.profile_url)
+"""
+
+MERGE_PLAYERS_SQL = """
+    INSERT INTO players (profile_url, name, birth_date, nationality, position, current_club,
+                         current_competition, current_pays_de_competition)
+    SELECT DISTINCT ON (profile_url)
+           profile_url, name, birth_date, nationality, position, current_club,
+           current_competition, current_pays_de_competition
+    FROM scraped_players_stage
+    ORDER BY profile_url, seq DESC
+    ON CONFLICT (profile_url) DO UPDATE
+    SET name = EXCLUDED.name,
+        birth_date = COALESCE(EXCLUDED.birth_date, players.birth_date),
+        nationality = COALESCE(EXCLUDED.nationality, players.nationality),
+        position = COALESCE(EXCLUDED.position, players.position),
+        current_club = COALESCE(EXCLUDED.current_club, players.current_club),
+        current_competition = COALESCE(EXCLUDED.current_competition, players.current_competition),
+        current_pays_de_competition = COALESCE(EXCLUDED.current_pays_de_competition, players.current_pays_de_competition)
+"""
+
+MERGE_PERFORMANCES_SQL = """
+    INSERT INTO performances (player_id, match_id, saison, minutes_played, goals, assists)
+    SELECT DISTINCT ON (p.player_id, s.saison)
+           p.player_id, NULL, s.saison, s.minutes_played, s.goals, s.assists
+    FROM scraped_players_stage s
+    JOIN players p ON p.profile_url = s.profile_url
+    WHERE s.saison IS NOT NULL
+    ORDER BY p.player_id, s.saison, s.seq DESC
+    ON CONFLICT (player_id, saison) WHERE match_id IS NULL DO UPDATE
+    SET minutes_played = EXCLUDED.minutes_played,
+        goals = EXCLUDED.goals,
+        assists = EXCLUDED.assists
+"""
+
+MERGE_COMPETITIONS_SQL = """
+    INSERT INTO performances_competition (player_id, saison, competition, club,
+                                          matches_played, goals, assists, minutes_played)
+    SELECT DISTINCT ON (p.player_id, s.saison, s.competition, s.club)
+           p.player_id, s.saison, s.competition, s.club,
+           s.matches_played, s.goals, s.assists, s.minutes_played
+    FROM scraped_competitions_stage s
+    JOIN players p ON p.profile_url = s.profile_url
+    ORDER BY p.player_id, s.saison, s.competition, s.club, s.seq DESC
+    ON CONFLICT (player_id, saison, competition, club) DO UPDATE
+    SET matches_played = EXCLUDED.matches_played,
+        goals = EXCLUDED.goals,
+        assists = EXCLUDED.assists,
+        minutes_played = EXCLUDED.minutes_played
+"""
+
+COMPETITION_FIELDS = ["saison", "competition", "club", "matches_played", "goals", "assists", "minutes_played"]
+
+
+def ensure_schema(conn):
+    """Index uniques nécessaires aux ON CONFLICT (idempotent)"""
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_SQL)
+    conn.commit()
+
+
+class PlayerBuffer:
+    """Tampon des joueurs scrapés, vidé en base par lots"""
+
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE, checkpoints=None, freshness=None):
+        self.conn = conn
+        self.batch_size = batch_size
+        # Statuts de reprise et fraîcheur écrits dans la même transaction que le lot
+        self.checkpoints = checkpoints
+        self.freshness = freshness
+        self.stores = [store for store in (checkpoints, freshness) if store is not None]
+        self.rows = []
+        self.competition_rows = []
+        self.players = 0
+        self.seq = 0
+        self.written = 0
+        self.flushes = 0
+        ensure_schema(conn)
+
+    def add(self, info, stats=None, url=None):
+        """Ajoute un joueur (url : son profil, clé en base) et ses stats par saison ({saison: stats}),
+        vide le tampon s'il est plein"""
+        url = url or (info or {}).get('url')
+        if not info or not info.get('name') or not url:
+            print("   ⚠️  Informations incomplètes")
+            return
+        player = (url,) + tuple(info.get(field) for field in PLAYER_FIELDS)
+        # Une ligne de staging par saison, ou une seule sans stats (joueur seul)
+        for saison, values in (stats or {None: None}).items():
+            self.seq += 1
+            self.rows.append(
+                (self.seq,)
+                + player
+                + (
+                    saison,
+                    values["minutes_played"] if values else None,
+                    values["goals"] if values else None,
+                    values["assists"] if values else None,
+                )
+            )
+            # Détail par compétition (la carrière et les saisons se recouvrent : dédoublonné à la fusion)
+            for record in (values or {}).get("competitions") or []:
+                if record.get("saison"):
+                    self.competition_rows.append(
+                        (self.seq, url) + tuple(record.get(field) for field in COMPETITION_FIELDS)
+                    )
+        self.players += 1
+        if self.players >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Écrit le tampon en une transaction : staging + fusion ensembliste (+ reprise, fraîcheur)"""
+        if not self.rows:
+            for store in self.stores:
+                store.flush()
+            return
+        try:
+            with metrics.timed("db", "flush"):
+                with self.conn.cursor() as cur:
+                    cur.execute(STAGE_SQL)
+                    execute_values(cur, "INSERT INTO scraped_players_stage VALUES %s", self.rows, page_size=len(self.rows))
+                    cur.execute(ATTACH_PROFILES_SQL)
+                    cur.execute(MERGE_PLAYERS_SQL)
+                    cur.execute(MERGE_PERFORMANCES_SQL)
+                    if self.competition_rows:
+                        execute_values(cur, "INSERT INTO scraped_competitions_stage VALUES %s", self.competition_rows,
+                                       page_size=len(self.competition_rows))
+                        cur.execute(MERGE_COMPETITIONS_SQL)
+                    for store in self.stores:
+                        store.write(cur)
+                self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            print(f"   ❌ Erreur DB: {type(e).__name__} ({self.players} joueurs du lot non enregistrés)")
+            self.rows = []
+            self.competition_rows = []
+            self.players = 0
+            for store in self.stores:
+                store.fail_pending(f"Erreur DB: {type(e).__name__}")
+            raise
+
+        self.written += self.players
+        self.flushes += 1
+        print(f"   💾 {self.players} joueurs enregistrés (lot {self.flushes})")
+        self.rows = []
+        self.competition_rows = []
+        self.players = 0
+
+    def summary(self):
+        return f"💾 Base: {self.written} joueurs écrits en {self.flushes} lots"
@@ -0,0 +1,217 @@
+import argparse
+import difflib
+import re
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# ===============================================================
+#  Résolution d'entités joueurs : doublons approchés, en temps quasi linéaire
+# ===============================================================
+# Remplace drop_duplicates(subset=['name']), qui rate « Ibou Sané » / « Ibou
+# Sane » / « SANE Ibou » et fusionne deux joueurs homonymes.
+# 1. Clé de nom : accents retirés, minuscules, apostrophes et tirets
+#    supprimés, graphies voisines ramenées à une seule (kh → k, ou → u,
+#    lettres doublées...), jetons triés.
+# 2. Blocage : ne sont comparés que les joueurs qui partagent un jeton et
+#    l'année de naissance (blocs de plus de MAX_BLOCK joueurs ignorés), plus
+#    les voisins dans l'ordre trié de la clé et de la clé inversée (sorted
+#    neighbourhood, fenêtre WINDOW) pour les fautes de frappe.
+# 3. Score des seules paires candidates : deux dates de naissance connues et
+#    différentes séparent les homonymes ; sinon similarité des clés et
+#    initiales (« S. Mané » / « Sadio Mané » avec la même date).
+# 4. Groupes par union-find, sans jamais réunir deux dates de naissance
+#    différentes dans un groupe ; l'id canonique est le plus petit player_id du
+#    groupe : il ne change pas quand de nouveaux doublons s'y ajoutent.
+#   python scripts/entity_resolution.py              # groupes trouvés dans la table players
+
+WINDOW = 5              # voisins comparés dans chaque ordre trié
+MAX_BLOCK = 50          # au-delà, un bloc (jeton très courant) ne génère pas de paires
+SAME_DATE_SCORE = 0.85  # similarité suffisante quand les dates de naissance sont identiques
+NO_DATE_SCORE = 0.92    # ... quand une date manque (le nom doit porter la décision seul)
+
+# Graphies équivalentes des noms d'Afrique de l'Ouest et transcriptions courantes (par jeton)
+SPELLINGS = [
+    (re.compile(r"([a-z])\1+"), r"\1"),   # Diallo / Dialo, Kouyatte / Kouyate
+    (re.compile(r"kh|ck|c(?=[aou])|q"), "k"),   # Cheikh / Cheick, Camara / Kamara
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"ou"), "u"),              # Koulibaly / Kulibaly
+    (re.compile(r"y"), "i"),               # Mbaye / Mbaie, Niang / Nyang
+    (re.compile(r"(?<=[a-z])h\b"), ""),    # Mouhamadh / Mouhamad
+]
+NON_LETTERS = re.compile(r"[^a-z ]+")
+
+
+# ===============================================================
+#  Normalisation des noms
+# ===============================================================
+
+def fold(text):
+    """Minuscules sans accents : « Sané » → « sane »"""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+def name_tokens(name):
+    """Jetons normalisés et triés d'un nom (M'Baye → mbaie, Jean-Pierre → jean pierre)"""
+    if not isinstance(name, str):
+        return ()
+    text = NON_LETTERS.sub(" ", fold(name).replace("'", "").replace("’", "").replace("-", " "))
+    tokens = []
+    for token in text.split():
+        for pattern, replacement in SPELLINGS:
+            token = pattern.sub(replacement, token)
+        tokens.append(token)
+    return tuple(sorted(tokens))
+
+def compatible_initials(short, long):
+    """Chaque jeton de `short` est un jeton de `long` ou son initiale (« s mane » / « mane sadio »)"""
+    remaining = list(long)
+    for token in short:
+        match = next((other for other in remaining if other == token or (len(token) == 1 and other.startswith(token))), None)
+        if match is None:
+            return False
+        remaining.remove(match)
+    return True
+
+
+# ===============================================================
+#  Blocage (paires candidates)
+# ===============================================================
+
+def block_pairs(tokens, years):
+    """Paires (i, j), i < j, des lignes partageant un jeton et l'année de naissance"""
+    rows, keys = [], []
+    for row, (row_tokens, year) in enumerate(zip(tokens, years)):
+        if year is None:
+            continue
+        for token in set(row_tokens):
+            if len(token) > 1:
+                rows.append(row)
+                keys.append(f"{token}|{year}")
+    if not rows:
+        return np.empty((0, 2), dtype=np.int64)
+    blocks = pd.DataFrame({"row": rows, "key": keys})
+    sizes = blocks.groupby("key")["row"].transform("size")
+    blocks = blocks[(sizes > 1) & (sizes <= MAX_BLOCK)]
+    pairs = []
+    for members in blocks.groupby("key")["row"]:
+        members = members[1].to_numpy()
+        left, right = np.triu_indices(len(members), k=1)
+        pairs.append(np.column_stack([members[left], members[right]]))
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+
+def neighbour_pairs(sort_keys, window=WINDOW):
+    """Sorted neighbourhood : chaque ligne avec ses `window - 1` suivantes dans l'ordre de sort_keys"""
+    order = np.argsort(np.asarray(sort_keys, dtype=object), kind="stable")
+    pairs = [np.column_stack([order[:-offset], order[offset:]]) for offset in range(1, min(window, len(order)))]
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+
+def candidate_pairs(tokens, years):
+    keys = [" ".join(row_tokens) for row_tokens in tokens]
+    pairs = np.concatenate([
+        block_pairs(tokens, years),
+        neighbour_pairs(keys),
+        neighbour_pairs([key[::-1] for key in keys]),
+    ])
+    pairs = np.sort(pairs, axis=1)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    return np.unique(pairs, axis=0)
+
+
+# ===============================================================
+#  Score des paires et regroupement
+# ===============================================================
+
+def is_match(tokens_a, tokens_b, date_a, date_b):
+    if not tokens_a or not tokens_b:
+        return False
+    same_date = date_a is not None and date_a == date_b
+    if date_a is not None and date_b is not None and not same_date:
+        return False                      # homonymes : deux joueurs différents
+    if tokens_a == tokens_b:
+        return True
+    if same_date and (compatible_initials(tokens_a, tokens_b) or compatible_initials(tokens_b, tokens_a)):
+        return True
+    threshold = SAME_DATE_SCORE if same_date else NO_DATE_SCORE
+    matcher = difflib.SequenceMatcher(None, " ".join(tokens_a), " ".join(tokens_b), autojunk=False)
+    return matcher.real_quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+def find_root(parents, row):
+    while parents[row] != row:
+        parents[row] = parents[parents[row]]
+        row = parents[row]
+    return row
+
+def resolve_players(players_df):
+    """(DataFrame player_id → canonical_id pour chaque joueur, compteurs) ;
+    players_df : player_id, name, birth_date (la nationalité n'est pas utilisée)"""
+    ids = players_df["player_id"].to_numpy()
+    # Clé calculée une fois par nom distinct
+    codes, names = pd.factorize(players_df["name"])
+    distinct = [name_tokens(name) for name in names]
+    tokens = [distinct[code] if code >= 0 else () for code in codes]
+    birth = pd.to_datetime(players_df["birth_date"], errors="coerce")
+    dates = [None if pd.isna(day) else day.date() for day in birth]
+    years = [None if day is None else day.year for day in dates]
+
+    pairs = candidate_pairs(tokens, years)
+    matches = [(a, b) for a, b in pairs if is_match(tokens[a], tokens[b], dates[a], dates[b])]
+    # Paires datées d'abord : un joueur sans date rejoint ensuite un groupe déjà formé
+    matches.sort(key=lambda pair: dates[pair[0]] is None or dates[pair[1]] is None)
+    parents = list(range(len(ids)))
+    # Dates de naissance connues de chaque groupe (par racine) : la règle des homonymes
+    # vaut pour le groupe entier, pas seulement pour la paire (1990 ~ sans date ~ 1995)
+    known_dates = [{day} if day is not None else set() for day in dates]
+    refused = 0
+    for a, b in matches:
+        root_a, root_b = find_root(parents, a), find_root(parents, b)
+        if root_a == root_b:
+            continue
+        merged_dates = known_dates[root_a] | known_dates[root_b]
+        if len(merged_dates) > 1:
+            refused += 1
+            continue
+        root, child = min(root_a, root_b), max(root_a, root_b)
+        parents[child] = root
+        known_dates[root] = merged_dates
+        known_dates[child] = set()
+
+    roots = np.array([find_root(parents, row) for row in range(len(ids))], dtype=np.int64)
+    # Id canonique : plus petit player_id de chaque groupe
+    canonical = pd.Series(ids).groupby(roots).transform("min").to_numpy()
+    mapping = pd.DataFrame({"player_id": ids, "canonical_id": canonical})
+    counts = {"players": len(ids), "pairs": len(pairs), "matched": len(matches), "refused": refused,
+              "merged": int((mapping["player_id"] != mapping["canonical_id"]).sum())}
+    return mapping, counts
+
+def apply_mapping(ids, mapping):
+    """Remplace chaque player_id par son id canonique (ids inconnus inchangés)"""
+    if mapping.empty:
+        return np.asarray(ids)       # table players vide : rien à remplacer
+    positions = pd.Index(mapping["player_id"]).get_indexer(ids)
+    canonical = mapping["canonical_id"].to_numpy()
+    values = np.asarray(ids)
+    return np.where(positions >= 0, canonical[positions], values)
+
+
+if __name__ == "__main__":
+    from data_cleaning import get_connection
+
+    parser = argparse.ArgumentParser(description="Doublons approchés de la table players")
+    parser.add_argument("--show", type=int, default=20, help="nombre de groupes affichés")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    players = pd.read_sql("SELECT player_id, name, birth_date FROM players", conn)
+    conn.close()
+    start = time.perf_counter()
+    mapping, counts = resolve_players(players)
+    print(f"🧬 {counts['players']} joueurs | {counts['pairs']} paires comparées | "
+          f"{counts['merged']} doublons regroupés en {time.perf_counter() - start:.2f}s")
+    groups = mapping[mapping["player_id"] != mapping["canonical_id"]]["canonical_id"].unique()[:args.show]
+    names = players.set_index("player_id")
+    for canonical_id in groups:
+        members = mapping.loc[mapping["canonical_id"] == canonical_id, "player_id"]
+        print(f"   {canonical_id}: " + " | ".join(f"{names.at[i, 'name']} ({names.at[i, 'birth_date']})" for i in members))
@@ -1,9 +1,10 @@
 import os
 import psycopg2
-import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
 
+from bulk_writer import export_csv
+
 # Charger les variables d'environnement
 load_dotenv()
 
@@ -21,13 +22,12 @@ def export_table_to_csv(table_name):
     conn = psycopg2.connect(
         host=DB_HOST, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, port=DB_PORT
     )
-    query = f"SELECT * FROM {table_name};"
-    df = pd.read_sql(query, conn)
+    # COPY côté serveur : la table n'est pas chargée en mémoire
     path = f"data/raw/{table_name}_{timestamp}.csv"
-    df.to_csv(path, index=False)
+    export_csv(conn, f"SELECT * FROM {table_name}", path)
     conn.close()
     print(f"✅ {table_name} exportée vers {path}")
 
 if __name__ == "__main__":
-    for table in ["players", "matches", "performances"]:
+    for table in ["players", "matches", "performances", "performances_competition"]:
         export_table_to_csv(table)
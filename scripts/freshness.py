@@ -0,0 +1,126 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+
+from psycopg2.extras import Json, execute_values
+
+# ===============================================================
+#  Fraîcheur des données scrapées, par joueur et par partie
+# ===============================================================
+# Pour chaque URL on garde, par partie (« profile », « stats:<portée> »),
+# la date du dernier téléchargement, un hash des champs extraits et les
+# champs eux-mêmes. Le mode refresh ne re-télécharge que les parties plus
+# vieilles que leur âge maximum, et n'écrit en base que si le hash change.
+# La partie club → compétition a sa propre table (voir club_lookup.py).
+
+PROFILE = "profile"
+
+MAX_AGES = {
+    "profile": timedelta(days=14),  # naissance, nationalité, poste, club actuel
+    "stats": timedelta(days=2),     # stats de saison : bougent chaque semaine
+}
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS scrape_freshness (
+        url TEXT NOT NULL,
+        part TEXT NOT NULL,
+        fetched_at TIMESTAMPTZ NOT NULL,
+        content_hash TEXT NOT NULL,
+        data JSONB,
+        PRIMARY KEY (url, part)
+    )
+"""
+
+UPSERT_SQL = """
+    INSERT INTO scrape_freshness (url, part, fetched_at, content_hash, data)
+    VALUES %s
+    ON CONFLICT (url, part) DO UPDATE
+    SET fetched_at = EXCLUDED.fetched_at,
+        content_hash = EXCLUDED.content_hash,
+        data = EXCLUDED.data
+"""
+
+
+def stats_part(scope):
+    return f"stats:{scope}"
+
+
+def content_hash(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class FreshnessStore:
+    """Dates de téléchargement et hash des parties de chaque joueur"""
+
+    def __init__(self, conn, max_ages=None):
+        self.conn = conn
+        self.max_ages = {**MAX_AGES, **(max_ages or {})}
+        self.entries = {}
+        self.pending = {}
+        # record() est appelé depuis les threads du scraper concurrent
+        self.lock = threading.Lock()
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA_SQL)
+        conn.commit()
+
+    def load(self, urls):
+        """Charge en une requête l'état de fraîcheur des URLs à traiter"""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT url, part, fetched_at, content_hash, data FROM scrape_freshness WHERE url = ANY(%s)",
+                (list(urls),),
+            )
+            for url, part, fetched_at, digest, data in cur.fetchall():
+                self.entries[(url, part)] = (fetched_at, digest, data)
+        self.conn.commit()
+
+    def max_age(self, part):
+        """Âge maximum d'une partie (« stats:<portée> » prend celui de « stats »)"""
+        return self.max_ages[part.split(":", 1)[0]]
+
+    def is_stale(self, url, part):
+        entry = self.entries.get((url, part))
+        if entry is None:
+            return True
+        return datetime.now(entry[0].tzinfo) - entry[0] > self.max_age(part)
+
+    def data(self, url, part):
+        entry = self.entries.get((url, part))
+        return entry[2] if entry else None
+
+    def record(self, url, part, data):
+        """Enregistre une partie fraîchement téléchargée, retourne True si son contenu a changé"""
+        digest = content_hash(data)
+        previous = self.entries.get((url, part))
+        now = datetime.now().astimezone()
+        with self.lock:
+            self.entries[(url, part)] = (now, digest, data)
+            self.pending[(url, part)] = (url, part, now, digest, Json(data, dumps=lambda d: json.dumps(d, default=str)))
+        return previous is None or previous[1] != digest
+
+    def fail_pending(self, reason=None):
+        """Lot non écrit en base : on oublie les dates pour re-télécharger au prochain run"""
+        with self.lock:
+            for key in self.pending:
+                self.entries.pop(key, None)
+            self.pending = {}
+
+    def write(self, cur):
+        """Écrit les parties en attente avec le curseur fourni (sans commit)"""
+        with self.lock:
+            rows = list(self.pending.values())
+            self.pending = {}
+        if rows:
+            execute_values(cur, UPSERT_SQL, rows, page_size=len(rows))
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.conn.cursor() as cur:
+            self.write(cur)
+        self.conn.commit()
+
+    def stale_counts(self, urls, parts):
+        """Nombre d'URLs à rafraîchir pour chaque partie"""
+        return {part: sum(1 for url in urls if self.is_stale(url, part)) for part in parts}
@@ -0,0 +1,320 @@
+import html as html_lib
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# ===============================================================
+#  Extraction ciblée des pages Transfermarkt
+# ===============================================================
+# Au lieu de construire l'arbre complet de chaque page, on découpe d'abord
+# le bloc utile (header `data-header`, tableau `table.items`) dans le HTML
+# brut, puis on ne parse que ce fragment. Les spans `itemprop` et les
+# drapeaux sont lus via un SoupStrainer quand ils sont hors du header.
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+POSITION_KEYWORDS = ["Arrière", "Milieu", "Attaquant", "Gardien", "Défenseur"]
+BIRTH_FALLBACK_RE = re.compile(r'(\d{1,2})\s+(\w+\.?)\s+(\d{4})\s*\((\d+)\)')
+# Date et âge d'une ligne d'effectif : "1 mars 1992 (33)" ou "01/03/1992 (33)"
+SQUAD_BIRTH_RE = re.compile(r'\d{1,2}(?:/\d{1,2}/|\s+\w+\.?\s+)\d{4}\s*\(\d+\)')
+PROFILE_HREF_RE = re.compile(r'/profil/spieler/\d+')
+CLUB_HREF_RE = re.compile(r'/startseite/verein/\d+')
+TAG_RE = re.compile(r'<[^>]+>')
+SCRIPT_RE = re.compile(r'<(script|style)\b.*?</\1>', re.S | re.I)
+
+
+# ===============================================================
+#  Utilitaires de texte
+# ===============================================================
+
+def clean_text(text):
+    """Nettoie le texte en supprimant les espaces superflus"""
+    if text:
+        return ' '.join(text.strip().split())
+    return None
+
+def parse_number(text):
+    """Extrait un nombre d'un texte, retourne 0 si pas de nombre"""
+    if not text:
+        return 0
+
+    # Enlever les espaces et tirets
+    text = text.strip().replace(' ', '').replace('\n', '')
+
+    # Si c'est un tiret seul, retourner 0
+    if text == '-' or text == '':
+        return 0
+
+    # Extraire le premier nombre trouvé
+    match = re.search(r'\d+', text)
+    if match:
+        return int(match.group())
+
+    return 0
+
+def parse_minutes(text):
+    """Minutes jouées au format Transfermarkt ("9.326'"), 0 si vide ou tiret"""
+    if not text:
+        return 0
+    digits = re.sub(r"[^\d]", "", text)
+    return int(digits) if digits else 0
+
+def parse_season(text):
+    """Saison au format de performances.saison : "24/25" → "2024/2025", "2024" inchangé"""
+    text = clean_text(text)
+    if not text:
+        return None
+    match = re.fullmatch(r'(\d{2})/(\d{2})', text)
+    if match:
+        start = int(match.group(1))
+        start += 1900 if start > 50 else 2000
+        return f"{start}/{start + 1}"
+    return text
+
+def parse_date(date_str):
+    """Parse les dates dans différents formats"""
+    if not date_str:
+        return None
+
+    # Format: "01/03/1992 (33)" (tableaux d'effectif)
+    numeric_match = re.search(r'(\d{1,2})/(\d{1,2})/(\d{4})', date_str)
+    if numeric_match:
+        day, month, year = numeric_match.groups()
+        return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+
+    # Format: "28 déc. 2004 (20)"
+    date_match = re.search(r'(\d{1,2})\s+(\w+\.?)\s+(\d{4})', date_str)
+    if date_match:
+        day, month_abbr, year = date_match.groups()
+
+        # Mapping des mois français
+        months_fr = {
+            'janv': '01', 'févr': '02', 'mars': '03', 'avr': '04',
+            'mai': '05', 'juin': '06', 'juil': '07', 'août': '08',
+            'sept': '09', 'oct': '10', 'nov': '11', 'déc': '12'
+        }
+
+        month_key = month_abbr.replace('.', '').lower()
+        month = months_fr.get(month_key, '01')
+
+        try:
+            return f"{year}-{month}-{day.zfill(2)}"
+        except:
+            return None
+
+    return None
+
+def page_type(url):
+    """Type de page Transfermarkt d'après l'URL : profile, squad, club, competition, stats ou other"""
+    if "/leistungsdatendetails/" in url:
+        return "stats"
+    if "/profil/" in url:
+        return "profile"
+    if "/kader/" in url:
+        return "squad"
+    if "/verein/" in url:
+        return "club"
+    if "/wettbewerb/" in url:
+        return "competition"
+    return "other"
+
+
+# ===============================================================
+#  Découpage du HTML brut
+# ===============================================================
+
+def slice_element(html, tag, css_class):
+    """Retourne le fragment HTML du premier élément `<tag class="... css_class ...">` (gère l'imbrication)"""
+    opening = re.compile(rf'<{tag}\b[^>]*\bclass="(?:[^"]*\s)?{re.escape(css_class)}(?:\s[^"]*)?"', re.I)
+    match = opening.search(html)
+    if not match:
+        return None
+    start = match.start()
+
+    tokens = re.compile(rf"<{tag}\b|</{tag}\s*>", re.I)
+    depth = 0
+    for token in tokens.finditer(html, start):
+        if token.group().startswith("</"):
+            depth -= 1
+            if depth == 0:
+                return html[start:token.end()]
+        else:
+            depth += 1
+    return html[start:]
+
+def make_soup(fragment, parse_only=None):
+    return BeautifulSoup(fragment, PARSER, parse_only=parse_only)
+
+def page_text(html):
+    """Texte brut de la page sans construire d'arbre (scripts et balises retirés)"""
+    return html_lib.unescape(TAG_RE.sub('', SCRIPT_RE.sub('', html)))
+
+def first_flag_title(html):
+    """Titre du premier drapeau `img.flaggenrahmen` de la page"""
+    soup = make_soup(html, SoupStrainer("img", class_="flaggenrahmen"))
+    flag = soup.find("img")
+    if flag and flag.get("title"):
+        return clean_text(flag.get("title"))
+    return None
+
+
+# ===============================================================
+#  Extracteurs par type de page
+# ===============================================================
+
+def extract_profile(html):
+    """Champs du profil joueur : nom, naissance, nationalité, poste, club (+ lien)"""
+    header = slice_element(html, "header", "data-header")
+    soup = make_soup(header) if header else make_soup(html, SoupStrainer(["h1", "span", "li", "img"]))
+
+    # Nom du joueur (sans le numéro de maillot)
+    name = None
+    name_elem = soup.find("h1", class_="data-header__headline-wrapper")
+    if name_elem:
+        name = re.sub(r'#\d+\s*', '', name_elem.get_text()).strip()
+
+    # Spans itemprop : dans le header, sinon dans le reste de la page
+    birth_elem = soup.find("span", itemprop="birthDate")
+    nationality_elem = soup.find("span", itemprop="nationality")
+    if header and (not birth_elem or not nationality_elem):
+        props = make_soup(html, SoupStrainer("span", attrs={"itemprop": ["birthDate", "nationality"]}))
+        birth_elem = birth_elem or props.find("span", itemprop="birthDate")
+        nationality_elem = nationality_elem or props.find("span", itemprop="nationality")
+
+    birth_date = parse_date(birth_elem.get_text()) if birth_elem else None
+    if not birth_date:
+        # Alternative: chercher dans le texte du header, puis de la page
+        for text in ([page_text(header)] if header else []) + [page_text(html)]:
+            birth_match = BIRTH_FALLBACK_RE.search(text)
+            if birth_match:
+                birth_date = parse_date(birth_match.group(0))
+                break
+
+    nationality = clean_text(nationality_elem.get_text()) if nationality_elem else None
+    if not nationality:
+        flags = make_soup(html, SoupStrainer("img", class_="flaggenrahmen"))
+        for img in flags.find_all("img"):
+            alt_text = img.get('alt', '')
+            if 'Sénégal' in alt_text or 'Senegal' in alt_text:
+                nationality = 'Sénégal'
+                break
+
+    position = None
+    for label in soup.find_all("li", class_="data-header__label"):
+        text = label.get_text()
+        if any(keyword in text for keyword in POSITION_KEYWORDS):
+            position = clean_text(text)
+            break
+
+    club = None
+    club_href = None
+    club_elem = soup.find("span", class_="data-header__club")
+    if club_elem:
+        club_link = club_elem.find("a")
+        if club_link:
+            club = clean_text(club_link.get_text())
+            club_href = club_link.get("href")
+
+    return {
+        "name": name,
+        "birth_date": birth_date,
+        "nationality": nationality,
+        "position": position,
+        "current_club": club,
+        "club_href": club_href,
+    }
+
+def extract_club(html):
+    """Compétition actuelle du club (+ lien) et pays d'après le drapeau du club"""
+    header = slice_element(html, "header", "data-header")
+    soup = make_soup(header) if header else make_soup(html, SoupStrainer("span"))
+
+    competition = None
+    competition_href = None
+    comp_elem = soup.find("span", class_="data-header__club")
+    if not comp_elem:
+        comp_elem = soup.find("span", class_="data-header__league")
+    if comp_elem:
+        comp_link = comp_elem.find("a")
+        if comp_link:
+            competition = clean_text(comp_link.get_text())
+            competition_href = comp_link.get("href")
+
+    return {
+        "competition": competition,
+        "competition_href": competition_href,
+        "pays": first_flag_title(html) if competition else None,
+    }
+
+def extract_stats_table(html):
+    """Cellules du tableau `table.items` : pied (totaux, nettoyés) et lignes du corps (brutes)"""
+    fragment = slice_element(html, "table", "items")
+    if not fragment:
+        return None
+    soup = make_soup(fragment)
+    table = soup.find("table", class_="items")
+    if not table:
+        return None
+
+    footer = table.find("tfoot")
+    tbody = table.find("tbody")
+    return {
+        "footer": [clean_text(c.get_text()) for c in footer.find_all("td")] if footer else None,
+        "rows": [[c.get_text() for c in row.find_all("td")] for row in tbody.find_all("tr")] if tbody else None,
+    }
+
+def extract_squad(html):
+    """Page d'effectif (kader) : équipe et compétition du header, une ligne par joueur
+    (nom, lien profil, poste, naissance, nationalités, premier lien de club de la ligne :
+    club actuel en sélection, ancien club sur une page de club)"""
+    header = slice_element(html, "header", "data-header")
+    team = None
+    if header:
+        team_elem = make_soup(header).find("h1", class_="data-header__headline-wrapper")
+        if team_elem:
+            team = clean_text(team_elem.get_text())
+
+    players = []
+    fragment = slice_element(html, "table", "items")
+    table = make_soup(fragment).find("table", class_="items") if fragment else None
+    tbody = table.find("tbody") if table else None
+    for row in tbody.find_all("tr", recursive=False) if tbody else []:
+        link = row.find("a", href=PROFILE_HREF_RE)
+        if not link:
+            continue
+
+        # Poste : 2e ligne du bloc joueur, sinon le titre de la cellule du numéro
+        position = None
+        inline = row.find("table", class_="inline-table")
+        if inline:
+            cells = inline.find_all("td")
+            if len(cells) > 1:
+                position = clean_text(cells[-1].get_text())
+        if not position:
+            number = row.find("td", class_="rueckennummer")
+            position = clean_text(number.get("title")) if number else None
+
+        birth_date = None
+        for cell in row.find_all("td", recursive=False):
+            birth_match = SQUAD_BIRTH_RE.search(cell.get_text())
+            if birth_match:
+                birth_date = parse_date(birth_match.group(0))
+                break
+
+        flags = [clean_text(img.get("title")) for img in row.find_all("img", class_="flaggenrahmen") if img.get("title")]
+        club_link = row.find("a", href=CLUB_HREF_RE)
+        players.append({
+            "name": clean_text(link.get_text()) or clean_text(link.get("title")),
+            "href": link["href"],
+            "position": f"Position: {position}" if position else None,
+            "birth_date": birth_date,
+            "nationality": " ".join(flags) or None,
+            "club": clean_text(club_link.get("title")) if club_link else None,
+            "club_href": club_link.get("href") if club_link else None,
+        })
+
+    return {"team": team, **extract_club(html), "players": players}
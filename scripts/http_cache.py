@@ -0,0 +1,201 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# ===============================================================
+#  Cache HTTP persistant pour les scrapers Transfermarkt
+# ===============================================================
+# - index/<sha256(url)>.json : métadonnées (ETag, Last-Modified, date, TTL)
+# - objects/<sha[:2]>/<sha256(corps)>.gz : corps compressés, adressés par contenu
+# Une entrée fraîche est servie sans réseau, une entrée périmée déclenche un
+# GET conditionnel (304 → on garde le corps), le mode hors-ligne ne lit que le cache.
+# get(url, max_age=...) raccourcit le TTL pour cet appel : une partie périmée
+# d'après freshness.py (stats > 2 jours) n'est pas relue d'un cache de 7 jours,
+# et max_age=0 force le GET conditionnel.
+
+CACHE_DIR = Path("data/raw/http_cache")
+DEFAULT_TTL = 7 * 24 * 3600  # 7 jours
+
+
+class CacheMiss(requests.exceptions.RequestException):
+    """Page absente du cache alors que le réseau est désactivé"""
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def build_response(url, status_code, body, headers=None, encoding=None):
+    """Construit un requests.Response à partir d'un corps en cache"""
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response._content = body
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.encoding = encoding
+    response.reason = "OK" if status_code == 200 else None
+    return response
+
+
+class ResponseCache:
+    """Stockage disque des réponses, indexé par URL"""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.index_dir = self.cache_dir / "index"
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+
+    def _index_path(self, url):
+        return self.index_dir / f"{url_key(url)}.json"
+
+    def _object_path(self, digest):
+        return self.objects_dir / digest[:2] / f"{digest}.gz"
+
+    @staticmethod
+    def _atomic_write(path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Un fichier temporaire par thread : deux pages au corps identique visent le même objet
+        tmp = path.with_suffix(path.suffix + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def lookup(self, url):
+        """Retourne les métadonnées de l'URL, ou None"""
+        path = self._index_path(url)
+        if not path.exists():
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read_body(self, meta):
+        with open(self._object_path(meta["body"]), "rb") as f:
+            return gzip.decompress(f.read())
+
+    def store(self, url, response, ttl):
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not object_path.exists():
+            self._atomic_write(object_path, gzip.compress(body))
+
+        meta = {
+            "url": url,
+            "status": response.status_code,
+            "body": digest,
+            "size": len(body),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": response.headers.get("Content-Type"),
+            "encoding": response.encoding,
+            "fetched_at": time.time(),
+            "ttl": ttl,
+        }
+        self._atomic_write(self._index_path(url), json.dumps(meta).encode("utf-8"))
+        return meta
+
+    def touch(self, meta):
+        """Revalidation réussie (304) : repart pour un TTL complet"""
+        meta["fetched_at"] = time.time()
+        self._atomic_write(self._index_path(meta["url"]), json.dumps(meta).encode("utf-8"))
+
+    def entries(self):
+        """Itère sur les métadonnées de toutes les URLs en cache"""
+        for path in self.index_dir.glob("*.json"):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
+
+
+class CachedSession:
+    """Remplace requests.Session.get() par une lecture cache / GET conditionnel"""
+
+    def __init__(self, session=None, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, offline=False, pause=None):
+        self.session = session if session is not None else requests.Session()
+        self.cache = ResponseCache(cache_dir)
+        self.ttl = ttl
+        self.offline = offline
+        # Pause de politesse appelée uniquement avant un vrai accès réseau
+        self.pause = pause
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.unavailable = 0
+
+    def _from_meta(self, url, meta):
+        headers = {"Content-Type": meta.get("content_type") or "text/html"}
+        return build_response(url, meta["status"], self.cache.read_body(meta), headers, meta.get("encoding"))
+
+    def get(self, url, headers=None, max_age=None, **kwargs):
+        meta = self.cache.lookup(url)
+        ttl = meta.get("ttl", self.ttl) if meta else self.ttl
+        if max_age is not None:
+            ttl = min(ttl, max_age)
+
+        if meta and (self.offline or time.time() - meta["fetched_at"] < ttl):
+            self.hits += 1
+            return self._from_meta(url, meta)
+
+        if self.offline:
+            self.unavailable += 1
+            raise CacheMiss(f"Page absente du cache: {url}")
+
+        # Entrée périmée : requête conditionnelle
+        headers = dict(headers or {})
+        if meta:
+            headers.pop("Cache-Control", None)
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        if self.pause:
+            self.pause()
+        response = self.session.get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and meta:
+            self.revalidated += 1
+            self.cache.touch(meta)
+            return self._from_meta(url, meta)
+
+        self.misses += 1
+        if response.status_code == 200:
+            self.cache.store(url, response, self.ttl)
+        return response
+
+    @property
+    def network_calls(self):
+        return self.revalidated + self.misses
+
+    def summary(self):
+        summary = f"💾 Cache HTTP: {self.hits} hits | {self.revalidated} revalidées (304) | {self.misses} téléchargées"
+        if self.offline:
+            summary += f" | {self.unavailable} absentes"
+        return summary
+
+    def close(self):
+        self.session.close()
+
+
+if __name__ == "__main__":
+    cache = ResponseCache()
+    entries = list(cache.entries())
+    now = time.time()
+    fresh = sum(1 for m in entries if now - m["fetched_at"] < m.get("ttl", DEFAULT_TTL))
+    size = sum(p.stat().st_size for p in cache.objects_dir.rglob("*.gz"))
+    print(f"📦 {len(entries)} URLs en cache ({fresh} fraîches) dans {CACHE_DIR}")
+    print(f"   {size / 1024:.0f} Ko compressés sur disque")
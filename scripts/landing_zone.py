@@ -0,0 +1,238 @@
+import argparse
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# ===============================================================
+#  Compactage de data/raw/ : segments par source et par jour
+# ===============================================================
+# Les petits fichiers bruts (une page API par fichier, un CSV horodaté par
+# export) sont fusionnés en segments gzip : segments/<source>/<jour>/*.gz,
+# un membre gzip par fichier d'origine (les pages .ndjson.gz sont recopiées
+# telles quelles). Le manifeste segments/manifest.json garde pour chaque
+# fichier son segment, son offset et sa longueur, le nombre de lignes, un
+# sha256 du contenu et ses paramètres (ligue/saison/page, table exportée) :
+# une page se relit seule, sans décompresser le segment. Les segments plus
+# vieux que la rétention de leur source sont supprimés.
+# Les lecteurs (validate_files.py, normalize_api_football.py, data_ingestion.py)
+# passent par LandingZone plutôt que par os.listdir.
+#   python scripts/landing_zone.py                     # compacte les fichiers de plus d'une heure, applique la rétention
+#   python scripts/landing_zone.py --min-age 0 --dry-run
+
+RAW_DIR = Path("data/raw")
+SEGMENTS = "segments"
+MANIFEST = "manifest.json"
+
+API_SOURCE = "api_football_players"
+EXPORT_SOURCE = "export"
+MIN_AGE = 3600          # secondes : un fichier plus récent peut encore être en cours d'écriture
+RETENTION_DAYS = {API_SOURCE: 365, EXPORT_SOURCE: 30}
+
+API_PAGE_RE = re.compile(r"^players_league(\d+)_season(\d+)_page(\d+)\.(?:ndjson\.gz|json)$")
+EXPORT_RE = re.compile(r"^([a-z_]+?)_(\d{8})_(\d{6})\.csv$")
+
+
+def classify(name):
+    """(source, paramètres, jour ou None) d'un fichier brut compactable, None sinon"""
+    match = API_PAGE_RE.match(name)
+    if match:
+        league, season, page = (int(group) for group in match.groups())
+        return API_SOURCE, {"league": league, "season": season, "page": page}, None
+    match = EXPORT_RE.match(name)
+    if match:
+        table, day, clock = match.groups()
+        exported_at = datetime.strptime(day + clock, "%Y%m%d%H%M%S")
+        return EXPORT_SOURCE, {"table": table, "exported_at": exported_at.isoformat()}, exported_at.date().isoformat()
+    return None
+
+def count_rows(name, content):
+    """Lignes de données : joueurs d'une page API, lignes d'un CSV (sans l'en-tête)"""
+    text = content.decode("utf-8")
+    if name.endswith(".ndjson.gz"):
+        return sum(1 for line in text.splitlines() if line.strip())
+    if name.endswith(".json"):
+        return len(json.loads(text).get("response", []))
+    return max(0, sum(1 for _ in csv.reader(io.StringIO(text))) - 1)
+
+
+class LandingZone:
+    """Fichiers bruts de data/raw, en vrac ou compactés, vus d'un seul endroit"""
+
+    def __init__(self, raw_dir=RAW_DIR):
+        self.raw_dir = Path(raw_dir)
+        self.segments_dir = self.raw_dir / SEGMENTS
+        self.manifest_path = self.segments_dir / MANIFEST
+        self.manifest = {"entries": {}, "segments": {}}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    self.manifest = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠️  {self.manifest_path} illisible : seuls les fichiers en vrac sont visibles")
+
+    def save(self):
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+    def loose(self, include_other=False):
+        """Fichiers compactables encore en vrac dans data/raw/ (un seul parcours du dossier) ;
+        include_other : aussi les autres fichiers (liste des joueurs, tables de suivi...), source None"""
+        files = []
+        if not self.raw_dir.exists():
+            return files
+        with os.scandir(self.raw_dir) as it:
+            for item in it:
+                if not item.is_file():
+                    continue
+                kind = classify(item.name) or (include_other and (None, {}, None))
+                if kind:
+                    stat = item.stat()
+                    files.append({"name": item.name, "source": kind[0], "params": kind[1], "day": kind[2],
+                                  "path": str(Path(item.path)),
+                                  "signature": {"size": stat.st_size, "mtime": stat.st_mtime}})
+        return files
+
+    def entries(self, source=None, include_other=False):
+        """Tous les fichiers bruts connus (en vrac puis compactés), éventuellement d'une seule source"""
+        loose = self.loose(include_other)
+        names = {entry["name"] for entry in loose}
+        compacted = [{"name": name, **entry} for name, entry in self.manifest["entries"].items() if name not in names]
+        return [entry for entry in loose + compacted if source is None or entry["source"] == source]
+
+    def exists(self, name):
+        return name in self.manifest["entries"] or (self.raw_dir / name).exists()
+
+    def read_bytes(self, entry):
+        """Contenu décompressé d'un fichier brut (en vrac ou membre de segment)"""
+        if "path" in entry:
+            data = Path(entry["path"]).read_bytes()
+            return gzip.decompress(data) if entry["name"].endswith(".gz") else data
+        with open(self.raw_dir / entry["segment"], "rb") as f:
+            f.seek(entry["offset"])
+            return gzip.decompress(f.read(entry["length"]))
+
+    def read_text(self, entry):
+        return self.read_bytes(entry).decode("utf-8")
+
+    def compact(self, min_age=MIN_AGE, dry_run=False):
+        """Fusionne les fichiers en vrac de plus de `min_age` s en un segment par (source, jour)"""
+        now = time.time()
+        groups = {}
+        for entry in self.loose():
+            if now - entry["signature"]["mtime"] < min_age:
+                continue
+            day = entry["day"] or date.fromtimestamp(entry["signature"]["mtime"]).isoformat()
+            groups.setdefault((entry["source"], day), []).append(entry)
+
+        counts = {"files": 0, "segments": 0, "bytes_before": 0, "bytes_after": 0}
+        # Microsecondes et pid : deux compactages du même (source, jour) dans la même seconde
+        # ne visent jamais le même segment
+        run_id = f"{datetime.now():%Y%m%d_%H%M%S_%f}_{os.getpid()}"
+        for (source, day), files in sorted(groups.items()):
+            files.sort(key=lambda entry: entry["name"])
+            counts["files"] += len(files)
+            counts["segments"] += 1
+            counts["bytes_before"] += sum(entry["signature"]["size"] for entry in files)
+            if dry_run:
+                continue
+            segment = Path(SEGMENTS) / source / day / f"segment-{run_id}.gz"
+            target = self.raw_dir / segment
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists():
+                # Ses offsets sont dans le manifeste et ses fichiers d'origine déjà supprimés
+                raise FileExistsError(f"segment déjà présent, non écrasé : {target}")
+            tmp = target.with_suffix(".gz.tmp")
+            compacted_at = datetime.now().isoformat(timespec="seconds")
+            new_entries = {}
+            with open(tmp, "wb") as out:
+                for entry in files:
+                    raw = Path(entry["path"]).read_bytes()
+                    # Une page .ndjson.gz est déjà un membre gzip : recopiée sans recompression
+                    member = raw if entry["name"].endswith(".gz") else gzip.compress(raw)
+                    content = gzip.decompress(member)
+                    new_entries[entry["name"]] = {
+                        "source": source, "day": day, "params": entry["params"],
+                        "segment": segment.as_posix(), "offset": out.tell(), "length": len(member),
+                        "rows": count_rows(entry["name"], content),
+                        "sha256": hashlib.sha256(content).hexdigest(),
+                        # Signature du fichier d'origine : les lecteurs incrémentaux ne voient pas de changement
+                        "signature": entry["signature"], "compacted_at": compacted_at,
+                    }
+                    out.write(member)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, target)
+            counts["bytes_after"] += target.stat().st_size
+            self.manifest["entries"].update(new_entries)
+            self.manifest["segments"][segment.as_posix()] = {
+                "source": source, "day": day, "files": len(files), "bytes": target.stat().st_size,
+                "created_at": compacted_at,
+            }
+            # Manifeste écrit avant de supprimer les originaux : un arrêt ici ne perd rien
+            self.save()
+            for entry in files:
+                os.remove(entry["path"])
+        return counts
+
+    def expire(self, retention=None, dry_run=False):
+        """Supprime les segments dont le jour dépasse la rétention de leur source"""
+        retention = {**RETENTION_DAYS, **(retention or {})}
+        today = date.today()
+        expired = [segment for segment, info in self.manifest["segments"].items()
+                   if info["source"] in retention
+                   and date.fromisoformat(info["day"]) < today - timedelta(days=retention[info["source"]])]
+        counts = {"segments": len(expired), "files": 0}
+        if dry_run or not expired:
+            counts["files"] = sum(1 for entry in self.manifest["entries"].values() if entry["segment"] in expired)
+            return counts
+        for segment in expired:
+            self.manifest["segments"].pop(segment)
+            names = [name for name, entry in self.manifest["entries"].items() if entry["segment"] == segment]
+            for name in names:
+                del self.manifest["entries"][name]
+            counts["files"] += len(names)
+        self.save()
+        for segment in expired:
+            path = self.raw_dir / segment
+            if path.exists():
+                os.remove(path)
+            try:
+                path.parent.rmdir()
+            except OSError:
+                pass
+        return counts
+
+    def summary(self):
+        segments = self.manifest["segments"].values()
+        size = sum(info["bytes"] for info in segments)
+        return (f"🗄️  Zone brute: {len(self.manifest['entries'])} fichiers compactés dans {len(segments)} segments "
+                f"({size / 1e6:.1f} Mo)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compactage des fichiers bruts en segments + rétention")
+    parser.add_argument("--raw-dir", default=str(RAW_DIR), help="dossier des données brutes")
+    parser.add_argument("--min-age", type=float, default=MIN_AGE / 3600, help="âge minimal d'un fichier à compacter (heures)")
+    parser.add_argument("--api-retention", type=int, default=RETENTION_DAYS[API_SOURCE], help="rétention des pages API (jours)")
+    parser.add_argument("--export-retention", type=int, default=RETENTION_DAYS[EXPORT_SOURCE], help="rétention des exports CSV (jours)")
+    parser.add_argument("--dry-run", action="store_true", help="afficher sans rien modifier")
+    args = parser.parse_args()
+
+    zone = LandingZone(args.raw_dir)
+    counts = zone.compact(args.min_age * 3600, args.dry_run)
+    print(f"📦 {counts['files']} fichiers → {counts['segments']} segments "
+          f"({counts['bytes_before'] / 1e6:.1f} Mo → {counts['bytes_after'] / 1e6:.1f} Mo)"
+          + (" [simulation]" if args.dry_run else ""))
+    expired = zone.expire({API_SOURCE: args.api_retention, EXPORT_SOURCE: args.export_retention}, args.dry_run)
+    print(f"🗑️  {expired['segments']} segments expirés ({expired['files']} fichiers)")
+    print(zone.summary())
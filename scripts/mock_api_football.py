@@ -0,0 +1,229 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ===============================================================
+#  Faux API-Football local pour tester et mesurer l'ingestion
+# ===============================================================
+# Sert GET /players?league=&season=&page= au format de l'API v3 (paging,
+# response[].player, response[].statistics[]) avec des joueurs générés :
+# même id d'une saison à l'autre, --pages pages de --per-page joueurs par
+# ligue et saison. Latence et erreurs 429/503 (avec Retry-After) injectables.
+# Quotas comme RapidAPI (--per-minute, --per-day) : en-têtes x-ratelimit-* sur
+# chaque réponse, 429 au-delà.
+#   python scripts/mock_api_football.py --port 8900 --pages 40 --latency 80 --per-minute 300 --per-day 7500
+#   API_FOOTBALL_BASE_URL=http://localhost:8900/ python scripts/data_ingestion.py --leagues 39,61
+
+DEFAULT_PORT = 8900
+PER_PAGE = 20  # comme l'API
+
+POSITIONS = ["Goalkeeper", "Defender", "Midfielder", "Attacker"]
+NATIONALITIES = ["Senegal", "France", "England", "Spain", "Nigeria", "Morocco", "Brazil"]
+FIRST_NAMES = ["Sadio", "Idrissa", "Kalidou", "Ismaïla", "Pape", "Nicolas", "Édouard", "Cheikhou"]
+LAST_NAMES = ["Mané", "Gueye", "Koulibaly", "Sarr", "Diallo", "Jackson", "Mendy", "Kouyaté"]
+
+
+def generated_player(league_id, season, player_id, rng):
+    """Une entrée de response[] : identité stable par id, statistiques tirées par saison"""
+    ident = random.Random(player_id)
+    first, last = ident.choice(FIRST_NAMES), ident.choice(LAST_NAMES)
+    birth_year = 1988 + player_id % 15
+    team_id = league_id * 100 + player_id % 20
+    appearances = rng.randint(0, 38)
+    minutes = appearances * rng.randint(20, 90)
+    return {
+        "player": {
+            "id": player_id,
+            "name": f"{first[0]}. {last}",
+            "firstname": first,
+            "lastname": f"{last} {player_id}",
+            "age": season - birth_year,
+            "birth": {"date": f"{birth_year}-{1 + player_id % 12:02d}-{1 + player_id % 28:02d}",
+                      "place": "Dakar", "country": "Senegal"},
+            "nationality": ident.choice(NATIONALITIES),
+            "height": f"{170 + player_id % 25} cm",
+            "weight": f"{65 + player_id % 20} kg",
+            "injured": rng.random() < 0.05,
+            "photo": f"https://media.api-sports.io/football/players/{player_id}.png",
+        },
+        "statistics": [{
+            "team": {"id": team_id, "name": f"Team {team_id}", "logo": f"https://media.api-sports.io/football/teams/{team_id}.png"},
+            "league": {"id": league_id, "name": f"League {league_id}", "country": "Mock",
+                       "logo": None, "flag": None, "season": season},
+            "games": {"appearences": appearances, "lineups": rng.randint(0, appearances), "minutes": minutes,
+                      "number": None, "position": POSITIONS[player_id % len(POSITIONS)],
+                      "rating": f"{rng.uniform(6, 8):.6f}" if appearances else None, "captain": False},
+            "substitutes": {"in": rng.randint(0, 10), "out": rng.randint(0, 10), "bench": rng.randint(0, 15)},
+            "shots": {"total": rng.randint(0, 80), "on": rng.randint(0, 40)},
+            "goals": {"total": rng.randint(0, 25), "conceded": 0, "assists": rng.randint(0, 15), "saves": None},
+            "passes": {"total": rng.randint(0, 2000), "key": rng.randint(0, 80), "accuracy": rng.randint(60, 95)},
+            "tackles": {"total": rng.randint(0, 80), "blocks": rng.randint(0, 20), "interceptions": rng.randint(0, 50)},
+            "duels": {"total": rng.randint(0, 300), "won": rng.randint(0, 150)},
+            "dribbles": {"attempts": rng.randint(0, 100), "success": rng.randint(0, 60), "past": None},
+            "fouls": {"drawn": rng.randint(0, 60), "committed": rng.randint(0, 50)},
+            "cards": {"yellow": rng.randint(0, 10), "yellowred": 0, "red": rng.randint(0, 1)},
+            "penalty": {"won": None, "commited": None, "scored": rng.randint(0, 5), "missed": rng.randint(0, 2), "saved": None},
+        }],
+    }
+
+
+class MockApi:
+    """Pages et comportement du faux API (partagés par les threads du serveur)"""
+
+    def __init__(self, pages=20, per_page=PER_PAGE, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_codes=(429, 503), retry_after=1, seed=None, per_minute=None, per_day=None):
+        self.pages = pages
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.minute = (None, 0)   # (minute en cours, requêtes)
+        self.day_used = 0
+        self.per_page = per_page
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "errors": 0, "pages": 0, "over_quota": 0}
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def draw(self):
+        with self.lock:
+            return self.random.random()
+
+    def take_quota(self):
+        """Compte une requête ; retourne (autorisée, en-têtes x-ratelimit-*)"""
+        with self.lock:
+            minute = int(time.time() // 60)
+            used = self.minute[1] + 1 if self.minute[0] == minute else 1
+            self.minute = (minute, used)
+            self.day_used += 1
+            allowed = ((not self.per_minute or used <= self.per_minute)
+                       and (not self.per_day or self.day_used <= self.per_day))
+            headers = {}
+            if self.per_minute:
+                headers["X-RateLimit-Limit"] = str(self.per_minute)
+                headers["X-RateLimit-Remaining"] = str(max(0, self.per_minute - used))
+            if self.per_day:
+                headers["X-RateLimit-Requests-Limit"] = str(self.per_day)
+                headers["X-RateLimit-Requests-Remaining"] = str(max(0, self.per_day - self.day_used))
+            if not allowed:
+                self.counts["over_quota"] += 1
+                headers["Retry-After"] = str(60 - int(time.time() % 60))
+            return allowed, headers
+
+    def players(self, params):
+        """Corps de /players pour des paramètres de requête déjà décodés"""
+        league_id = int(params.get("league", 0))
+        season = int(params.get("season", 0))
+        page = int(params.get("page", 1))
+        body = {"get": "players", "parameters": params, "errors": [], "results": 0,
+                "paging": {"current": page, "total": self.pages}, "response": []}
+        if page > self.pages:
+            body["errors"] = {"page": f"Maximum value for page is {self.pages}"}
+            return body
+        # Tirages déterministes par page : une relance renvoie la même page
+        rng = random.Random(f"{league_id}-{season}-{page}")
+        first_id = league_id * 100_000 + (page - 1) * self.per_page + 1
+        body["response"] = [generated_player(league_id, season, first_id + i, rng) for i in range(self.per_page)]
+        body["results"] = len(body["response"])
+        return body
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    api = None  # MockApi, fixé par make_server
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        api = self.api
+        url = urlparse(self.path)
+        if url.path == "/__stats":
+            with api.lock:
+                return self.send_json(200, api.counts)
+
+        api.count("requests")
+        if api.latency or api.jitter:
+            time.sleep(max(0.0, api.latency + api.jitter * (2 * api.draw() - 1)))
+
+        allowed, quota = api.take_quota()
+        if not allowed:
+            return self.send_json(429, {"message": "You have exceeded the rate limit per minute for your plan"}, quota)
+
+        if api.error_rate and api.draw() < api.error_rate:
+            api.count("errors")
+            status = api.error_codes[int(api.draw() * len(api.error_codes)) % len(api.error_codes)]
+            return self.send_json(status, {"message": "Too many requests"}, {**quota, "Retry-After": str(api.retry_after)})
+
+        if url.path.rstrip("/").rsplit("/", 1)[-1] != "players":
+            return self.send_json(404, {"message": "Endpoint not found"})
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        api.count("pages")
+        self.send_json(200, api.players(params), quota)
+
+
+def make_server(api, host="127.0.0.1", port=DEFAULT_PORT):
+    handler = type("BoundMockApiHandler", (MockApiHandler,), {"api": api})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def start_in_thread(api, host="127.0.0.1", port=0):
+    """Démarre le serveur en arrière-plan, retourne (serveur, base_url)"""
+    server = make_server(api, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+def add_api_arguments(parser):
+    parser.add_argument("--pages", type=int, default=20, help="pages par ligue et saison")
+    parser.add_argument("--per-page", type=int, default=PER_PAGE, help="joueurs par page")
+    parser.add_argument("--latency", type=float, default=0.0, help="latence moyenne par requête (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variation de latence +/- (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part des requêtes en 429/503")
+    parser.add_argument("--retry-after", type=int, default=1, help="valeur de Retry-After (s) des erreurs")
+    parser.add_argument("--seed", type=int, help="graine des tirages (latence, erreurs)")
+    parser.add_argument("--per-minute", type=int, help="quota de requêtes par minute (429 au-delà)")
+    parser.add_argument("--per-day", type=int, help="quota de requêtes par jour (429 au-delà)")
+
+def api_from_args(args):
+    return MockApi(pages=args.pages, per_page=args.per_page, latency=args.latency / 1000, jitter=args.jitter / 1000,
+                   error_rate=args.error_rate, retry_after=args.retry_after, seed=args.seed,
+                   per_minute=args.per_minute, per_day=args.per_day)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux API-Football local")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_api_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(api_from_args(args), args.host, args.port)
+    print(f"🧪 Faux API-Football sur http://{args.host}:{args.port}/ (stats: /__stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Arrêt du serveur")
+    finally:
+        server.server_close()
@@ -0,0 +1,292 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from html_extract import page_type
+
+# ===============================================================
+#  Faux Transfermarkt local pour tester et mesurer les scrapers
+# ===============================================================
+# Sert des pages profil, effectif (kader), club, compétition et leistungsdatendetails :
+# enregistrées (--fixtures, fichiers <type>_*.html comme bench_parse) ou
+# générées. Chaque joueur reçoit un nom unique (l'id de l'URL) et un club
+# parmi --clubs ; l'effectif d'un club liste ses joueurs (plus quelques
+# étrangers), celui de la sélection (verein/3499) les --squad-size premiers. Latence, erreurs 429/503 (avec Retry-After) et corps lents
+# sont injectables.
+#   python scripts/mock_transfermarkt.py --port 8800 --latency 80 --error-rate 0.02
+#   TRANSFERMARKT_BASE_URL=http://localhost:8800 python scripts/scraper_players.py
+
+DEFAULT_PORT = 8800
+PAGE_TYPES = ["profile", "squad", "club", "competition", "stats"]
+NATIONAL_TEAM_ID = 3499  # /senegal/kader/verein/3499
+FOREIGN_ID_OFFSET = 1_000_000  # joueurs non sénégalais des effectifs générés
+
+PLAYER_ID_RE = re.compile(r'/spieler/(\d+)')
+CLUB_ID_RE = re.compile(r'/verein/(\d+)')
+NAME_RE = re.compile(r'(<h1[^>]*data-header__headline-wrapper[^>]*>)(.*?)(</h1>)', re.S)
+CLUB_HREF_RE = re.compile(r'(<span[^>]*data-header__club[^>]*>.*?<a[^>]*href=")([^"]*)(")', re.S)
+
+
+# ===============================================================
+#  Pages générées (sans fixtures enregistrées)
+# ===============================================================
+
+def generated_profile(player_id, club_id):
+    return f"""<html><body>
+<header class="data-header">
+<h1 class="data-header__headline-wrapper"><span>#{player_id % 30}</span> Joueur Mock {player_id}</h1>
+<span class="data-header__club"><a href="/fc-mock-{club_id}/startseite/verein/{club_id}">FC Mock {club_id}</a></span>
+<ul>
+<li class="data-header__label">Date de naissance: <span itemprop="birthDate">{player_id % 28 + 1} mars {1990 + player_id % 15} (25)</span></li>
+<li class="data-header__label">Nationalité: <span itemprop="nationality"><img class="flaggenrahmen" alt="Sénégal" title="Sénégal">Sénégal</span></li>
+<li class="data-header__label">Position: Attaquant</li>
+</ul>
+</header>
+</body></html>"""
+
+def squad_row(player_id, nationality, last_cell):
+    return (
+        f'<tr class="odd"><td class="zentriert rueckennummer" title="Attaquant"><div class="rn_nummer">{player_id % 30}</div></td>'
+        f'<td class="posrela"><table class="inline-table"><tr><td rowspan="2"><img class="bilderrahmen-fixed"></td>'
+        f'<td class="hauptlink"><a href="/joueur-mock-{player_id}/profil/spieler/{player_id}">Joueur Mock {player_id}</a></td></tr>'
+        f'<tr><td>Attaquant</td></tr></table></td>'
+        f'<td class="zentriert">{player_id % 28 + 1} mars {1990 + player_id % 15} (25)</td>'
+        f'<td class="zentriert"><img class="flaggenrahmen" title="{nationality}" alt="{nationality}"></td>'
+        f'<td class="zentriert">{last_cell}</td></tr>'
+    )
+
+def generated_squad(club_id, clubs, size):
+    """Effectif d'un club : ses joueurs (id ≡ club_id mod clubs) et un étranger sur trois lignes"""
+    if club_id == NATIONAL_TEAM_ID:
+        # Sélection : colonne du club actuel, pas de compétition dans le header
+        rows = [
+            squad_row(pid, "Sénégal",
+                      f'<a title="FC Mock {pid % clubs}" href="/fc-mock-{pid % clubs}/startseite/verein/{pid % clubs}"><img></a>')
+            for pid in range(1, size + 1)
+        ]
+        header = '<h1 class="data-header__headline-wrapper">Sénégal</h1>'
+    else:
+        former = '<a title="Ancien FC" href="/ancien-fc/startseite/verein/9999"><img></a>'
+        rows = []
+        for k in range(size):
+            if k % 3 == 2:
+                rows.append(squad_row(FOREIGN_ID_OFFSET + club_id * 100 + k, "France", former))
+            else:
+                rows.append(squad_row(club_id + (k - k // 3 + 1) * clubs, "Sénégal", former))
+        league = club_id % 5
+        header = (f'<h1 class="data-header__headline-wrapper">FC Mock {club_id}</h1>'
+                  f'<span class="data-header__league"><a href="/ligue-mock-{league}/startseite/wettbewerb/MK{league}">Ligue Mock {league}</a></span>'
+                  f'<img class="flaggenrahmen" title="Pays {league}" alt="Pays {league}">')
+    return (f'<html><body><header class="data-header">{header}</header>'
+            f'<table class="items"><thead><tr><th>#</th></tr></thead><tbody>{"".join(rows)}</tbody></table></body></html>')
+
+def generated_club(club_id):
+    league = club_id % 5
+    return f"""<html><body>
+<header class="data-header">
+<span class="data-header__league"><a href="/ligue-mock-{league}/startseite/wettbewerb/MK{league}">Ligue Mock {league}</a></span>
+<img class="flaggenrahmen" title="Pays {league}" alt="Pays {league}">
+</header>
+</body></html>"""
+
+def generated_competition():
+    return """<html><body><img class="flaggenrahmen" title="Pays Mock" alt="Pays Mock"></body></html>"""
+
+def generated_stats(player_id, rows=12):
+    body = []
+    total_matches = total_goals = total_assists = total_minutes = 0
+    for i in range(rows):
+        season = 24 - i // 2
+        matches, goals, assists = 10 + (player_id + i) % 25, (player_id + i) % 9, i % 5
+        minutes = matches * 78
+        total_matches += matches
+        total_goals += goals
+        total_assists += assists
+        total_minutes += minutes
+        body.append(
+            f"<tr><td>{season}/{season + 1}</td><td><img></td>"
+            f"<td><a href=\"/wettbewerb/MK{i % 2}\">Ligue Mock {i % 2}</a></td><td><a>FC Mock {i // 2}</a></td>"
+            f"<td>{matches}</td><td>-</td><td>1,2</td><td>{goals}</td><td>{assists}</td>"
+            + "<td>-</td>" * 8 + f"<td>{minutes:,}'</td></tr>".replace(",", ".")
+        )
+    footer = (
+        f"<tr><td></td><td>Total:</td><td></td><td></td><td>{total_matches}</td><td>-</td><td>1,2</td>"
+        f"<td>{total_goals}</td><td>{total_assists}</td>" + "<td>-</td>" * 8
+        + f"<td>{total_minutes:,}'</td></tr>".replace(",", ".")
+    )
+    return (f'<html><body><table class="items"><thead><tr><th>Saison</th></tr></thead>'
+            f'<tbody>{"".join(body)}</tbody><tfoot>{footer}</tfoot></table></body></html>')
+
+
+# ===============================================================
+#  Serveur
+# ===============================================================
+
+class MockSite:
+    """Pages et comportement du faux site (partagés par les threads du serveur)"""
+
+    def __init__(self, fixtures=None, clubs=50, squad_size=25, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_codes=(429, 503), retry_after=1, slow_body_rate=0.0, slow_body=0.5, seed=None):
+        self.fixtures = {kind: [] for kind in PAGE_TYPES}
+        if fixtures:
+            for path in sorted(Path(fixtures).glob("*.htm*")):
+                kind = path.name.split("_", 1)[0]
+                if kind in self.fixtures:
+                    self.fixtures[kind].append(path.read_text(encoding="utf-8", errors="replace"))
+        self.clubs = clubs
+        self.squad_size = squad_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.retry_after = retry_after
+        self.slow_body_rate = slow_body_rate
+        self.slow_body = slow_body
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "errors": 0, "slow_bodies": 0, **{kind: 0 for kind in PAGE_TYPES}}
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def draw(self):
+        with self.lock:
+            return self.random.random()
+
+    def page(self, path):
+        """Retourne (type, html) pour un chemin, ou (type, None) si inconnu"""
+        kind = page_type(path)
+        player = PLAYER_ID_RE.search(path)
+        player_id = int(player.group(1)) if player else 0
+        club = CLUB_ID_RE.search(path)
+        club_id = int(club.group(1)) if club else 0
+
+        recorded = self.fixtures.get(kind)
+        if kind == "profile":
+            club_id = player_id % self.clubs
+            if not recorded:
+                return kind, generated_profile(player_id, club_id)
+            html = recorded[player_id % len(recorded)]
+            html = NAME_RE.sub(lambda m: f"{m.group(1)}{m.group(2)} {player_id}{m.group(3)}", html, count=1)
+            return kind, CLUB_HREF_RE.sub(
+                lambda m: f"{m.group(1)}/fc-mock-{club_id}/startseite/verein/{club_id}{m.group(3)}", html, count=1
+            )
+        if kind == "squad":
+            return kind, recorded[club_id % len(recorded)] if recorded else generated_squad(club_id, self.clubs, self.squad_size)
+        if kind == "club":
+            return kind, recorded[club_id % len(recorded)] if recorded else generated_club(club_id)
+        if kind == "competition":
+            return kind, recorded[0] if recorded else generated_competition()
+        if kind == "stats":
+            return kind, recorded[player_id % len(recorded)] if recorded else generated_stats(player_id)
+        return kind, None
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    site = None  # MockSite, fixé par make_server
+    protocol_version = "HTTP/1.1"
+    # En-têtes et corps sont écrits séparément : sans ça, Nagle + ACK retardé ajoutent ~40 ms par requête
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type="text/html; charset=utf-8", headers=None, slow=False):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not slow:
+            self.wfile.write(data)
+            return
+        # Corps lent : 10 morceaux étalés sur `slow_body` secondes
+        step = max(1, len(data) // 10)
+        for start in range(0, len(data), step):
+            self.wfile.write(data[start:start + step])
+            self.wfile.flush()
+            time.sleep(self.site.slow_body / 10)
+
+    def do_GET(self):
+        site = self.site
+        if self.path == "/__stats":
+            with site.lock:
+                return self.send_body(200, json.dumps(site.counts), "application/json")
+
+        site.count("requests")
+        if site.latency or site.jitter:
+            time.sleep(max(0.0, site.latency + site.jitter * (2 * site.draw() - 1)))
+
+        if site.error_rate and site.draw() < site.error_rate:
+            site.count("errors")
+            status = site.error_codes[int(site.draw() * len(site.error_codes)) % len(site.error_codes)]
+            return self.send_body(status, "<html><body>Too many requests</body></html>",
+                                  headers={"Retry-After": str(site.retry_after)})
+
+        kind, html = site.page(self.path)
+        if html is None:
+            return self.send_body(404, "<html><body>Not found</body></html>")
+        site.count(kind)
+        slow = site.slow_body_rate and site.draw() < site.slow_body_rate
+        if slow:
+            site.count("slow_bodies")
+        self.send_body(200, html, slow=slow)
+
+
+def make_server(site, host="127.0.0.1", port=DEFAULT_PORT):
+    handler = type("BoundMockHandler", (MockHandler,), {"site": site})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def start_in_thread(site, host="127.0.0.1", port=0):
+    """Démarre le serveur en arrière-plan, retourne (serveur, base_url)"""
+    server = make_server(site, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def add_site_arguments(parser):
+    """Options du faux site, partagées avec bench_scraper.py"""
+    parser.add_argument("--fixtures", help="dossier de pages enregistrées (<type>_*.html), sinon pages générées")
+    parser.add_argument("--clubs", type=int, default=50, help="nombre de clubs distincts")
+    parser.add_argument("--squad-size", type=int, default=25, help="lignes par page d'effectif générée")
+    parser.add_argument("--latency", type=float, default=0.0, help="latence moyenne par requête (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variation de latence +/- (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part des requêtes en 429/503")
+    parser.add_argument("--retry-after", type=int, default=1, help="valeur de Retry-After (s) des erreurs")
+    parser.add_argument("--slow-body-rate", type=float, default=0.0, help="part des réponses envoyées lentement")
+    parser.add_argument("--slow-body", type=float, default=500.0, help="durée d'envoi d'un corps lent (ms)")
+    parser.add_argument("--seed", type=int, help="graine des tirages (latence, erreurs)")
+
+def site_from_args(args):
+    return MockSite(
+        fixtures=args.fixtures, clubs=args.clubs, squad_size=args.squad_size,
+        latency=args.latency / 1000, jitter=args.jitter / 1000,
+        error_rate=args.error_rate, retry_after=args.retry_after,
+        slow_body_rate=args.slow_body_rate, slow_body=args.slow_body / 1000, seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux Transfermarkt local")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(site_from_args(args), args.host, args.port)
+    print(f"🧪 Faux Transfermarkt sur http://{args.host}:{args.port} (stats: /__stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Arrêt du serveur")
+    finally:
+        server.server_close()
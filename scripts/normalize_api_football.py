@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from landing_zone import API_SOURCE, LandingZone
+
+# ===============================================================
+#  Pages API-Football brutes → Parquet partitionné (ligue, saison)
+# ===============================================================
+# Toutes les pages nouvelles sont lues puis aplaties en un seul appel
+# vectorisé (json_normalize sur response[].statistics[], avec les champs
+# de response[].player répétés) : une ligne par joueur × entrée de stats,
+# et une ligne aux stats vides pour un joueur sans entrée de stats.
+# Les colonnes sont typées une fois pour tout le lot, puis écrites dans
+# data/processed/api_football/players/league=<l>/season=<s>/part-*.parquet.
+# Le manifeste (data/processed/api_football/manifest.json) retient les pages
+# déjà traitées (taille, date) : une relance ne lit que les nouvelles, et une
+# page re-téléchargée fait réécrire sa partition. Les pages sont lues via
+# LandingZone, qu'elles soient en vrac ou compactées (landing_zone.py).
+#   python scripts/normalize_api_football.py
+#   pd.read_parquet("data/processed/api_football/players/league=39/season=2020")
+
+RAW_DIR = Path("data/raw")
+OUTPUT_DIR = Path("data/processed/api_football/players")
+MANIFEST_PATH = Path("data/processed/api_football/manifest.json")
+
+NUMBER_RE = r"(\d+)"
+
+# (colonne, chemin dans l'entrée API, type) ; chemins « player.* » pris sur le joueur, les autres sur l'entrée de stats
+FIELDS = [
+    ("player_id", "player.id", "Int64"),
+    ("player_name", "player.name", "string"),
+    ("firstname", "player.firstname", "string"),
+    ("lastname", "player.lastname", "string"),
+    ("age", "player.age", "Int64"),
+    ("birth_date", "player.birth.date", "date"),
+    ("birth_place", "player.birth.place", "string"),
+    ("birth_country", "player.birth.country", "string"),
+    ("nationality", "player.nationality", "string"),
+    ("height_cm", "player.height", "number"),
+    ("weight_kg", "player.weight", "number"),
+    ("injured", "player.injured", "boolean"),
+    ("team_id", "team.id", "Int64"),
+    ("team_name", "team.name", "string"),
+    ("league_id", "league.id", "Int64"),
+    ("league_name", "league.name", "string"),
+    ("league_country", "league.country", "string"),
+    ("league_season", "league.season", "Int64"),
+    ("position", "games.position", "string"),
+    ("appearances", "games.appearences", "Int64"),
+    ("lineups", "games.lineups", "Int64"),
+    ("minutes", "games.minutes", "Int64"),
+    ("rating", "games.rating", "Float64"),
+    ("captain", "games.captain", "boolean"),
+    ("sub_in", "substitutes.in", "Int64"),
+    ("sub_out", "substitutes.out", "Int64"),
+    ("bench", "substitutes.bench", "Int64"),
+    ("shots_total", "shots.total", "Int64"),
+    ("shots_on", "shots.on", "Int64"),
+    ("goals", "goals.total", "Int64"),
+    ("goals_conceded", "goals.conceded", "Int64"),
+    ("assists", "goals.assists", "Int64"),
+    ("saves", "goals.saves", "Int64"),
+    ("passes_total", "passes.total", "Int64"),
+    ("passes_key", "passes.key", "Int64"),
+    ("passes_accuracy", "passes.accuracy", "Int64"),
+    ("tackles", "tackles.total", "Int64"),
+    ("blocks", "tackles.blocks", "Int64"),
+    ("interceptions", "tackles.interceptions", "Int64"),
+    ("duels_total", "duels.total", "Int64"),
+    ("duels_won", "duels.won", "Int64"),
+    ("dribbles_attempts", "dribbles.attempts", "Int64"),
+    ("dribbles_success", "dribbles.success", "Int64"),
+    ("fouls_drawn", "fouls.drawn", "Int64"),
+    ("fouls_committed", "fouls.committed", "Int64"),
+    ("yellow_cards", "cards.yellow", "Int64"),
+    ("yellowred_cards", "cards.yellowred", "Int64"),
+    ("red_cards", "cards.red", "Int64"),
+    ("penalty_scored", "penalty.scored", "Int64"),
+    ("penalty_missed", "penalty.missed", "Int64"),
+]
+# Colonnes de provenance (la ligue et la saison sont aussi le chemin de la partition)
+SOURCE_FIELDS = [("league", "Int64"), ("season", "Int64"), ("page", "Int64")]
+
+
+# ===============================================================
+#  Lecture des pages brutes
+# ===============================================================
+
+def raw_pages(zone):
+    """{nom de fichier: (entrée, ligue, saison, page)} des pages API, en vrac ou compactées ;
+    .ndjson.gz préféré à l'ancien .json de la même page"""
+    pages = {}
+    for entry in sorted(zone.entries(API_SOURCE), key=lambda entry: entry["name"]):
+        params = entry["params"]
+        key = (params["league"], params["season"], params["page"])
+        if key not in pages or entry["name"].endswith(".ndjson.gz"):
+            pages[key] = (entry, *key)
+    return {entry["name"]: (entry, league, season, page) for entry, league, season, page in pages.values()}
+
+def read_page(zone, entry):
+    """Entrées response[] d'une page (.ndjson.gz : une par ligne ; .json : réponse complète)"""
+    text = zone.read_text(entry)
+    if entry["name"].endswith(".ndjson.gz"):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return json.loads(text).get("response", [])
+
+
+# ===============================================================
+#  Aplatissement vectorisé
+# ===============================================================
+
+def normalize(entries):
+    """Entrées API (avec _league, _season, _page) → DataFrame typé, une ligne par entrée de stats
+    (une ligne aux stats vides pour un joueur dont statistics est vide)"""
+    player_paths = [path.split(".") for _, path, _ in FIELDS if path.startswith("player.")]
+    meta = player_paths + ["_league", "_season", "_page"]
+    # record_path saute les listes vides : le joueur n'atteindrait jamais le Parquet
+    entries = [entry if entry.get("statistics") else {**entry, "statistics": [{}]} for entry in entries]
+    df = pd.json_normalize(entries, record_path="statistics", meta=meta, errors="ignore")
+    for column, path, dtype in FIELDS:
+        values = df[path] if path in df else pd.Series(pd.NA, index=df.index, dtype="object")
+        if dtype == "date":
+            df[column] = pd.to_datetime(values, format="%Y-%m-%d", errors="coerce")
+        elif dtype == "number":
+            # « 180 cm », « 75 kg » → 180, 75
+            df[column] = pd.to_numeric(values.astype("string").str.extract(NUMBER_RE, expand=False),
+                                       errors="coerce").astype("Int64")
+        elif dtype in ("Int64", "Float64"):
+            df[column] = pd.to_numeric(values, errors="coerce").astype(dtype)
+        else:
+            df[column] = values.astype(dtype)
+    for column, dtype in SOURCE_FIELDS:
+        df[column] = df[f"_{column}"].astype(dtype)
+    return df[[column for column, _, _ in FIELDS] + [column for column, _ in SOURCE_FIELDS]]
+
+
+# ===============================================================
+#  Manifeste et écriture des partitions
+# ===============================================================
+
+def load_manifest(path=MANIFEST_PATH):
+    if not Path(path).exists():
+        return {"pages": {}}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️  {path} illisible, toutes les pages seront retraitées")
+        return {"pages": {}}
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def partition_dir(league, season, output_dir=OUTPUT_DIR):
+    return Path(output_dir) / f"league={league}" / f"season={season}"
+
+def load_season(league, season, output_dir=OUTPUT_DIR, columns=None):
+    """Une saison d'une ligue en une lecture colonne (tous les fichiers de la partition)"""
+    df = pd.read_parquet(partition_dir(league, season, output_dir), columns=columns)
+    df["league"], df["season"] = league, season
+    return df
+
+def normalize_pages(raw_dir=RAW_DIR, output_dir=OUTPUT_DIR, manifest_path=MANIFEST_PATH, full=False):
+    """Traite les pages nouvelles ou modifiées, retourne les compteurs du run"""
+    manifest = {"pages": {}} if full else load_manifest(manifest_path)
+    done = manifest["pages"]
+    zone = LandingZone(raw_dir)
+    pages = raw_pages(zone)
+
+    # Signature du fichier d'origine, gardée par le compactage : une page compactée n'est pas retraitée
+    todo = {name: page for name, page in pages.items()
+            if done.get(name, {}).get("signature") != page[0]["signature"]}
+    # Une page déjà traitée puis modifiée : sa partition est reconstruite avec toutes ses pages
+    rebuild = {(league, season) for name, (_, league, season, _) in todo.items() if name in done}
+    if full:
+        rebuild = {(league, season) for _, league, season, _ in pages.values()}
+    for name, page in pages.items():
+        if (page[1], page[2]) in rebuild:
+            todo[name] = page
+    counts = {"pages": len(todo), "unchanged": len(pages) - len(todo), "rows": 0, "partitions": 0, "no_stats": 0}
+    if not todo:
+        return counts
+
+    entries = []
+    for name, (raw, league, season, page) in todo.items():
+        for entry in read_page(zone, raw):
+            entry["_league"], entry["_season"], entry["_page"] = league, season, page
+            entries.append(entry)
+    counts["no_stats"] = sum(1 for entry in entries if not entry.get("statistics"))
+    df = normalize(entries) if entries else None
+
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    for league, season in rebuild:
+        shutil.rmtree(partition_dir(league, season, output_dir), ignore_errors=True)
+    rows_by_page = {}
+    if df is not None:
+        rows_by_page = df.groupby(["league", "season", "page"]).size().to_dict()
+        for (league, season), part in df.groupby(["league", "season"], sort=False):
+            folder = partition_dir(league, season, output_dir)
+            folder.mkdir(parents=True, exist_ok=True)
+            part_path = folder / f"part-{run_id}.parquet"
+            # La ligue et la saison sont dans le chemin (partitionnement Hive)
+            part.drop(columns=["league", "season"]).to_parquet(part_path, index=False)
+            counts["partitions"] += 1
+        counts["rows"] = len(df)
+
+    processed_at = datetime.now().isoformat(timespec="seconds")
+    for name, (raw, league, season, page) in todo.items():
+        done[name] = {
+            "signature": raw["signature"], "league": league, "season": season, "page": page,
+            "rows": int(rows_by_page.get((league, season, page), 0)),
+            "partition": str(partition_dir(league, season, output_dir)), "processed_at": processed_at,
+        }
+    manifest["updated_at"] = processed_at
+    save_manifest(manifest, manifest_path)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalisation des pages API-Football en Parquet partitionné")
+    parser.add_argument("--raw-dir", default=str(RAW_DIR), help="dossier des pages brutes")
+    parser.add_argument("--output", default=str(OUTPUT_DIR), help="dossier Parquet partitionné (ligue, saison)")
+    parser.add_argument("--manifest", default=str(MANIFEST_PATH), help="manifeste des pages traitées")
+    parser.add_argument("--full", action="store_true", help="tout retraiter (ignore le manifeste)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = normalize_pages(args.raw_dir, args.output, args.manifest, args.full)
+    print(f"✅ {counts['pages']} pages normalisées ({counts['rows']} lignes, {counts['partitions']} partitions) "
+          f"en {time.perf_counter() - start:.1f}s | {counts['unchanged']} déjà à jour")
+    if counts["no_stats"]:
+        print(f"ℹ️  {counts['no_stats']} joueurs sans statistiques (une ligne aux stats vides chacun)")
+    print(f"📂 {args.output}")
@@ -0,0 +1,439 @@
+import argparse
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import requests
+
+from checkpoint import DONE, FAILED, SKIPPED, CheckpointStore
+from club_lookup import ClubLookup
+from freshness import PROFILE, FreshnessStore, stats_part
+from html_extract import extract_club, extract_profile, extract_stats_table, first_flag_title
+from rate_limit import DEFAULT_BURST, MAX_RATE, AdaptiveRateLimiter
+from telemetry import metrics
+from db_writer import CAREER, DEFAULT_BATCH_SIZE, PlayerBuffer
+from async_scraper import PLAYERS_CSV, SessionPool
+import scraper_players
+from scraper_players import (
+    DEFAULT_RATE, add_run_arguments, get_connection, get_random_headers, is_senegalese, run_options,
+    season_label, stats_url_for, summarize_stats,
+)
+
+# ===============================================================
+#  Pipeline découplé : téléchargement → parsing → écriture
+# ===============================================================
+# Trois étages reliés par des files bornées :
+#   - N threads de téléchargement (cache disque + limiteur adaptatif) ;
+#   - un pool de processus pour le parsing HTML (tous les cœurs) ;
+#   - un seul thread d'écriture (PlayerBuffer, une connexion).
+# Un coordinateur assemble chaque joueur page par page (profil → nationalité
+# → club, compétition et stats) et n'admet un nouveau joueur que si moins de
+# --queue-size sont en vol. Une file pleine bloque l'étage d'avant : c'est la
+# contre-pression. Profondeur des files et temps bloqué sont dans la télémétrie.
+# Avec --replay, les pages viennent du cache : re-parse complet sur tous les cœurs.
+#   python scripts/pipeline.py --replay --processes 8
+
+DEFAULT_FETCHERS = 4
+DEFAULT_QUEUE_SIZE = 64
+SAMPLE_INTERVAL = 0.25  # secondes entre deux relevés de profondeur
+
+
+def parse_page(kind, html):
+    """Exécuté dans un processus du pool : HTML → champs extraits, et durée du parsing"""
+    start = time.perf_counter()
+    if kind == "profile":
+        data = extract_profile(html)
+    elif kind == "club":
+        data = extract_club(html)
+    elif kind == "competition":
+        data = first_flag_title(html)
+    else:
+        table = extract_stats_table(html)
+        data = summarize_stats(table) if table else None
+    return data, time.perf_counter() - start
+
+
+def timed_put(q, item, name):
+    """put() bloquant, le temps passé à attendre une place est compté comme contre-pression"""
+    start = time.perf_counter()
+    q.put(item)
+    waited = time.perf_counter() - start
+    if waited > 0.001:
+        metrics.add_sleep(f"queue_full:{name}", waited)
+
+
+class Pipeline:
+    """Étages et files d'un run ; run(urls) retourne les compteurs par statut"""
+
+    def __init__(self, buffer, pool, clubs, scopes=(CAREER,), fetchers=DEFAULT_FETCHERS,
+                 processes=None, queue_size=DEFAULT_QUEUE_SIZE, retry=3):
+        self.buffer = buffer
+        self.pool = pool
+        self.clubs = clubs
+        self.scopes = scopes
+        self.fetchers = fetchers
+        self.processes = os.cpu_count() if processes is None else processes
+        self.queue_size = queue_size
+        self.retry = retry
+        # Téléchargements à faire : non bornée, la limite est le nombre de joueurs en vol
+        self.fetch_q = queue.Queue()
+        self.parse_q = queue.Queue(maxsize=queue_size)
+        self.result_q = queue.Queue()
+        self.write_q = queue.Queue(maxsize=queue_size)
+        # Pages en cours de parsing dans le pool (bornées comme la file)
+        self.slots = threading.BoundedSemaphore(max(1, self.processes) * 2)
+        self.players = {}        # url → état du joueur en cours d'assemblage
+        self.club_waiters = {}   # club_url → {"players": [...], "competition": ...}
+        self.counts = {"success": 0, "skipped": 0, "error": 0}
+        self.done = threading.Event()
+
+    # ---------- Étage 1 : téléchargement ----------
+
+    def fetch(self, session, kind, page_url):
+        """HTML de la page, None si club/compétition hors 200 ; lève l'erreur après `retry` essais"""
+        for attempt in range(self.retry):
+            if attempt > 0:
+                metrics.count_retry(kind)
+            try:
+                response = session.get(page_url, headers=get_random_headers(), timeout=25)
+                if kind in ("club", "competition") and response.status_code != 200:
+                    return None
+                response.raise_for_status()
+                return response.text
+            except requests.exceptions.RequestException:
+                if attempt == self.retry - 1:
+                    raise
+
+    def fetch_worker(self):
+        session = self.pool.get()
+        while True:
+            job = self.fetch_q.get()
+            if job is None:
+                return
+            key, kind, page_url, scope = job
+            try:
+                html, error = self.fetch(session, kind, page_url), None
+            except Exception as e:
+                html, error = None, type(e).__name__
+            timed_put(self.parse_q, (key, kind, scope, html, error), "parse")
+
+    # ---------- Étage 2 : parsing (pool de processus) ----------
+
+    def parse_dispatcher(self, executor):
+        while True:
+            item = self.parse_q.get()
+            if item is None:
+                return
+            key, kind, scope, html, error = item
+            if html is None:
+                self.result_q.put((key, kind, scope, None, error))
+                continue
+            if executor is None:
+                self.parsed(key, kind, scope, lambda: parse_page(kind, html))
+                continue
+            self.slots.acquire()
+            try:
+                future = executor.submit(parse_page, kind, html)
+            except Exception as e:
+                # Pool cassé (processus tué) : la page est en échec, le pipeline continue
+                self.slots.release()
+                self.result_q.put((key, kind, scope, None, type(e).__name__))
+                continue
+            future.add_done_callback(
+                lambda f, key=key, kind=kind, scope=scope: (self.slots.release(), self.parsed(key, kind, scope, f.result))
+            )
+
+    def parsed(self, key, kind, scope, result):
+        try:
+            data, seconds = result()
+        except Exception as e:
+            self.result_q.put((key, kind, scope, None, type(e).__name__))
+            return
+        metrics.observe("parse", kind, seconds)
+        self.result_q.put((key, kind, scope, data, None))
+
+    # ---------- Étage 3 : écriture (un seul thread, une connexion) ----------
+
+    def writer(self):
+        checkpoints = self.buffer.checkpoints
+        while True:
+            item = self.write_q.get()
+            if item is None:
+                break
+            # payload : infos du joueur, ou raison de l'échec
+            url, status, payload, stats = item
+            try:
+                if status == "success":
+                    checkpoints.record(url, DONE, batched=True)
+                    self.buffer.add(payload, stats, url)
+                elif status == "skipped":
+                    checkpoints.record(url, SKIPPED)
+                else:
+                    checkpoints.record(url, FAILED, payload)
+            except Exception as e:
+                # Lot déjà marqué en échec par PlayerBuffer ; le writer continue
+                print(f"   ❌ Erreur DB: {type(e).__name__}")
+        try:
+            self.buffer.flush()
+        except Exception as e:
+            print(f"   ❌ Erreur DB: {type(e).__name__}")
+
+    # ---------- Coordination : assemblage des joueurs ----------
+
+    def request(self, key, kind, page_url, scope=None):
+        self.fetch_q.put((key, kind, page_url, scope))
+
+    def admit(self, url):
+        # pending : pages (club, stats) encore attendues après le profil
+        self.players[url] = {"info": None, "stats": {}, "pending": 0}
+        self.request(url, "profile", url)
+
+    def finish(self, url, status, detail=None):
+        state = self.players.pop(url)
+        info = state["info"]
+        self.counts[status] += 1
+        done = sum(self.counts.values())
+        if status == "success":
+            freshness = self.buffer.freshness
+            freshness.record(url, PROFILE, info)
+            for scope in self.scopes:
+                stats = state["stats"].get(season_label(scope))
+                if stats:
+                    freshness.record(url, stats_part(scope), stats)
+            print(f"   [{done}/{self.total}] 👤 {info['name']} ({len(state['stats'])} portées)")
+            timed_put(self.write_q, (url, status, info, state["stats"]), "write")
+        elif status == "skipped":
+            print(f"   [{done}/{self.total}] ⏭️  Autre nationalité: {info.get('nationality', 'N/A')}")
+            timed_put(self.write_q, (url, status, info, {}), "write")
+        else:
+            print(f"   [{done}/{self.total}] ❌ {url}: {detail}")
+            timed_put(self.write_q, (url, status, detail, {}), "write")
+
+    def settle(self, url):
+        state = self.players[url]
+        state["pending"] -= 1
+        if state["pending"] == 0:
+            self.finish(url, "success")
+
+    def on_profile(self, url, profile, error):
+        state = self.players[url]
+        if not profile or not profile.get("name"):
+            metrics.count_skip("nationality", "profile_error")
+            metrics.count_skip("club", "profile_error")
+            metrics.count_skip("stats", "profile_error", len(self.scopes))
+            return self.finish(url, "error", error or "infos manquantes")
+        state["info"] = {
+            "name": profile["name"],
+            "birth_date": profile["birth_date"],
+            "nationality": profile["nationality"],
+            "position": profile["position"],
+            "current_club": profile["current_club"],
+            "current_competition": None,
+            "current_pays_de_competition": None,
+            "club_url": scraper_players.BASE_URL + profile["club_href"] if profile["club_href"] else None,
+            "url": url,
+        }
+        # Nationalité vérifiée avant de demander club et stats
+        if not is_senegalese(profile):
+            metrics.count_skip("club", "nationality")
+            metrics.count_skip("stats", "nationality", len(self.scopes))
+            return self.finish(url, "skipped")
+
+        club_url = state["info"]["club_url"]
+        if club_url:
+            cached = self.clubs.get(club_url)
+            if cached:
+                state["info"]["current_competition"], state["info"]["current_pays_de_competition"] = cached
+            else:
+                state["pending"] += 1
+                waiting = self.club_waiters.get(club_url)
+                if waiting is None:
+                    # Un seul téléchargement par club, même avec plusieurs joueurs en vol
+                    self.club_waiters[club_url] = {"players": [url], "competition": None}
+                    self.request(club_url, "club", club_url)
+                else:
+                    waiting["players"].append(url)
+        else:
+            metrics.count_skip("club", "no_club")
+        for scope in self.scopes:
+            state["pending"] += 1
+            self.request(url, "stats", stats_url_for(url, scope), scope)
+        if state["pending"] == 0:
+            self.finish(url, "success")
+
+    def on_club(self, club_url, club, error):
+        waiting = self.club_waiters[club_url]
+        if not club:
+            return self.resolve_club(club_url, None, None, remember=False)
+        waiting["competition"] = club["competition"]
+        # Si le drapeau du club n'est pas trouvé, on va chercher dans la compétition
+        if club["competition"] and not club["pays"] and club["competition_href"]:
+            self.request(club_url, "competition", scraper_players.BASE_URL + club["competition_href"])
+            return
+        self.resolve_club(club_url, club["competition"], club["pays"])
+
+    def on_competition(self, club_url, pays, error):
+        competition = self.club_waiters[club_url]["competition"]
+        # Pays inconnu pour cette fois (page en erreur, non-200 compris : html None sans error) :
+        # on ne mémorise que si un pays a vraiment été lu
+        self.resolve_club(club_url, competition, pays, remember=bool(pays))
+
+    def resolve_club(self, club_url, competition, pays, remember=True):
+        waiting = self.club_waiters.pop(club_url)
+        if remember:
+            self.clubs.put(club_url, competition, pays)
+        for url in waiting["players"]:
+            self.players[url]["info"]["current_competition"] = competition
+            self.players[url]["info"]["current_pays_de_competition"] = pays
+            self.settle(url)
+
+    def on_stats(self, url, scope, stats):
+        if stats:
+            self.players[url]["stats"][season_label(scope)] = stats
+        self.settle(url)
+
+    def dispatch(self, key, kind, scope, data, error):
+        if kind == "profile":
+            self.on_profile(key, data, error)
+        elif kind == "club":
+            self.on_club(key, data, error)
+        elif kind == "competition":
+            self.on_competition(key, data, error)
+        else:
+            self.on_stats(key, scope, data)
+
+    # ---------- Relevé des profondeurs de file ----------
+
+    def sampler(self):
+        while not self.done.wait(SAMPLE_INTERVAL):
+            metrics.observe_depth("fetch", self.fetch_q.qsize())
+            metrics.observe_depth("parse", self.parse_q.qsize())
+            metrics.observe_depth("write", self.write_q.qsize())
+            metrics.observe_depth("in_flight", len(self.players))
+
+    def run(self, urls):
+        self.total = len(urls)
+        # spawn : les processus de parsing ne doivent pas hériter des threads et connexions du parent
+        executor = None
+        if self.processes > 0:
+            executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+        fetchers = [threading.Thread(target=self.fetch_worker, daemon=True) for _ in range(self.fetchers)]
+        dispatcher = threading.Thread(target=self.parse_dispatcher, args=(executor,), daemon=True)
+        writer = threading.Thread(target=self.writer, daemon=True)
+        sampler = threading.Thread(target=self.sampler, daemon=True)
+        for thread in fetchers + [dispatcher, writer, sampler]:
+            thread.start()
+
+        pending = iter(urls)
+        exhausted = False
+        try:
+            while True:
+                # Admission : au plus `queue_size` joueurs en cours d'assemblage
+                while not exhausted and len(self.players) < self.queue_size:
+                    url = next(pending, None)
+                    if url is None:
+                        exhausted = True
+                    else:
+                        self.admit(url)
+                if exhausted and not self.players:
+                    break
+                self.dispatch(*self.result_q.get())
+        finally:
+            for _ in fetchers:
+                self.fetch_q.put(None)
+            for thread in fetchers:
+                thread.join()
+            self.parse_q.put(None)
+            dispatcher.join()
+            if executor is not None:
+                executor.shutdown()
+            self.write_q.put(None)
+            writer.join()
+            self.done.set()
+            sampler.join()
+        return self.counts
+
+
+def pipeline_all_players(fetchers=DEFAULT_FETCHERS, processes=None, queue_size=DEFAULT_QUEUE_SIZE, rate=DEFAULT_RATE,
+                         burst=DEFAULT_BURST, replay=False, batch_size=DEFAULT_BATCH_SIZE, mode="all", max_ages=None,
+                         scopes=(CAREER,), job="players", max_rate=MAX_RATE):
+    """Équivalent en pipeline de scrape_all_players (mêmes points de reprise, mêmes tables)"""
+    if mode == "refresh":
+        print("❌ Le mode refresh n'est pas géré par le pipeline : utiliser scraper_players.py --refresh")
+        return
+    if not os.path.exists(PLAYERS_CSV):
+        print(f"❌ Fichier {PLAYERS_CSV} introuvable")
+        return
+
+    metrics.reset()
+    conn = get_connection()
+    checkpoints = CheckpointStore(conn, job=job)
+    freshness = FreshnessStore(conn, max_ages)
+    buffer = PlayerBuffer(conn, batch_size, checkpoints=checkpoints, freshness=freshness)
+    limiter = AdaptiveRateLimiter(rate, burst, max_rate=max_rate)
+    pool = SessionPool(limiter, offline=replay)
+    clubs = ClubLookup()
+
+    all_urls = pd.read_csv(PLAYERS_CSV)["url"].tolist()
+    urls = checkpoints.select_urls(all_urls, mode)
+    pipeline = Pipeline(buffer, pool, clubs, scopes, fetchers, processes, queue_size, retry=1 if replay else 3)
+    print(f"\n{'='*70}")
+    print(f"🚀 SCRAPING TRANSFERMARKT (pipeline) - JOUEURS SÉNÉGALAIS")
+    print(f"{'='*70}")
+    print(f"📋 {len(urls)} joueurs à traiter (sur {len(all_urls)}, mode {mode})")
+    print(f"📅 Portées: {', '.join(season_label(scope) for scope in scopes)}")
+    print(f"🔀 {fetchers} téléchargements | {pipeline.processes} processus de parsing | "
+          f"{queue_size} joueurs en vol au plus")
+    if replay:
+        print(f"💾 Mode replay: pages lues depuis le cache, aucun accès réseau\n")
+    else:
+        print(f"🚦 Débit adaptatif par hôte: {rate} req/s au départ, jusqu'à {max_rate} req/s (rafale {burst})\n")
+
+    start = time.perf_counter()
+    try:
+        counts = pipeline.run(urls)
+    finally:
+        pool.close()
+        clubs.save()
+    elapsed = time.perf_counter() - start
+    metrics.add_sleep("rate_limit", pool.waited)
+
+    print(f"\n{'='*70}")
+    print(f"✅ SCRAPING TERMINÉ!")
+    print(f"{'='*70}")
+    checkpoints.print_summary(all_urls)
+    conn.close()
+
+    summary = metrics.summary()
+    print(f"   🌐 Pages:              {pool.pages} en {elapsed:.1f}s "
+          f"({pool.pages / elapsed if elapsed > 0 else 0.0:.2f} pages/s, {pool.network_pages} via le réseau)")
+    for name, depth in summary["queues"].items():
+        print(f"   📥 File {name:<10} profondeur moyenne {depth['mean']} (p95 ≤ {depth['p95']})")
+    blocked = {reason: t for reason, t in summary["sleep_by_reason"].items() if reason.startswith("queue_full")}
+    if blocked:
+        print(f"   🧱 Contre-pression: " + ", ".join(f"{reason} {t:.1f}s" for reason, t in blocked.items()))
+    print(f"   {limiter.summary()}")
+    print(f"   {clubs.summary()}")
+    print(f"   {buffer.summary()}")
+    print(f"   {metrics.report()}")
+    print(f"   {metrics.skip_report()}")
+    extra = {"players": len(urls), "fetchers": fetchers, "processes": pipeline.processes, "queue_size": queue_size,
+             "counts": counts, "pages": pool.pages,
+             "pacing": {"rates": limiter.rates(), "throttles": limiter.throttles}}
+    print(f"   📈 Télémétrie: {metrics.write(job, extra=extra)}")
+    print(f"{'='*70}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraping Transfermarkt en pipeline (téléchargement → parsing → écriture)")
+    parser.add_argument("--fetchers", type=int, default=DEFAULT_FETCHERS, help="threads de téléchargement")
+    parser.add_argument("--processes", type=int, help="processus de parsing (défaut : nombre de cœurs, 0 = dans un thread)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="taille des files et joueurs en vol")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST, help="rafale maximale par hôte")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+    pipeline_all_players(args.fetchers, args.processes, args.queue_size, burst=args.burst, **run_options(args))
@@ -0,0 +1,282 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+
+# ===============================================================
+#  Limitation de débit par hôte (politesse envers Transfermarkt)
+# ===============================================================
+# HostRateLimiter : débit fixe. AdaptiveRateLimiter : débit AIMD qui monte
+# doucement tant que l'hôte répond vite, et est divisé sur 429/503/timeout
+# (en respectant Retry-After). SharedRateLimiter : le même AIMD, mais l'état
+# par hôte est une ligne Postgres partagée par tous les processus et machines.
+
+DEFAULT_BURST = 2
+
+# Réglages AIMD par défaut (requêtes/s)
+MIN_RATE = 0.05
+MAX_RATE = 2.0
+INCREASE = 0.05          # ajouté après chaque réponse rapide
+DECREASE = 0.5           # facteur appliqué sur 429 / 503 / timeout
+SLOW_LATENCY = 3.0       # au-delà (s), le débit n'augmente plus
+MAX_RETRY_AFTER = 300.0
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Retry-After en secondes (entier ou date HTTP), None si absent ou illisible"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+class TokenBucket:
+    """Seau à jetons thread-safe : `rate` requêtes/s en régime établi, rafales jusqu'à `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Bloque jusqu'à obtenir un jeton, retourne le temps d'attente (secondes)"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def hold(self, seconds, drain=True):
+        """Aucun jeton pendant `seconds` (Retry-After), rafale vidée"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            if drain:
+                self.tokens = 0.0
+
+
+class HostRateLimiter:
+    """Un TokenBucket par hôte, partagé par tous les workers"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        return self.bucket(url).acquire()
+
+    def observe(self, url, seconds, status, retry_after=None):
+        """Issue d'une requête : ignorée à débit fixe"""
+        return None
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """Débit par hôte piloté en AIMD : +`increase` req/s par réponse rapide, ×`decrease` sur throttling"""
+
+    def __init__(self, rate, capacity=1, min_rate=MIN_RATE, max_rate=MAX_RATE, increase=INCREASE,
+                 decrease=DECREASE, slow_latency=SLOW_LATENCY):
+        super().__init__(rate, capacity)
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.throttles = 0
+        self.last_cut = {}
+
+    def observe(self, url, seconds, status, retry_after=None):
+        bucket = self.bucket(url)
+        host = urlparse(url).netloc
+        if status in THROTTLE_STATUSES or status == "timeout":
+            with self.lock:
+                self.throttles += 1
+                now = time.monotonic()
+                # Une seule division par intervalle entre requêtes : les erreurs simultanées
+                # des workers concurrents ne font pas s'effondrer le débit
+                cut = now - self.last_cut.get(host, 0.0) >= 1 / bucket.rate
+                if cut:
+                    self.last_cut[host] = now
+            if cut:
+                bucket.set_rate(max(self.min_rate, bucket.rate * self.decrease))
+            delay = parse_retry_after(retry_after)
+            bucket.hold(delay if delay is not None else 1 / bucket.rate)
+        elif isinstance(status, int) and status < 400 and seconds < self.slow_latency:
+            bucket.set_rate(min(self.max_rate, bucket.rate + self.increase))
+
+    def rates(self):
+        with self.lock:
+            return {host: bucket.rate for host, bucket in self.buckets.items()}
+
+    def summary(self):
+        rates = " | ".join(f"{host} {rate:.2f} req/s" for host, rate in self.rates().items()) or "aucun hôte"
+        return f"🚦 Débit adaptatif: {rates} | {self.throttles} ralentissements (429/503/timeout)"
+
+
+# Verrou consultatif : plusieurs workers qui démarrent ensemble ne créent pas la table en même temps
+SHARED_SCHEMA_SQL = """
+    SELECT pg_advisory_xact_lock(hashtext('host_budget'));
+    CREATE TABLE IF NOT EXISTS host_budget (
+        host TEXT PRIMARY KEY,
+        rate DOUBLE PRECISION NOT NULL,
+        next_slot TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+        last_cut TIMESTAMPTZ,
+        throttles INT NOT NULL DEFAULT 0
+    )
+"""
+
+# Réserve le prochain créneau de l'hôte (verrou de ligne : un créneau par requête,
+# tous workers confondus) ; jusqu'à `burst` créneaux peuvent être pris d'avance
+RESERVE_SQL = """
+    UPDATE host_budget
+    SET next_slot = GREATEST(next_slot, clock_timestamp() - make_interval(secs => (%(burst)s - 1) / rate))
+                    + make_interval(secs => 1.0 / rate)
+    WHERE host = %(host)s
+    RETURNING EXTRACT(EPOCH FROM next_slot - make_interval(secs => 1.0 / rate) - clock_timestamp())
+"""
+
+# Une seule division par intervalle entre requêtes, comme AdaptiveRateLimiter ;
+# Retry-After (ou un intervalle) repousse le prochain créneau pour tout le monde
+THROTTLE_SQL = """
+    UPDATE host_budget
+    SET rate = CASE WHEN last_cut IS NULL OR clock_timestamp() - last_cut >= make_interval(secs => 1.0 / rate)
+                    THEN GREATEST(%(min_rate)s, rate * %(decrease)s) ELSE rate END,
+        last_cut = CASE WHEN last_cut IS NULL OR clock_timestamp() - last_cut >= make_interval(secs => 1.0 / rate)
+                        THEN clock_timestamp() ELSE last_cut END,
+        next_slot = GREATEST(next_slot, clock_timestamp() + make_interval(secs => COALESCE(%(hold)s, 1.0 / rate))),
+        throttles = throttles + 1
+    WHERE host = %(host)s
+"""
+
+INCREASE_SQL = "UPDATE host_budget SET rate = LEAST(%(max_rate)s, rate + %(increase)s) WHERE host = %(host)s"
+
+
+class SharedRateLimiter:
+    """Débit AIMD par hôte coordonné par la base (table host_budget) : N workers sur
+    plusieurs processus ou machines se partagent le même budget de politesse.
+    `conn` doit être une connexion dédiée en autocommit."""
+
+    def __init__(self, conn, rate, capacity=1, min_rate=MIN_RATE, max_rate=MAX_RATE, increase=INCREASE,
+                 decrease=DECREASE, slow_latency=SLOW_LATENCY):
+        self.conn = conn
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.hosts = set()
+        self.throttles = 0
+        self.lock = threading.Lock()
+        with conn.cursor() as cur:
+            cur.execute(SHARED_SCHEMA_SQL)
+
+    def execute(self, sql, params):
+        with self.lock, self.conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchone() if cur.description else None
+
+    def host(self, url):
+        host = urlparse(url).netloc
+        if host not in self.hosts:
+            # Le premier worker fixe le débit de départ, les suivants reprennent celui en base
+            self.execute("INSERT INTO host_budget (host, rate) VALUES (%(host)s, %(rate)s) ON CONFLICT (host) DO NOTHING",
+                         {"host": host, "rate": self.rate})
+            self.hosts.add(host)
+        return host
+
+    def acquire(self, url):
+        """Réserve un créneau en base puis attend son heure, retourne le temps d'attente"""
+        wait = self.execute(RESERVE_SQL, {"host": self.host(url), "burst": self.capacity})[0]
+        wait = max(0.0, float(wait))
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def observe(self, url, seconds, status, retry_after=None):
+        host = self.host(url)
+        if status in THROTTLE_STATUSES or status == "timeout":
+            with self.lock:
+                self.throttles += 1
+            self.execute(THROTTLE_SQL, {"host": host, "min_rate": self.min_rate, "decrease": self.decrease,
+                                        "hold": parse_retry_after(retry_after)})
+        elif isinstance(status, int) and status < 400 and seconds < self.slow_latency:
+            self.execute(INCREASE_SQL, {"host": host, "max_rate": self.max_rate, "increase": self.increase})
+
+    def rates(self):
+        if not self.hosts:
+            return {}
+        with self.lock, self.conn.cursor() as cur:
+            cur.execute("SELECT host, rate FROM host_budget WHERE host = ANY(%s)", (list(self.hosts),))
+            return dict(cur.fetchall())
+
+    def summary(self):
+        rates = " | ".join(f"{host} {rate:.2f} req/s" for host, rate in self.rates().items()) or "aucun hôte"
+        return f"🚦 Débit partagé (base): {rates} | {self.throttles} ralentissements de ce worker (429/503/timeout)"
+
+
+class RateLimitedSession:
+    """Enveloppe une requests.Session : chaque get() consomme un jeton de l'hôte ciblé
+    et rapporte son issue (latence, code, Retry-After) au limiteur"""
+
+    def __init__(self, session, limiter):
+        self.session = session
+        self.limiter = limiter
+        self.pages = 0
+        self.waited = 0.0
+
+    def get(self, url, **kwargs):
+        self.waited += self.limiter.acquire(url)
+        self.pages += 1
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, **kwargs)
+        except requests.exceptions.Timeout:
+            self.limiter.observe(url, time.monotonic() - start, "timeout")
+            raise
+        self.limiter.observe(url, time.monotonic() - start, response.status_code, response.headers.get("Retry-After"))
+        return response
+
+    def close(self):
+        self.session.close()
@@ -1,15 +1,24 @@
+import argparse
 import os
-import time
-import re
 import random
 import psycopg2
-from psycopg2.extras import execute_values
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from tqdm import tqdm
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from checkpoint import DONE, FAILED, SKIPPED, CheckpointStore
+from club_lookup import ClubLookup
+from freshness import MAX_AGES, PROFILE, FreshnessStore, stats_part
+from db_writer import CAREER, DEFAULT_BATCH_SIZE, PlayerBuffer
+from html_extract import (
+    clean_text, extract_club, extract_profile, extract_stats_table,
+    first_flag_title, parse_minutes, parse_number, parse_season,
+)
+from http_cache import CachedSession
+from rate_limit import DEFAULT_BURST, MAX_RATE, AdaptiveRateLimiter, RateLimitedSession
+from telemetry import InstrumentedSession, metrics
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -19,6 +28,12 @@ DB_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 DB_NAME = os.getenv("POSTGRES_DB")
 DB_PORT = os.getenv("POSTGRES_PORT", 5432)
 
+# Débit de départ du limiteur adaptatif (requêtes/s par hôte)
+DEFAULT_RATE = 0.5
+
+# Site cible des liens relatifs (club, compétition) : remplaçable par un serveur local de test
+BASE_URL = os.getenv("TRANSFERMARKT_BASE_URL", "https://www.transfermarkt.fr")
+
 # Liste de User-Agents pour rotation (simule différents navigateurs/utilisateurs)
 USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -60,184 +75,113 @@ def get_random_headers():
 def random_delay(min_seconds=3, max_seconds=7):
     """Pause aléatoire pour simuler un comportement humain"""
     delay = random.uniform(min_seconds, max_seconds)
-    time.sleep(delay)
+    metrics.sleep(delay, "random_delay")
 
-def clean_text(text):
-    """Nettoie le texte en supprimant les espaces superflus"""
-    if text:
-        return ' '.join(text.strip().split())
+def no_delay(min_seconds=0, max_seconds=0):
+    """Pas de pause : la cadence est gérée ailleurs (cache, limiteur)"""
     return None
 
-def parse_number(text):
-    """Extrait un nombre d'un texte, retourne 0 si pas de nombre"""
-    if not text:
-        return 0
+def parse_scopes(text):
+    """« career,2015-2025 » → ["career", "2015", ..., "2025"] (année de début de saison)"""
+    scopes = []
+    for item in text.split(","):
+        item = item.strip()
+        if "-" in item:
+            first, last = (int(year) for year in item.split("-"))
+            scopes.extend(str(year) for year in range(first, last + 1))
+        elif item:
+            scopes.append(item)
+    return list(dict.fromkeys(scopes))
+
+def season_label(scope):
+    """Valeur de performances.saison : « career » ou « 2025/2026 »"""
+    if scope == CAREER:
+        return CAREER
+    return f"{scope}/{int(scope) + 1}"
+
+def cache_options(max_age):
+    """Âge maximum accepté du cache HTTP pour un appel ; rien pour une session sans cache"""
+    return {} if max_age is None else {"max_age": max_age}
+
+def stats_url_for(url, scope):
+    """URL leistungsdatendetails d'une portée (saison vide = toute la carrière)"""
+    # Transfermarkt utilise l’année de début de saison (2025 pour 2025/26)
+    saison = "" if scope == CAREER else scope
+    stats_url = url.replace('/profil/', '/leistungsdatendetails/')
+    return stats_url + f'/saison/{saison}/verein/0/liga/0/wettbewerb//pos/0/trainer_id/0/plus/1'
+
+def get_club_competition(club_url, session, pause=random_delay, clubs=None):
+    """Retourne (compétition, pays) du club, via la table `clubs` si l'entrée est fraîche"""
+    if clubs is not None:
+        cached = clubs.get(club_url)
+        if cached:
+            return cached
     
-    # Enlever les espaces et tirets
-    text = text.strip().replace(' ', '').replace('\n', '')
+    competition = None
+    competition_pays = None
     
-    # Si c'est un tiret seul, retourner 0
-    if text == '-' or text == '':
-        return 0
+    headers = get_random_headers()
+    pause(2, 4)
+    club_resp = session.get(club_url, headers=headers, timeout=25)
     
-    # Extraire le premier nombre trouvé
-    match = re.search(r'\d+', text)
-    if match:
-        return int(match.group())
+    if club_resp.status_code != 200:
+        return competition, competition_pays
     
-    return 0
-
-def parse_date(date_str):
-    """Parse les dates dans différents formats"""
-    if not date_str:
-        return None
+    with metrics.timed("parse", "club"):
+        club = extract_club(club_resp.text)
+    competition = club["competition"]
+    competition_pays = club["pays"]
     
-    # Format: "28 déc. 2004 (20)"
-    date_match = re.search(r'(\d{1,2})\s+(\w+\.?)\s+(\d{4})', date_str)
-    if date_match:
-        day, month_abbr, year = date_match.groups()
-        
-        # Mapping des mois français
-        months_fr = {
-            'janv': '01', 'févr': '02', 'mars': '03', 'avr': '04',
-            'mai': '05', 'juin': '06', 'juil': '07', 'août': '08',
-            'sept': '09', 'oct': '10', 'nov': '11', 'déc': '12'
-        }
-        
-        month_key = month_abbr.replace('.', '').lower()
-        month = months_fr.get(month_key, '01')
-        
-        try:
-            return f"{year}-{month}-{day.zfill(2)}"
-        except:
-            return None
+    # Si le drapeau du club n’est pas trouvé, on va chercher dans la compétition
+    if competition and not competition_pays and club["competition_href"]:
+        comp_url = BASE_URL + club["competition_href"]
+        pause(2, 4)
+        comp_resp = session.get(comp_url, headers=get_random_headers(), timeout=25)
+        if comp_resp.status_code != 200:
+            # Pays inconnu pour cette fois : on ne mémorise pas
+            return competition, competition_pays
+        with metrics.timed("parse", "competition"):
+            competition_pays = first_flag_title(comp_resp.text)
     
-    return None
+    if clubs is not None:
+        clubs.put(club_url, competition, competition_pays)
+    return competition, competition_pays
 
-def get_player_info(url, session, retry=3):
-    """Récupère les informations du joueur depuis Transfermarkt"""
+def is_senegalese(info):
+    """Filtre de nationalité, appliqué avant de télécharger club, compétition et stats"""
+    return bool(info.get("nationality") and "Sénégal" in info["nationality"])
+
+def get_player_info(url, session, retry=3, pause=random_delay, max_age=None):
+    """Récupère les informations du joueur depuis Transfermarkt (page profil seule :
+    compétition et pays sont complétés ensuite par enrich_club) ; max_age : âge maximum
+    de la page en cache (secondes, 0 = GET conditionnel)"""
     
     for attempt in range(retry):
         try:
             # Headers aléatoires à chaque tentative
             headers = get_random_headers()
             
-            # Ajouter un délai aléatoire avant la requête (sauf première tentative)
             if attempt > 0:
-                print(f"   ⏳ Pause de {5 + attempt * 2}s avant nouvelle tentative...")
-                time.sleep(5 + attempt * 2)
+                print(f"   🔁 Nouvelle tentative ({attempt + 1}/{retry})")
+                metrics.count_retry("profile")
+                # Attente fixe hors limiteur ; avec le limiteur adaptatif (pause=no_delay),
+                # c'est lui qui ralentit l'hôte et applique Retry-After
+                pause(5 + attempt * 2, 5 + attempt * 2)
             
-            response = session.get(url, headers=headers, timeout=25)
+            response = session.get(url, headers=headers, timeout=25, **cache_options(max_age))
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Nom du joueur
-            name = None
-            name_elem = soup.find("h1", class_="data-header__headline-wrapper")
-            if name_elem:
-                # Enlever le numéro de maillot
-                name_text = name_elem.get_text()
-                name = re.sub(r'#\d+\s*', '', name_text).strip()
-            
-            # Date de naissance
-            birth_date = None
-            birth_elem = soup.find("span", itemprop="birthDate")
-            if birth_elem:
-                birth_date = parse_date(birth_elem.get_text())
-            
-            # Alternative: chercher dans la page
-            if not birth_date:
-                birth_match = re.search(r'(\d{1,2})\s+(\w+\.?)\s+(\d{4})\s*\((\d+)\)', soup.get_text())
-                if birth_match:
-                    birth_date = parse_date(birth_match.group(0))
-            
-            # Nationalité
-            nationality = None
-            nationality_elem = soup.find("span", itemprop="nationality")
-            if nationality_elem:
-                nationality = clean_text(nationality_elem.get_text())
-            
-            # Alternative pour la nationalité
-            if not nationality:
-                flag_imgs = soup.find_all("img", class_="flaggenrahmen")
-                for img in flag_imgs:
-                    alt_text = img.get('alt', '')
-                    if 'Sénégal' in alt_text or 'Senegal' in alt_text:
-                        nationality = 'Sénégal'
-                        break
-            
-            # Position
-            position = None
-            # Chercher dans data-header__label
-            labels = soup.find_all("li", class_="data-header__label")
-            for label in labels:
-                text = label.get_text()
-                # Si ça contient "Arrière", "Milieu", "Attaquant", "Gardien"
-                if any(keyword in text for keyword in ["Arrière", "Milieu", "Attaquant", "Gardien", "Défenseur"]):
-                    position = clean_text(text)
-                    break
-            
-            # === Club actuel ===
-            club = None
-            club_elem = soup.find("span", class_="data-header__club")
-            if club_elem:
-                club_link = club_elem.find("a")
-                if club_link:
-                    club = clean_text(club_link.get_text())
-            
-            # === Compétition et pays (SECTION SÉPARÉE) ===
-            competition = None
-            competition_pays = None
-
-            club_elem = soup.find("span", class_="data-header__club")
-            if club_elem:
-                club_link = club_elem.find("a")
-                if club_link:
-                    club = clean_text(club_link.get_text())
-
-                    # 👉 Aller sur la page du club pour extraire la compétition et le pays
-                    club_url = "https://www.transfermarkt.fr" + club_link["href"]
-                    headers = get_random_headers()
-                    random_delay(2, 4)
-                    club_resp = session.get(club_url, headers=headers, timeout=25)
-
-                    if club_resp.status_code == 200:
-                        club_soup = BeautifulSoup(club_resp.text, "html.parser")
-
-                        # === Trouver la compétition actuelle du club ===
-                        comp_elem = club_soup.find("span", class_="data-header__club")
-                        if not comp_elem:
-                            comp_elem = club_soup.find("span", class_="data-header__league")
-                        
-                        if comp_elem:
-                            comp_link = comp_elem.find("a")
-                            if comp_link:
-                                competition = clean_text(comp_link.get_text())
-
-                                # Trouver le drapeau du club → vrai pays du club
-                                flag = club_soup.find("img", class_="flaggenrahmen")
-                                if flag and flag.get("title"):
-                                    competition_pays = clean_text(flag.get("title"))
-                                else:
-                                    # Si le drapeau du club n’est pas trouvé, on va chercher dans la compétition
-                                    comp_url = "https://www.transfermarkt.fr" + comp_link["href"]
-                                    random_delay(2, 4)
-                                    comp_resp = session.get(comp_url, headers=get_random_headers(), timeout=25)
-                                    if comp_resp.status_code == 200:
-                                        comp_soup = BeautifulSoup(comp_resp.text, "html.parser")
-                                        flag = comp_soup.find("img", class_="flaggenrahmen")
-                                        if flag and flag.get("title"):
-                                            competition_pays = clean_text(flag.get("title"))
-
+            with metrics.timed("parse", "profile"):
+                profile = extract_profile(response.text)
             
             return {
-                "name": name,
-                "birth_date": birth_date,
-                "nationality": nationality,
-                "position": position,
-                "current_club": club,
-                "current_competition": competition,
-                "current_pays_de_competition": competition_pays,
+                "name": profile["name"],
+                "birth_date": profile["birth_date"],
+                "nationality": profile["nationality"],
+                "position": profile["position"],
+                "current_club": profile["current_club"],
+                "current_competition": None,
+                "current_pays_de_competition": None,
+                "club_url": BASE_URL + profile["club_href"] if profile["club_href"] else None,
                 "url": url
             }
         
@@ -263,12 +207,120 @@ def get_player_info(url, session, retry=3):
     
     return None
 
-def get_player_stats(url, session, retry=3):
-    """Récupère TOUTES les statistiques du joueur (carrière complète)"""
+def enrich_club(info, session, pause=random_delay, clubs=None):
+    """Compétition et pays depuis la page du club (mémorisés par club), complète `info`"""
+    if not info.get("club_url"):
+        metrics.count_skip("club", "no_club")
+        return info
+    try:
+        competition, competition_pays = get_club_competition(info["club_url"], session, pause, clubs)
+    except requests.exceptions.RequestException as e:
+        # Le joueur reste exploitable sans sa compétition : on ne bloque pas les stats
+        print(f"   ⚠️  Club indisponible: {type(e).__name__}")
+        return info
+    info["current_competition"] = competition
+    info["current_pays_de_competition"] = competition_pays
+    return info
+
+def competition_rows(rows):
+    """Une stat par saison, compétition et club (lignes du tbody, minutes réelles)"""
+    records = {}
+    for cells in rows or []:
+        # Même structure que le footer : 0=Saison, 2=Compétition, 3=Club,
+        # 4=Matchs, 7=Buts, 8=Passes décisives, dernière colonne=Minutes ("9.326'")
+        if len(cells) < 9:
+            continue
+        competition = clean_text(cells[2])
+        if not competition:
+            continue
+        key = (parse_season(cells[0]), competition, clean_text(cells[3]) or "")
+        record = records.setdefault(key, {
+            "saison": key[0], "competition": key[1], "club": key[2],
+            "matches_played": 0, "goals": 0, "assists": 0, "minutes_played": 0,
+        })
+        # Lignes en double sur une même page : on cumule
+        record["matches_played"] += parse_number(cells[4])
+        record["goals"] += parse_number(cells[7])
+        record["assists"] += parse_number(cells[8])
+        record["minutes_played"] += parse_minutes(cells[-1])
+    return list(records.values())
+
+def summarize_stats(table):
+    """Totaux (footer, sinon somme du tbody) et détail par compétition d'un tableau de stats, ou None"""
+    # Détail par saison, compétition et club (lignes du tbody)
+    competitions = competition_rows(table["rows"])
     
-    # URL de la page des performances TOUTES SAISONS confondues
-    stats_url = url.replace('/profil/', '/leistungsdatendetails/')
-    stats_url = stats_url + '/saison//verein/0/liga/0/wettbewerb//pos/0/trainer_id/0/plus/1'
+    # Chercher d'abord dans le FOOTER (contient les totaux de TOUTE LA CARRIÈRE)
+    footer_values = table["footer"]
+    
+    if footer_values:
+        
+        # Structure du footer Transfermarkt:
+        # ['', 'Total:', '', '', '176', '169', '1,38', '64', '9', '-', '73', '42', '6', '-', '2', '6', "146'", "9.326'"]
+        # Index typiques: 4=Matchs, 7=Buts, 8=Passes décisives
+        
+        total_matches = 0
+        total_goals = 0
+        total_assists = 0
+        
+        # Trouver les indices des statistiques
+        for i, val in enumerate(footer_values):
+            num = parse_number(val)
+            
+            # Les matchs sont généralement à l'index 4
+            if i == 4 and num > 0:
+                total_matches = num
+            # Les buts à l'index 7
+            elif i == 7 and num >= 0:
+                total_goals = num
+            # Les passes à l'index 8
+            elif i == 8 and num >= 0:
+                total_assists = num
+        
+        if total_matches > 0:
+            return {
+                "matches_played": total_matches,
+                "goals": total_goals,
+                "assists": total_assists,
+                "minutes_played": total_matches * 90,
+                "competitions": competitions,
+            }
+    
+    # Fallback: lire le tbody si pas de footer
+    rows = table["rows"]
+    if rows:
+        total_matches = 0
+        total_goals = 0
+        total_assists = 0
+        
+        for cells in rows:
+            if len(cells) >= 5:
+                matches = parse_number(cells[1])
+                goals = parse_number(cells[3])
+                assists = parse_number(cells[4])
+                
+                total_matches += matches
+                total_goals += goals
+                total_assists += assists
+        
+        if total_matches > 0:
+            return {
+                "matches_played": total_matches,
+                "goals": total_goals,
+                "assists": total_assists,
+                "minutes_played": total_matches * 90,
+                "competitions": competitions,
+            }
+    
+    return None
+
+def get_player_stats(url, session, retry=3, pause=random_delay, scope=CAREER, max_age=None):
+    """Récupère les statistiques du joueur pour une portée : carrière complète ou une saison
+    (max_age comme pour get_player_info)"""
+    
+    # URL de la page des performances (toutes saisons confondues pour la carrière)
+    stats_url = stats_url_for(url, scope)
+    title = "Carrière" if scope == CAREER else f"Saison {season_label(scope)}"
     
     for attempt in range(retry):
         try:
@@ -276,92 +328,33 @@ def get_player_stats(url, session, retry=3):
             headers = get_random_headers()
             
             # Ajouter un petit délai aléatoire entre info et stats (comportement humain)
-            random_delay(2, 4)
+            pause(2, 4)
             
             if attempt > 0:
-                print(f"   ⏳ Pause de {5 + attempt * 2}s avant nouvelle tentative...")
-                time.sleep(5 + attempt * 2)
+                print(f"   🔁 Nouvelle tentative ({attempt + 1}/{retry})")
+                metrics.count_retry("stats")
+                # Attente fixe hors limiteur ; avec le limiteur adaptatif (pause=no_delay),
+                # c'est lui qui ralentit l'hôte et applique Retry-After
+                pause(5 + attempt * 2, 5 + attempt * 2)
             
-            response = session.get(stats_url, headers=headers, timeout=25)
+            response = session.get(stats_url, headers=headers, timeout=25, **cache_options(max_age))
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
             
             # Chercher le tableau avec la classe 'items'
-            table = soup.find("table", class_="items")
+            with metrics.timed("parse", "stats"):
+                table = extract_stats_table(response.text)
             
             if not table:
                 print("   ⚠️  Tableau de statistiques non trouvé")
                 return None
             
-            # Chercher d'abord dans le FOOTER (contient les totaux de TOUTE LA CARRIÈRE)
-            footer = table.find("tfoot")
-            
-            if footer:
-                cells = footer.find_all("td")
-                footer_values = [clean_text(c.get_text()) for c in cells]
-                
-                # Structure du footer Transfermarkt:
-                # ['', 'Total:', '', '', '176', '169', '1,38', '64', '9', '-', '73', '42', '6', '-', '2', '6', "146'", "9.326'"]
-                # Index typiques: 4=Matchs, 7=Buts, 8=Passes décisives
-                
-                total_matches = 0
-                total_goals = 0
-                total_assists = 0
-                
-                # Trouver les indices des statistiques
-                for i, val in enumerate(footer_values):
-                    num = parse_number(val)
-                    
-                    # Les matchs sont généralement à l'index 4
-                    if i == 4 and num > 0:
-                        total_matches = num
-                    # Les buts à l'index 7
-                    elif i == 7 and num >= 0:
-                        total_goals = num
-                    # Les passes à l'index 8
-                    elif i == 8 and num >= 0:
-                        total_assists = num
-                
-                if total_matches > 0:
-                    print(f"   ⚽ Carrière: {total_matches} matchs | {total_goals} buts | {total_assists} passes")
-                    
-                    return {
-                        "matches_played": total_matches,
-                        "goals": total_goals,
-                        "assists": total_assists,
-                        "minutes_played": total_matches * 90
-                    }
-            
-            # Fallback: lire le tbody si pas de footer
-            tbody = table.find("tbody")
-            if tbody:
-                rows = tbody.find_all("tr")
-                
-                total_matches = 0
-                total_goals = 0
-                total_assists = 0
-                
-                for row in rows:
-                    cells = row.find_all("td")
-                    
-                    if len(cells) >= 5:
-                        matches = parse_number(cells[1].get_text())
-                        goals = parse_number(cells[3].get_text())
-                        assists = parse_number(cells[4].get_text())
-                        
-                        total_matches += matches
-                        total_goals += goals
-                        total_assists += assists
-                
-                if total_matches > 0:
-                    print(f"   ⚽ Carrière: {total_matches} matchs | {total_goals} buts | {total_assists} passes")
-                    
-                    return {
-                        "matches_played": total_matches,
-                        "goals": total_goals,
-                        "assists": total_assists,
-                        "minutes_played": total_matches * 90
-                    }
+            with metrics.timed("parse", "stats_rows"):
+                stats = summarize_stats(table)
+            if stats and stats["competitions"]:
+                print(f"   📊 {len(stats['competitions'])} lignes saison × compétition")
+            if stats:
+                print(f"   ⚽ {title}: {stats['matches_played']} matchs | {stats['goals']} buts | {stats['assists']} passes")
+                return stats
             
             print("   ⚠️  Aucune statistique disponible")
             return None
@@ -388,122 +381,99 @@ def get_player_stats(url, session, retry=3):
     
     return None
 
-def upsert_player(conn, info, stats):
-    """Insère ou met à jour un joueur dans la base de données"""
-    if not info or not info.get('name'):
-        print("   ⚠️  Informations incomplètes")
-        return
+def fetch_player(url, session, freshness=None, scopes=(CAREER,), pause=random_delay, retry=3, clubs=None, force=True):
+    """Enrichissement par étapes : profil → nationalité → club/compétition → stats.
+    Chaque étape ne tourne que si la précédente passe, et compte ce qu'elle évite.
+    Sans force, seules les parties périmées d'après `freshness` sont re-téléchargées.
+    Retourne (statut, info, stats) avec statut success/skipped/error/unchanged et
+    stats = {saison: stats} pour les portées à écrire (nouvelles ou modifiées)"""
+    def stale(part):
+        return force or freshness is None or freshness.is_stale(url, part)
     
-    try:
-        with conn.cursor() as cur:
-            # Vérifier si le joueur existe
-            cur.execute(
-                "SELECT player_id FROM players WHERE name = %s",
-                (info["name"],)
-            )
-            player = cur.fetchone()
-            
-            if player:
-                player_id = player[0]
-                
-                # Mettre à jour les infos du joueur
-                cur.execute("""
-                    UPDATE players 
-                    SET birth_date = COALESCE(%s, birth_date),
-                        nationality = COALESCE(%s, nationality),
-                        position = COALESCE(%s, position),
-                        current_club = COALESCE(%s, current_club),
-                        current_competition = COALESCE(%s, current_competition),
-                        current_pays_de_competition = COALESCE(%s, current_pays_de_competition)
-                    WHERE player_id = %s
-                """, (
-                    info["birth_date"],
-                    info["nationality"],
-                    info["position"],
-                    info["current_club"],
-                    info["current_competition"],
-                    info["current_pays_de_competition"],
-                    player_id
-                ))
-                
-                # Vérifier si une performance agrégée existe déjà
-                if stats:
-                    cur.execute("""
-                        SELECT perf_id FROM performances 
-                        WHERE player_id = %s AND match_id IS NULL
-                    """, (player_id,))
-                    
-                    existing_perf = cur.fetchone()
-                    
-                    if existing_perf:
-                        # Mettre à jour
-                        cur.execute("""
-                            UPDATE performances
-                            SET goals = %s,
-                                assists = %s,
-                                minutes_played = %s
-                            WHERE perf_id = %s
-                        """, (
-                            stats["goals"],
-                            stats["assists"],
-                            stats["minutes_played"],
-                            existing_perf[0]
-                        ))
-                    else:
-                        # Créer
-                        cur.execute("""
-                            INSERT INTO performances (player_id, match_id, minutes_played, goals, assists)
-                            VALUES (%s, NULL, %s, %s, %s)
-                        """, (
-                            player_id,
-                            stats["minutes_played"],
-                            stats["goals"],
-                            stats["assists"]
-                        ))
-            else:
-                # Insérer un nouveau joueur
-                cur.execute("""
-                    INSERT INTO players (name, birth_date, nationality, position, current_club, 
-                                       current_competition, current_pays_de_competition)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING player_id
-                """, (
-                    info["name"],
-                    info["birth_date"],
-                    info["nationality"],
-                    info["position"],
-                    info["current_club"],
-                    info["current_competition"],
-                    info["current_pays_de_competition"]
-                ))
-                player_id = cur.fetchone()[0]
-                
-                # Insérer les stats
-                if stats:
-                    cur.execute("""
-                        INSERT INTO performances (player_id, match_id, minutes_played, goals, assists)
-                        VALUES (%s, NULL, %s, %s, %s)
-                    """, (
-                        player_id,
-                        stats["minutes_played"],
-                        stats["goals"],
-                        stats["assists"]
-                    ))
-        
-        conn.commit()
-        print(f"   ✅ Enregistré")
-        
-    except Exception as e:
-        conn.rollback()
-        print(f"   ❌ Erreur DB: {type(e).__name__}")
-        raise
+    def max_age(part):
+        # Partie forcée ou périmée : le cache HTTP (TTL 7 jours) ne doit pas la resservir telle quelle
+        if freshness is None:
+            return None
+        return 0 if force else freshness.max_age(part).total_seconds()
+    
+    def changed(part, data):
+        return freshness.record(url, part, data) if freshness is not None else True
+    
+    # === Étape 1 : profil ===
+    if stale(PROFILE):
+        info = get_player_info(url, session, retry=retry, pause=pause, max_age=max_age(PROFILE))
+        if not info or not info.get('name'):
+            print(f"   ⏭️  Ignoré: infos manquantes")
+            metrics.count_skip("nationality", "profile_error")
+            metrics.count_skip("club", "profile_error")
+            metrics.count_skip("stats", "profile_error", len(scopes))
+            return "error", info, {}
+        fresh_profile = True
+        print(f"   👤 {info['name']}")
+    else:
+        info = freshness.data(url, PROFILE)
+        fresh_profile = False
+        metrics.count_skip("profile", "fresh")
+        print(f"   👤 {info['name']} (profil à jour)")
+    
+    # === Étape 2 : nationalité, avant toute page club, compétition ou stats ===
+    if not is_senegalese(info):
+        print(f"   ⏭️  Autre nationalité: {info.get('nationality', 'N/A')}")
+        if fresh_profile:
+            changed(PROFILE, info)
+            metrics.count_skip("club", "nationality")
+        metrics.count_skip("stats", "nationality", len(scopes))
+        return "skipped", info, {}
+    
+    # === Étape 3 : club → compétition et pays (profil re-téléchargé seulement) ===
+    profile_changed = False
+    if fresh_profile:
+        enrich_club(info, session, pause, clubs)
+        profile_changed = changed(PROFILE, info)
+        if info.get('current_competition') or info.get('current_pays_de_competition'):
+            comp = info.get('current_competition', 'N/A')
+            pays = info.get('current_pays_de_competition', 'N/A')
+            print(f"   🏆 {comp} - {pays}")
+    
+    # === Étape 4 : une page de stats par portée, seulement si elle est périmée ===
+    stats = {}
+    for scope in scopes:
+        part = stats_part(scope)
+        if not stale(part):
+            metrics.count_skip("stats", "fresh")
+            continue
+        scope_stats = get_player_stats(url, session, retry=retry, pause=pause, scope=scope, max_age=max_age(part))
+        if scope_stats and (changed(part, scope_stats) or force):
+            stats[season_label(scope)] = scope_stats
+    
+    if force or profile_changed or stats:
+        return "success", info, stats
+    
+    print(f"   ✔️  Inchangé depuis le dernier passage")
+    return "unchanged", info, {}
 
-def scrape_all_players():
-    """Fonction principale de scraping"""
+def scrape_all_players(replay=False, batch_size=DEFAULT_BATCH_SIZE, mode="all", max_ages=None,
+                       scopes=(CAREER,), job="players", rate=DEFAULT_RATE, max_rate=MAX_RATE):
+    """Fonction principale de scraping (replay=True : re-parse le cache HTTP, sans réseau ;
+    mode resume / retry-failed : reprend d'après les points de reprise en base ;
+    mode refresh : ne re-télécharge que les parties plus vieilles que `max_ages` ;
+    scopes : carrière et/ou saisons, une ligne performances par portée ;
+    rate / max_rate : débit de départ et plafond du limiteur adaptatif)"""
+    metrics.reset()
     conn = get_connection()
+    # Statuts par URL et fraîcheur, écrits avec chaque lot de joueurs (une transaction par lot)
+    checkpoints = CheckpointStore(conn, job=job)
+    freshness = FreshnessStore(conn, max_ages)
+    buffer = PlayerBuffer(conn, batch_size, checkpoints=checkpoints, freshness=freshness)
     
-    # Créer une session pour réutiliser les connexions (plus réaliste)
-    session = requests.Session()
+    # Créer une session pour réutiliser les connexions (plus réaliste), derrière le cache
+    # disque : seuls les vrais accès réseau (mesurés) passent par le limiteur adaptatif
+    limiter = AdaptiveRateLimiter(rate, DEFAULT_BURST, max_rate=max_rate)
+    network = RateLimitedSession(InstrumentedSession(requests.Session(), metrics), limiter)
+    session = CachedSession(network, offline=replay)
+    retry = 1 if replay else 3
+    # Table club → (compétition, pays) rechargée du run précédent
+    clubs = ClubLookup()
     
     # CSV avec les URLs
     players_csv = "data/raw/senegal_players_list.csv"
@@ -512,73 +482,101 @@ def scrape_all_players():
         print(f"❌ Fichier {players_csv} introuvable")
         return
     
-    df_urls = pd.read_csv(players_csv)
+    all_urls = pd.read_csv(players_csv)["url"].tolist()
+    urls = checkpoints.select_urls(all_urls, "all" if mode == "refresh" else mode)
+    freshness.load(urls)
     print(f"\n{'='*70}")
     print(f"🚀 SCRAPING TRANSFERMARKT - JOUEURS SÉNÉGALAIS")
     print(f"{'='*70}")
-    print(f"📋 {len(df_urls)} joueurs à traiter")
-    print(f"📅 Saison ciblée: 2024/25")
+    print(f"📋 {len(urls)} joueurs à traiter (sur {len(all_urls)}, mode {mode})")
+    print(f"📅 Portées: {', '.join(season_label(scope) for scope in scopes)}")
+    if mode == "refresh":
+        stale = freshness.stale_counts(urls, [PROFILE] + [stats_part(scope) for scope in scopes])
+        stale_stats = sum(count for part, count in stale.items() if part != PROFILE)
+        print(f"🕒 À rafraîchir: {stale[PROFILE]} profils, {stale_stats} pages de stats")
     print(f"🎭 Rotation de {len(USER_AGENTS)} User-Agents")
-    print(f"⏱️  Délais aléatoires: 3-7 secondes entre requêtes\n")
-    
-    success_count = 0
-    error_count = 0
-    skipped_count = 0
+    if replay:
+        print(f"💾 Mode replay: pages lues depuis le cache, aucun accès réseau\n")
+    else:
+        print(f"🚦 Débit adaptatif: {rate} req/s au départ, jusqu'à {max_rate} req/s\n")
     
-    for idx, row in df_urls.iterrows():
-        url = row["url"]
-        
+    for idx, url in enumerate(urls):
         print(f"\n{'─'*70}")
-        print(f"[{idx+1}/{len(df_urls)}] 🔗 Traitement...")
+        print(f"[{idx+1}/{len(urls)}] 🔗 Traitement...")
         
         try:
-            # Récupérer les infos
-            info = get_player_info(url, session)
+            status, info, stats = fetch_player(
+                url, session, freshness, scopes, pause=no_delay, retry=retry, clubs=clubs, force=mode != "refresh"
+            )
             
-            if not info or not info.get('name'):
-                print(f"   ⏭️  Ignoré: infos manquantes")
-                error_count += 1
-                random_delay(2, 4)  # Pause même en cas d'erreur
+            if status == "error":
+                checkpoints.record(url, FAILED, "infos manquantes")
                 continue
             
-            print(f"   👤 {info['name']}")
-            if info.get('current_competition') or info.get('current_pays_de_competition'):
-                comp = info.get('current_competition', 'N/A')
-                pays = info.get('current_pays_de_competition', 'N/A')
-                print(f"   🏆 {comp} - {pays}")
-            
-            # Vérifier la nationalité
-            if info["nationality"] and "Sénégal" in info["nationality"]:
-                # Récupérer les stats
-                stats = get_player_stats(url, session)
-                
-                # Insérer dans la base
-                upsert_player(conn, info, stats)
-                success_count += 1
+            if status == "success":
+                # Mettre en attente d'écriture dans la base (statut écrit avec le lot)
+                checkpoints.record(url, DONE, batched=True)
+                buffer.add(info, stats, url)
+            elif status == "unchanged":
+                # Rien à écrire dans players / performances
+                checkpoints.record(url, DONE)
             else:
-                print(f"   ⏭️  Autre nationalité: {info.get('nationality', 'N/A')}")
-                skipped_count += 1
+                checkpoints.record(url, SKIPPED)
         
         except Exception as e:
             print(f"   ❌ Erreur: {type(e).__name__}")
-            error_count += 1
-        
-        # Pause aléatoire entre joueurs (simule comportement humain)
-        if idx < len(df_urls) - 1:  # Pas de pause après le dernier
-            delay = random.uniform(4, 8)
-            print(f"   ⏳ Pause de {delay:.1f}s avant le prochain joueur...")
-            time.sleep(delay)
+            checkpoints.record(url, FAILED, type(e).__name__)
     
+    buffer.flush()
     session.close()
-    conn.close()
+    clubs.save()
+    metrics.add_sleep("rate_limit", network.waited)
     
     print(f"\n{'='*70}")
     print(f"✅ SCRAPING TERMINÉ!")
     print(f"{'='*70}")
-    print(f"   ✓ Succès:              {success_count} joueurs")
-    print(f"   ⊘ Autre nationalité:   {skipped_count} joueurs")
-    print(f"   ✗ Erreurs:             {error_count} joueurs")
+    checkpoints.print_summary(all_urls)
+    print(f"   {session.summary()}")
+    print(f"   {limiter.summary()}")
+    print(f"   {clubs.summary()}")
+    print(f"   {buffer.summary()}")
+    print(f"   {metrics.report()}")
+    print(f"   {metrics.skip_report()}")
+    cache = {"hits": session.hits, "revalidated": session.revalidated, "misses": session.misses}
+    pacing = {"rates": limiter.rates(), "throttles": limiter.throttles}
+    print(f"   📈 Télémétrie: {metrics.write(job, extra={'players': len(urls), 'cache': cache, 'pacing': pacing})}")
     print(f"{'='*70}\n")
+    conn.close()
+
+def add_run_arguments(parser, default_scopes=CAREER):
+    """Options communes aux scrapers (séquentiel et concurrent)"""
+    parser.add_argument("--scopes", default=default_scopes,
+                        help="portées des stats : career et/ou saisons, ex. career,2015-2025")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="débit de départ par hôte (req/s)")
+    parser.add_argument("--max-rate", type=float, default=MAX_RATE, help="débit maximal par hôte (req/s)")
+    parser.add_argument("--replay", action="store_true", help="re-parser les pages du cache HTTP sans accès réseau")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="joueurs par écriture groupée en base")
+    parser.add_argument("--resume", action="store_true", help="ne traiter que les URLs en attente ou en échec réessayable")
+    parser.add_argument("--retry-failed", action="store_true", help="ne retraiter que les URLs en échec")
+    parser.add_argument("--refresh", action="store_true", help="ne re-télécharger que les parties périmées")
+    parser.add_argument("--profile-max-age", type=float, default=MAX_AGES["profile"].days, help="âge max d'un profil (jours)")
+    parser.add_argument("--stats-max-age", type=float, default=MAX_AGES["stats"].days, help="âge max des stats (jours)")
+
+def run_options(args):
+    """Arguments de scrape_all_players déduits des options communes"""
+    mode = "refresh" if args.refresh else "retry-failed" if args.retry_failed else "resume" if args.resume else "all"
+    return {
+        "replay": args.replay,
+        "batch_size": args.batch_size,
+        "mode": mode,
+        "max_ages": {"profile": timedelta(days=args.profile_max_age), "stats": timedelta(days=args.stats_max_age)},
+        "scopes": parse_scopes(args.scopes),
+        "rate": args.rate,
+        "max_rate": args.max_rate,
+    }
 
 if __name__ == "__main__":
-    scrape_all_players()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scraping Transfermarkt - carrière et saisons")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+    scrape_all_players(**run_options(args))
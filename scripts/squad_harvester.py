@@ -0,0 +1,290 @@
+import argparse
+import os
+import re
+
+import pandas as pd
+import requests
+
+from checkpoint import DONE, FAILED, CheckpointStore
+from club_lookup import ClubLookup
+from freshness import PROFILE, FreshnessStore, stats_part
+from html_extract import extract_squad, first_flag_title
+from http_cache import CachedSession
+from rate_limit import DEFAULT_BURST, MAX_RATE, AdaptiveRateLimiter, RateLimitedSession
+from telemetry import InstrumentedSession, metrics
+from db_writer import CAREER, DEFAULT_BATCH_SIZE, PlayerBuffer
+import scraper_players
+from scraper_players import (
+    DEFAULT_RATE, enrich_club, get_connection, get_player_info, get_player_stats, get_random_headers,
+    is_senegalese, no_delay, parse_scopes, season_label,
+)
+
+# ===============================================================
+#  Récolte des joueurs sénégalais depuis les pages d'effectif
+# ===============================================================
+# Une page kader (club ou sélection) donne d'un coup nom, poste, date de
+# naissance et nationalités de tout l'effectif ; une page de club donne en
+# plus le club et sa compétition (header). Le profil n'est téléchargé que si
+# la ligne est incomplète, la page club que si la compétition manque (joueurs
+# vus seulement en sélection). Restent les pages de stats, une par portée.
+#   python scripts/squad_harvester.py --national --from-clubs
+#   python scripts/squad_harvester.py --squads data/raw/squad_pages.csv --no-stats --update-list
+
+SQUADS_CSV = "data/raw/squad_pages.csv"
+PLAYERS_CSV = "data/raw/senegal_players_list.csv"
+NATIONAL_SQUAD_PATH = "/senegal/kader/verein/3499"
+NATIONALITY = "Sénégal"
+
+# Champs sans lesquels on complète la ligne par la page profil
+REQUIRED_FIELDS = ["name", "birth_date", "nationality", "position"]
+
+CLUB_PATH_RE = re.compile(r'^(.*?)/(?:startseite|kader)/verein/(\d+)')
+
+
+def absolute(url):
+    return url if url.startswith("http") else scraper_players.BASE_URL + url
+
+def squad_url(url, season=None):
+    """Page club ou effectif → page effectif détaillée (plus/1), pour une saison si donnée"""
+    match = CLUB_PATH_RE.match(absolute(url))
+    if not match:
+        return None
+    saison = f"/saison_id/{season}" if season else ""
+    return f"{match.group(1)}/kader/verein/{match.group(2)}{saison}/plus/1"
+
+def club_url_for(url):
+    """Page effectif → page d'accueil du club (clé de la table des clubs)"""
+    match = CLUB_PATH_RE.match(url)
+    return f"{match.group(1)}/startseite/verein/{match.group(2)}" if match else None
+
+def get_squad(url, session, retry=3, pause=no_delay):
+    """Télécharge et découpe une page d'effectif, None en cas d'échec"""
+    for attempt in range(retry):
+        try:
+            if attempt > 0:
+                print(f"   🔁 Nouvelle tentative ({attempt + 1}/{retry})")
+                metrics.count_retry("squad")
+                pause(5 + attempt * 2, 5 + attempt * 2)
+
+            response = session.get(url, headers=get_random_headers(), timeout=25)
+            response.raise_for_status()
+            with metrics.timed("parse", "squad"):
+                return extract_squad(response.text)
+
+        except requests.exceptions.RequestException as e:
+            if attempt < retry - 1:
+                print(f"   ⚠️  Erreur réseau effectif (tentative {attempt + 1}/{retry})")
+                continue
+            print(f"   ❌ Effectif indisponible: {type(e).__name__}")
+            return None
+
+        except Exception as e:
+            print(f"   ❌ Erreur effectif: {type(e).__name__}")
+            return None
+
+    return None
+
+def competition_country(squad, session):
+    """Pays de la compétition si le drapeau manque dans le header du club"""
+    if squad["pays"] or not squad["competition_href"]:
+        return squad["pays"]
+    try:
+        response = session.get(absolute(squad["competition_href"]), headers=get_random_headers(), timeout=25)
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    return first_flag_title(response.text)
+
+def squad_players(url, squad, session, clubs):
+    """Lignes sénégalaises d'un effectif, au format de get_player_info.
+    Sans compétition dans le header, c'est une sélection : le club vient de la ligne."""
+    national = not squad["competition"]
+    club_url = None
+    pays = None
+    if not national:
+        club_url = club_url_for(url)
+        pays = competition_country(squad, session)
+        if clubs is not None and club_url:
+            clubs.put(club_url, squad["competition"], pays)
+
+    players = []
+    for row in squad["players"]:
+        nationality = row["nationality"] or (NATIONALITY if national else None)
+        if not (nationality and is_senegalese({"nationality": nationality})):
+            metrics.count_skip("profile", "nationality")
+            continue
+        players.append({
+            "name": row["name"],
+            "birth_date": row["birth_date"],
+            "nationality": nationality,
+            "position": row["position"],
+            "current_club": row["club"] if national else squad["team"],
+            "current_competition": None if national else squad["competition"],
+            "current_pays_de_competition": None if national else pays,
+            "club_url": (absolute(row["club_href"]) if row["club_href"] else None) if national else club_url,
+            "url": absolute(row["href"]),
+        })
+    return players
+
+def merge_player(known, info):
+    """Un joueur vu dans plusieurs effectifs (club et sélection) : on complète les champs vides"""
+    for field, value in info.items():
+        if known.get(field) is None and value is not None:
+            known[field] = value
+    return known
+
+def complete_player(info, session, clubs=None, retry=3):
+    """Passe par le chemin joueur par joueur uniquement pour les champs absents du tableau"""
+    missing = [field for field in REQUIRED_FIELDS if not info.get(field)]
+    if missing:
+        print(f"   🔎 {info.get('name') or info['url']}: profil pour {', '.join(missing)}")
+        profile = get_player_info(info["url"], session, retry=retry, pause=no_delay)
+        if profile:
+            merge_player(info, profile)
+    else:
+        metrics.count_skip("profile", "squad")
+
+    if info.get("current_competition"):
+        metrics.count_skip("club", "squad")
+    else:
+        enrich_club(info, session, no_delay, clubs)
+    return info
+
+def update_players_list(urls, path=PLAYERS_CSV):
+    """Ajoute les URLs récoltées à la liste des scrapers joueur par joueur, retourne le nombre ajouté"""
+    known = pd.read_csv(path) if os.path.exists(path) else pd.DataFrame(columns=["url"])
+    seen = set(known["url"])
+    new = [url for url in urls if url not in seen]
+    if new:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pd.concat([known, pd.DataFrame({"url": new})], ignore_index=True).to_csv(path, index=False)
+    return len(new)
+
+def squad_pages(squads_csv=SQUADS_CSV, national=False, from_clubs=False, season=None, clubs=None):
+    """URLs des effectifs à parcourir : CSV (colonne url), sélection, clubs déjà connus"""
+    urls = []
+    if squads_csv and os.path.exists(squads_csv):
+        urls.extend(pd.read_csv(squads_csv)["url"].tolist())
+    if national:
+        urls.append(NATIONAL_SQUAD_PATH)
+    if from_clubs and clubs is not None:
+        urls.extend(clubs.entries)
+    pages = (squad_url(url, season) for url in urls)
+    return list(dict.fromkeys(page for page in pages if page))
+
+def harvest(squads_csv=SQUADS_CSV, national=False, from_clubs=False, season=None, scopes=(CAREER,),
+            with_stats=True, replay=False, batch_size=DEFAULT_BATCH_SIZE, refresh=False, max_ages=None,
+            update_list=False, rate=DEFAULT_RATE, max_rate=MAX_RATE, job="squads"):
+    """Parcourt les effectifs, écrit les joueurs sénégalais (players, performances) et leurs stats"""
+    metrics.reset()
+    clubs = ClubLookup()
+    pages = squad_pages(squads_csv, national, from_clubs, season, clubs)
+    if not pages:
+        print(f"❌ Aucun effectif à parcourir ({squads_csv}, --national ou --from-clubs)")
+        return
+
+    conn = get_connection()
+    checkpoints = CheckpointStore(conn, job=job)
+    freshness = FreshnessStore(conn, max_ages)
+    buffer = PlayerBuffer(conn, batch_size, checkpoints=checkpoints, freshness=freshness)
+    limiter = AdaptiveRateLimiter(rate, DEFAULT_BURST, max_rate=max_rate)
+    network = RateLimitedSession(InstrumentedSession(requests.Session(), metrics), limiter)
+    session = CachedSession(network, offline=replay)
+    retry = 1 if replay else 3
+
+    print(f"\n{'='*70}")
+    print(f"🚀 RÉCOLTE DES EFFECTIFS - JOUEURS SÉNÉGALAIS")
+    print(f"{'='*70}")
+    print(f"📋 {len(pages)} pages d'effectif")
+    if with_stats:
+        print(f"📅 Portées: {', '.join(season_label(scope) for scope in scopes)}\n")
+
+    # === Étape 1 : effectifs ===
+    players = {}
+    rows = 0
+    for idx, page in enumerate(pages):
+        squad = get_squad(page, session, retry=retry)
+        if not squad:
+            continue
+        rows += len(squad["players"])
+        found = squad_players(page, squad, session, clubs)
+        print(f"[{idx+1}/{len(pages)}] 🏟️  {squad['team']}: {len(found)} Sénégalais sur {len(squad['players'])}")
+        for info in found:
+            merge_player(players.setdefault(info["url"], {}), info)
+
+    if not players:
+        print("⚠️  Aucun joueur sénégalais trouvé")
+    freshness.load(players)
+
+    # === Étape 2 : champs manquants et stats, joueur par joueur ===
+    # Un profil illisible ne fait échouer que son joueur : les autres sont récoltés et écrits
+    failed = 0
+    try:
+        for idx, (url, info) in enumerate(players.items()):
+            try:
+                complete_player(info, session, clubs, retry)
+                freshness.record(url, PROFILE, info)
+                stats = {}
+                for scope in scopes if with_stats else ():
+                    part = stats_part(scope)
+                    if refresh and not freshness.is_stale(url, part):
+                        metrics.count_skip("stats", "fresh")
+                        continue
+                    # Comme fetch_player : page périmée ou forcée, pas resservie par le cache HTTP (TTL 7 jours)
+                    max_age = freshness.max_age(part).total_seconds() if refresh else 0
+                    scope_stats = get_player_stats(url, session, retry=retry, pause=no_delay, scope=scope, max_age=max_age)
+                    if scope_stats:
+                        freshness.record(url, part, scope_stats)
+                        stats[season_label(scope)] = scope_stats
+            except Exception as e:
+                failed += 1
+                print(f"   [{idx+1}/{len(players)}] ❌ {info.get('name') or url}: {type(e).__name__}")
+                checkpoints.record(url, FAILED, type(e).__name__)
+                continue
+            print(f"   [{idx+1}/{len(players)}] 👤 {info['name']} ({len(stats)} portées)")
+            checkpoints.record(url, DONE, batched=True)
+            buffer.add(info, stats, url)
+        buffer.flush()
+    finally:
+        session.close()
+        clubs.save()
+        conn.close()
+    metrics.add_sleep("rate_limit", network.waited)
+
+    print(f"\n{'='*70}")
+    print(f"✅ RÉCOLTE TERMINÉE!")
+    print(f"{'='*70}")
+    print(f"   🏟️  Effectifs:          {len(pages)} pages | {rows} lignes | {len(players)} Sénégalais")
+    print(f"   ✗ Erreurs:             {failed} joueurs (profil ou stats illisibles, à reprendre)")
+    if update_list:
+        print(f"   📝 Liste des joueurs:  {update_players_list(players)} URLs ajoutées à {PLAYERS_CSV}")
+    print(f"   {session.summary()}")
+    print(f"   {limiter.summary()}")
+    print(f"   {clubs.summary()}")
+    print(f"   {buffer.summary()}")
+    print(f"   {metrics.report()}")
+    print(f"   {metrics.skip_report()}")
+    extra = {"squads": len(pages), "rows": rows, "players": len(players), "failed": failed, "network_pages": network.pages}
+    print(f"   📈 Télémétrie: {metrics.write(job, extra=extra)}")
+    print(f"{'='*70}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Récolte des joueurs sénégalais depuis les pages d'effectif")
+    parser.add_argument("--squads", default=SQUADS_CSV, help="CSV des pages club ou effectif (colonne url)")
+    parser.add_argument("--national", action="store_true", help="ajouter l'effectif de la sélection du Sénégal")
+    parser.add_argument("--from-clubs", action="store_true", help="ajouter les clubs de la table des clubs (data/raw/club_lookup.json)")
+    parser.add_argument("--season", help="saison des effectifs (année de début, ex. 2025), défaut : saison en cours")
+    parser.add_argument("--scopes", default=CAREER, help="portées des stats : career et/ou saisons, ex. career,2025")
+    parser.add_argument("--no-stats", action="store_true", help="joueurs seulement, sans pages de stats")
+    parser.add_argument("--refresh", action="store_true", help="ne re-télécharger que les stats périmées")
+    parser.add_argument("--update-list", action="store_true", help=f"ajouter les URLs trouvées à {PLAYERS_CSV}")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="débit de départ par hôte (req/s)")
+    parser.add_argument("--max-rate", type=float, default=MAX_RATE, help="débit maximal par hôte (req/s)")
+    parser.add_argument("--replay", action="store_true", help="re-parser les pages du cache HTTP sans accès réseau")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="joueurs par écriture groupée en base")
+    args = parser.parse_args()
+    harvest(args.squads, args.national, args.from_clubs, args.season, parse_scopes(args.scopes),
+            with_stats=not args.no_stats, replay=args.replay, batch_size=args.batch_size, refresh=args.refresh,
+            update_list=args.update_list, rate=args.rate, max_rate=args.max_rate)
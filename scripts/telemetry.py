@@ -0,0 +1,256 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+from html_extract import page_type
+
+# ===============================================================
+#  Télémétrie du scraping : où passe le temps d'un run ?
+# ===============================================================
+# Latence, taille et code HTTP de chaque requête réseau par type de page
+# (profile / club / competition / stats), retries, étapes évitées, temps de parsing et
+# d'écriture en base, et temps passé à dormir (pauses, retries) face au
+# temps de travail, profondeur des files du pipeline. En fin de run : un résumé JSON et un fichier au format
+# texte Prometheus dans data/logs/.
+
+LOG_DIR = Path("data/logs")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25)
+SIZE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000)
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class Histogram:
+    """Histogramme cumulatif à la Prometheus (bornes `le`, somme, compte)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        """Borne du bucket qui contient le quantile q (approximation Prometheus)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": round(self.sum / self.count, 4) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip((str(b) for b in self.buckets), self.counts)),
+        }
+
+
+class Telemetry:
+    """Compteurs et histogrammes d'un run, thread-safe (scraper concurrent)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.monotonic()
+            self.requests = {}    # page → Histogram des latences
+            self.sizes = {}       # page → Histogram des tailles
+            self.bytes = {}       # page → octets reçus
+            self.statuses = {}    # (page, status) → nombre
+            self.retries = {}     # page → nombre
+            self.skipped = {}     # (étape, raison) → nombre
+            self.stages = {}      # (stage, label) → Histogram (parse, db)
+            self.slept = {}       # raison → secondes
+            self.depths = {}      # file → Histogram des profondeurs échantillonnées
+
+    def observe_request(self, page, seconds, size, status):
+        with self.lock:
+            self.requests.setdefault(page, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.sizes.setdefault(page, Histogram(SIZE_BUCKETS)).observe(size)
+            self.bytes[page] = self.bytes.get(page, 0) + size
+            self.statuses[(page, str(status))] = self.statuses.get((page, str(status)), 0) + 1
+
+    def count_retry(self, page):
+        with self.lock:
+            self.retries[page] = self.retries.get(page, 0) + 1
+
+    def count_skip(self, stage, reason, n=1):
+        """Étape d'enrichissement évitée (ex. club non téléchargé : autre nationalité)"""
+        if n <= 0:
+            return
+        with self.lock:
+            self.skipped[(stage, reason)] = self.skipped.get((stage, reason), 0) + n
+
+    def observe(self, stage, label, seconds):
+        with self.lock:
+            self.stages.setdefault((stage, label), Histogram(LATENCY_BUCKETS)).observe(seconds)
+
+    @contextmanager
+    def timed(self, stage, label):
+        """Mesure un bloc de travail : with metrics.timed("parse", "profile"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, label, time.perf_counter() - start)
+
+    def observe_depth(self, queue, depth):
+        with self.lock:
+            self.depths.setdefault(queue, Histogram(DEPTH_BUCKETS)).observe(depth)
+
+    def add_sleep(self, reason, seconds):
+        with self.lock:
+            self.slept[reason] = self.slept.get(reason, 0.0) + seconds
+
+    def sleep(self, seconds, reason):
+        """time.sleep comptabilisé"""
+        time.sleep(seconds)
+        self.add_sleep(reason, seconds)
+
+    def summary(self):
+        with self.lock:
+            wall = time.monotonic() - self.started
+            request_time = sum(h.sum for h in self.requests.values())
+            stage_time = {}
+            for (stage, _), hist in self.stages.items():
+                stage_time[stage] = stage_time.get(stage, 0.0) + hist.sum
+            slept = sum(self.slept.values())
+            return {
+                "wall_seconds": round(wall, 3),
+                "time": {
+                    "network_seconds": round(request_time, 3),
+                    **{f"{stage}_seconds": round(t, 3) for stage, t in stage_time.items()},
+                    "sleep_seconds": round(slept, 3),
+                    "work_seconds": round(request_time + sum(stage_time.values()), 3),
+                },
+                "sleep_by_reason": {reason: round(t, 3) for reason, t in self.slept.items()},
+                "requests": {page: hist.to_dict() for page, hist in self.requests.items()},
+                "response_bytes": {page: hist.to_dict() for page, hist in self.sizes.items()},
+                "statuses": {f"{page}:{status}": n for (page, status), n in self.statuses.items()},
+                "retries": dict(self.retries),
+                "skipped": {f"{stage}:{reason}": n for (stage, reason), n in self.skipped.items()},
+                "stages": {f"{stage}:{label}": hist.to_dict() for (stage, label), hist in self.stages.items()},
+                "queues": {queue: hist.to_dict() for queue, hist in self.depths.items()},
+            }
+
+    def prometheus(self, job):
+        """Exposition au format texte Prometheus (textfile collector)"""
+        lines = []
+
+        def histogram(name, help_text, hists, label):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, hist in hists.items():
+                labels = f'job="{job}",{label(key)}'
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        def counter(name, help_text, values, label):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in values.items():
+                lines.append(f'{name}{{job="{job}",{label(key)}}} {value}')
+
+        with self.lock:
+            histogram("scraper_request_seconds", "Latence des requêtes HTTP par type de page",
+                      self.requests, lambda page: f'page="{page}"')
+            histogram("scraper_response_bytes", "Taille des réponses HTTP par type de page",
+                      self.sizes, lambda page: f'page="{page}"')
+            histogram("scraper_stage_seconds", "Durée du parsing et des écritures en base",
+                      self.stages, lambda key: f'stage="{key[0]}",label="{key[1]}"')
+            histogram("scraper_queue_depth", "Profondeur échantillonnée des files du pipeline",
+                      self.depths, lambda queue: f'queue="{queue}"')
+            counter("scraper_responses_total", "Réponses HTTP par type de page et code",
+                    self.statuses, lambda key: f'page="{key[0]}",status="{key[1]}"')
+            counter("scraper_retries_total", "Nouvelles tentatives par type de page",
+                    self.retries, lambda page: f'page="{page}"')
+            counter("scraper_skipped_total", "Étapes d'enrichissement évitées par étape et raison",
+                    self.skipped, lambda key: f'stage="{key[0]}",reason="{key[1]}"')
+            counter("scraper_sleep_seconds_total", "Temps passé à dormir par raison",
+                    self.slept, lambda reason: f'reason="{reason}"')
+            lines.append("# HELP scraper_wall_seconds Durée totale du run")
+            lines.append("# TYPE scraper_wall_seconds gauge")
+            lines.append(f'scraper_wall_seconds{{job="{job}"}} {time.monotonic() - self.started:.3f}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, job, extra=None, log_dir=LOG_DIR):
+        """Écrit <job>_<horodatage>.json et <job>.prom (écrasé à chaque run) dans data/logs/"""
+        log_dir = Path(log_dir)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        summary = {"job": job, "finished_at": datetime.now().isoformat(timespec="seconds"),
+                   **self.summary(), **(extra or {})}
+        json_path = log_dir / f"{job}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        json_path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        (log_dir / f"{job}.prom").write_text(self.prometheus(job), encoding="utf-8")
+        return json_path
+
+    def report(self):
+        """Une ligne de bilan pour la fin de run"""
+        time_split = self.summary()["time"]
+        return (f"⏱️  Temps: {time_split['work_seconds']:.1f}s de travail "
+                f"(réseau {time_split['network_seconds']:.1f}s) | {time_split['sleep_seconds']:.1f}s de pauses")
+
+    def skip_report(self):
+        """Étapes évitées, par étape : « club 12 (nationality 10, no_club 2) »"""
+        with self.lock:
+            by_stage = {}
+            for (stage, reason), n in sorted(self.skipped.items()):
+                by_stage.setdefault(stage, {})[reason] = n
+        if not by_stage:
+            return "⏭️  Étapes évitées: aucune"
+        parts = []
+        for stage, reasons in by_stage.items():
+            detail = ", ".join(f"{reason} {n}" for reason, n in reasons.items())
+            parts.append(f"{stage} {sum(reasons.values())} ({detail})")
+        return "⏭️  Étapes évitées: " + " | ".join(parts)
+
+
+class InstrumentedSession:
+    """Enveloppe une requests.Session : chaque get() réseau est mesuré par type de page"""
+
+    def __init__(self, session, telemetry):
+        self.session = session
+        self.telemetry = telemetry
+
+    def get(self, url, **kwargs):
+        page = page_type(url)
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        except requests.exceptions.Timeout:
+            self.telemetry.observe_request(page, time.perf_counter() - start, 0, "timeout")
+            raise
+        except requests.exceptions.RequestException:
+            self.telemetry.observe_request(page, time.perf_counter() - start, 0, "error")
+            raise
+        self.telemetry.observe_request(page, time.perf_counter() - start, len(response.content), response.status_code)
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+# Télémétrie du run en cours, partagée par les scrapers
+metrics = Telemetry()
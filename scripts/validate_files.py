@@ -1,11 +1,14 @@
+import io
 import pandas as pd
-import os
+
+from landing_zone import LandingZone
 
 RAW_DIR = "data/raw/"
 
-def validate_file(filepath):
+def validate_file(filepath, content=None):
+    """Valide un CSV brut ; `content` : texte déjà lu (fichier compacté dans un segment)"""
     print(f"\n🔍 Validation du fichier : {filepath}")
-    df = pd.read_csv(filepath)
+    df = pd.read_csv(io.StringIO(content) if content is not None else filepath)
 
     # Vérification de base
     print(f"- {len(df)} lignes, {len(df.columns)} colonnes")
@@ -27,6 +30,8 @@ def validate_file(filepath):
     print("✅ Validation terminée\n")
 
 if __name__ == "__main__":
-    for file in os.listdir(RAW_DIR):
-        if file.endswith(".csv"):
-            validate_file(os.path.join(RAW_DIR, file))
+    # CSV en vrac ou compactés dans les segments (manifeste de landing_zone.py)
+    zone = LandingZone(RAW_DIR)
+    for entry in zone.entries(include_other=True):
+        if entry["name"].endswith(".csv"):
+            validate_file(entry["name"], zone.read_text(entry))
@@ -0,0 +1,391 @@
+import argparse
+import os
+import socket
+import threading
+import time
+
+import pandas as pd
+import requests
+from psycopg2.extras import execute_values
+
+from checkpoint import DONE, FAILED, MAX_ATTEMPTS, SKIPPED
+from club_lookup import SharedClubLookup
+from freshness import FreshnessStore
+from http_cache import CachedSession
+from rate_limit import DEFAULT_BURST, MAX_RATE, RateLimitedSession, SharedRateLimiter
+from telemetry import InstrumentedSession, metrics
+from db_writer import CAREER, DEFAULT_BATCH_SIZE, PlayerBuffer
+from scraper_players import DEFAULT_RATE, fetch_player, get_connection, no_delay, parse_scopes, season_label
+
+# ===============================================================
+#  File de travail Postgres pour scraper à plusieurs workers
+# ===============================================================
+# Une ligne par (job, URL) dans scrape_queue. Chaque worker, sur n'importe
+# quel cœur ou machine, réserve un lot d'URLs avec FOR UPDATE SKIP LOCKED
+# et un bail (leased_until) prolongé par un battement de cœur. Un bail
+# expiré (worker mort) est repris par un autre. Le statut final est écrit
+# dans la même transaction que le lot de joueurs (voir db_writer), et
+# seulement si le worker détient encore le bail : pas de double écriture.
+# Le débit par hôte est partagé par tous les workers (table host_budget),
+# comme la table club → compétition (club_lookup).
+#   python scripts/work_queue.py enqueue
+#   python scripts/work_queue.py work --claim 10      # autant de fois que de workers voulus
+#   python scripts/work_queue.py status
+
+PENDING = "pending"
+LEASED = "leased"
+
+PLAYERS_CSV = "data/raw/senegal_players_list.csv"
+DEFAULT_CLAIM = 10      # URLs réservées à la fois
+DEFAULT_LEASE = 300     # secondes ; le battement de cœur le prolonge toutes les lease/3 s
+IDLE_POLL = 5           # secondes entre deux essais quand tout est réservé ailleurs
+
+# Verrou consultatif : les workers qui démarrent ensemble ne créent pas la table en même temps
+SCHEMA_SQL = """
+    SELECT pg_advisory_xact_lock(hashtext('scrape_queue'));
+    CREATE TABLE IF NOT EXISTS scrape_queue (
+        job TEXT NOT NULL,
+        url TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INT NOT NULL DEFAULT 0,
+        worker TEXT,
+        leased_until TIMESTAMPTZ,
+        reason TEXT,
+        enqueued_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (job, url)
+    );
+    CREATE INDEX IF NOT EXISTS scrape_queue_claim_idx ON scrape_queue (job, status, leased_until);
+"""
+
+ENQUEUE_SQL = "INSERT INTO scrape_queue (job, url) VALUES %s ON CONFLICT (job, url) DO NOTHING"
+
+# Réservation : tâches en attente ou baux expirés, sans attendre les lignes verrouillées par d'autres
+CLAIM_SQL = """
+    UPDATE scrape_queue q
+    SET status = 'leased',
+        worker = %(worker)s,
+        attempts = q.attempts + 1,
+        leased_until = now() + make_interval(secs => %(lease)s),
+        updated_at = now()
+    FROM (
+        SELECT job, url
+        FROM scrape_queue
+        WHERE job = %(job)s
+          AND attempts < %(max_attempts)s
+          AND (status = 'pending' OR (status = 'leased' AND leased_until < now()))
+        ORDER BY enqueued_at, url
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    ) c
+    WHERE q.job = c.job AND q.url = c.url
+    RETURNING q.url, q.attempts
+"""
+
+HEARTBEAT_SQL = """
+    UPDATE scrape_queue
+    SET leased_until = now() + make_interval(secs => %(lease)s)
+    WHERE job = %(job)s AND worker = %(worker)s AND status = 'leased'
+"""
+
+# Fin de tâche, seulement si le bail est toujours à nous ; un échec repasse
+# en attente tant qu'il reste des tentatives
+COMPLETE_SQL = """
+    UPDATE scrape_queue q
+    SET status = CASE WHEN v.status = 'failed' AND q.attempts < v.max_attempts THEN 'pending' ELSE v.status END,
+        reason = v.reason,
+        leased_until = NULL,
+        updated_at = now()
+    FROM (VALUES %s) AS v(job, worker, url, status, reason, max_attempts)
+    WHERE q.job = v.job AND q.url = v.url AND q.worker = v.worker AND q.status = 'leased'
+"""
+
+STATUS_SQL = """
+    SELECT status,
+           count(*),
+           count(*) FILTER (WHERE status = 'leased' AND leased_until < now()),
+           count(*) FILTER (WHERE attempts >= %(max_attempts)s AND status IN ('pending', 'leased')),
+           count(DISTINCT worker) FILTER (WHERE status = 'leased' AND leased_until >= now())
+    FROM scrape_queue
+    WHERE job = %(job)s
+    GROUP BY status
+"""
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Tâches d'un job dans scrape_queue, vues par un worker. Utilisable comme
+    `checkpoints` de PlayerBuffer : record() met un statut en attente, écrit avec le lot."""
+
+    def __init__(self, conn, job, worker=None, lease=DEFAULT_LEASE, max_attempts=MAX_ATTEMPTS):
+        self.conn = conn
+        self.job = job
+        self.worker = worker or worker_name()
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.pending = {}
+        self.claimed = 0
+        self.reclaimed = 0
+        self.lost = 0
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA_SQL)
+        conn.commit()
+
+    def params(self, **extra):
+        return {"job": self.job, "worker": self.worker, "lease": self.lease,
+                "max_attempts": self.max_attempts, **extra}
+
+    def enqueue(self, urls):
+        """Ajoute des URLs (déjà présentes : ignorées), retourne le nombre de tâches créées"""
+        rows = [(self.job, url) for url in dict.fromkeys(urls)]
+        if not rows:
+            return 0
+        with self.conn.cursor() as cur:
+            # Une seule page : rowcount compte toutes les lignes insérées (sinon la dernière page seule)
+            execute_values(cur, ENQUEUE_SQL, rows, page_size=len(rows))
+            created = cur.rowcount
+        self.conn.commit()
+        return created
+
+    def requeue(self, statuses):
+        """Remet en attente les tâches de ces statuts (ex. failed, done pour tout refaire)"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE scrape_queue
+                SET status = 'pending', attempts = 0, worker = NULL, leased_until = NULL, reason = NULL, updated_at = now()
+                WHERE job = %s AND status = ANY(%s)
+            """, (self.job, list(statuses)))
+            count = cur.rowcount
+        self.conn.commit()
+        return count
+
+    def claim(self, limit=DEFAULT_CLAIM):
+        """Réserve jusqu'à `limit` URLs pour ce worker (commit immédiat : le bail est visible de tous)"""
+        with self.conn.cursor() as cur:
+            cur.execute(CLAIM_SQL, self.params(limit=limit))
+            rows = cur.fetchall()
+        self.conn.commit()
+        self.claimed += len(rows)
+        # attempts > 1 : bail expiré d'un autre worker, ou échec remis en attente
+        self.reclaimed += sum(1 for _, attempts in rows if attempts > 1)
+        return [url for url, _ in rows]
+
+    def heartbeat(self, conn):
+        """Prolonge tous les baux de ce worker (connexion dédiée, en autocommit)"""
+        with conn.cursor() as cur:
+            cur.execute(HEARTBEAT_SQL, self.params())
+
+    def start_heartbeat(self, conn):
+        """Thread de battement de cœur ; retourne une fonction d'arrêt"""
+        conn.autocommit = True
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease / 3):
+                try:
+                    self.heartbeat(conn)
+                except Exception as e:
+                    print(f"   ⚠️  Battement de cœur manqué: {type(e).__name__}")
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+
+        def stop_heartbeat():
+            stop.set()
+            thread.join()
+            conn.close()
+        return stop_heartbeat
+
+    def outstanding(self):
+        """Tâches encore à faire ou réservées (par d'autres workers, ou bail expiré)"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT count(*) FROM scrape_queue
+                WHERE job = %(job)s AND status IN ('pending', 'leased') AND attempts < %(max_attempts)s
+                   OR job = %(job)s AND status = 'leased' AND leased_until >= now()
+            """, self.params())
+            count = cur.fetchone()[0]
+        self.conn.commit()
+        return count
+
+    def record(self, url, status, reason=None):
+        """Met un statut en attente d'écriture (écrit avec le prochain lot)"""
+        self.pending[url] = (url, status, reason)
+
+    def fail_pending(self, reason):
+        """Lot non écrit en base : les URLs « done » en attente repassent en échec (réessayable)"""
+        for url, (_, status, _) in list(self.pending.items()):
+            if status == DONE:
+                self.pending[url] = (url, FAILED, reason)
+
+    def write(self, cur):
+        """Écrit les statuts en attente avec le curseur fourni (sans commit)"""
+        if not self.pending:
+            return
+        rows = [(self.job, self.worker, url, status, reason, self.max_attempts)
+                for url, status, reason in self.pending.values()]
+        self.pending = {}
+        execute_values(cur, COMPLETE_SQL, rows, page_size=len(rows))
+        if cur.rowcount < len(rows):
+            # Bail repris par un autre worker (pause trop longue) : ses écritures feront foi
+            self.lost += len(rows) - cur.rowcount
+            print(f"   ⚠️  {len(rows) - cur.rowcount} bail(s) perdu(s) : tâches reprises par un autre worker")
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.conn.cursor() as cur:
+            self.write(cur)
+        self.conn.commit()
+
+    def status(self):
+        """{statut: nombre} du job, plus baux expirés, tâches épuisées et workers actifs"""
+        with self.conn.cursor() as cur:
+            cur.execute(STATUS_SQL, self.params())
+            rows = cur.fetchall()
+        self.conn.commit()
+        counts = {status: total for status, total, _, _, _ in rows}
+        counts["expired"] = sum(expired for _, _, expired, _, _ in rows)
+        counts["exhausted"] = sum(exhausted for _, _, _, exhausted, _ in rows)
+        counts["workers"] = sum(workers for _, _, _, _, workers in rows)
+        return counts
+
+    def summary(self):
+        return (f"📬 File: {self.claimed} tâches réservées | {self.reclaimed} reprises (bail expiré ou échec) | "
+                f"{self.lost} baux perdus")
+
+
+def run_worker(job="players", worker=None, scopes=(CAREER,), batch_size=DEFAULT_BATCH_SIZE, claim=DEFAULT_CLAIM,
+               lease=DEFAULT_LEASE, rate=DEFAULT_RATE, max_rate=MAX_RATE, replay=False, refresh=False, max_ages=None,
+               max_attempts=MAX_ATTEMPTS):
+    """Boucle d'un worker : réserve, scrape, écrit, jusqu'à ce que la file du job soit vide"""
+    metrics.reset()
+    conn = get_connection()
+    queue = WorkQueue(conn, job, worker, lease, max_attempts)
+    freshness = FreshnessStore(conn, max_ages)
+    buffer = PlayerBuffer(conn, batch_size, checkpoints=queue, freshness=freshness)
+
+    # Budget de politesse partagé en base, sur sa propre connexion (autocommit)
+    budget_conn = get_connection()
+    budget_conn.autocommit = True
+    limiter = SharedRateLimiter(budget_conn, rate, DEFAULT_BURST, max_rate=max_rate)
+    network = RateLimitedSession(InstrumentedSession(requests.Session(), metrics), limiter)
+    session = CachedSession(network, offline=replay)
+    retry = 1 if replay else 3
+    # Table des clubs partagée par tous les workers, sur sa propre connexion (autocommit)
+    clubs_conn = get_connection()
+    clubs_conn.autocommit = True
+    clubs = SharedClubLookup(clubs_conn)
+    stop_heartbeat = queue.start_heartbeat(get_connection())
+
+    print(f"\n{'='*70}")
+    print(f"🚀 WORKER {queue.worker} - job {job}")
+    print(f"{'='*70}")
+    print(f"📅 Portées: {', '.join(season_label(scope) for scope in scopes)}")
+    print(f"📬 {claim} URLs par réservation, bail de {lease}s")
+    print(f"🚦 Débit partagé par hôte: {rate} req/s au départ (si nouvel hôte), jusqu'à {max_rate} req/s\n")
+
+    processed = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            urls = queue.claim(claim)
+            if not urls:
+                # Statuts en attente écrits avant d'attendre : les autres workers voient la file à jour
+                buffer.flush()
+                if not queue.outstanding():
+                    break
+                time.sleep(IDLE_POLL)
+                continue
+
+            freshness.load(urls)
+            for url in urls:
+                processed += 1
+                print(f"\n[{processed}] 🔗 {url}")
+                try:
+                    status, info, stats = fetch_player(url, session, freshness, scopes, pause=no_delay, retry=retry,
+                                                       clubs=clubs, force=not refresh)
+                    if status == "error":
+                        queue.record(url, FAILED, "infos manquantes")
+                    elif status == "success":
+                        queue.record(url, DONE)
+                        buffer.add(info, stats, url)
+                    elif status == "unchanged":
+                        queue.record(url, DONE)
+                    else:
+                        queue.record(url, SKIPPED)
+                except Exception as e:
+                    print(f"   ❌ Erreur: {type(e).__name__}")
+                    queue.record(url, FAILED, type(e).__name__)
+        buffer.flush()
+    finally:
+        stop_heartbeat()
+        session.close()
+        clubs.save()
+    elapsed = time.perf_counter() - start
+    metrics.add_sleep("rate_limit", network.waited)
+
+    print(f"\n{'='*70}")
+    print(f"✅ WORKER TERMINÉ: {processed} URLs en {elapsed:.1f}s")
+    print(f"{'='*70}")
+    print(f"   {queue.summary()}")
+    print(f"   {limiter.summary()}")
+    print(f"   {session.summary()}")
+    print(f"   {buffer.summary()}")
+    print(f"   {metrics.report()}")
+    extra = {"worker": queue.worker, "processed": processed, "claimed": queue.claimed,
+             "reclaimed": queue.reclaimed, "lost_leases": queue.lost, "rates": limiter.rates()}
+    print(f"   📈 Télémétrie: {metrics.write(f'{job}_worker_{os.getpid()}', extra=extra)}")
+    print(f"{'='*70}\n")
+    conn.close()
+    budget_conn.close()
+    clubs_conn.close()
+
+
+def print_status(queue):
+    counts = queue.status()
+    print(f"📬 File « {queue.job} »")
+    for status in (PENDING, LEASED, DONE, SKIPPED, FAILED):
+        print(f"   {status:<20} {counts.get(status, 0)}")
+    print(f"   {'baux expirés':<20} {counts['expired']}")
+    print(f"   {'tentatives épuisées':<20} {counts['exhausted']}")
+    print(f"   {'workers actifs':<20} {counts['workers']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="File de travail Postgres pour le scraping multi-workers")
+    parser.add_argument("command", choices=["enqueue", "work", "status", "requeue"])
+    parser.add_argument("--job", default="players", help="nom du job (une file par job)")
+    parser.add_argument("--csv", default=PLAYERS_CSV, help="enqueue : CSV des URLs (colonne url)")
+    parser.add_argument("--statuses", default=FAILED, help="requeue : statuts à remettre en attente, ex. failed,done")
+    parser.add_argument("--worker-id", help="work : nom du worker (défaut : machine:pid)")
+    parser.add_argument("--claim", type=int, default=DEFAULT_CLAIM, help="work : URLs réservées à la fois")
+    parser.add_argument("--lease", type=int, default=DEFAULT_LEASE, help="work : durée du bail (s)")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="tentatives max par URL")
+    parser.add_argument("--scopes", default=CAREER, help="work : portées des stats, ex. career,2015-2025")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="work : débit de départ d'un nouvel hôte (req/s)")
+    parser.add_argument("--max-rate", type=float, default=MAX_RATE, help="work : débit maximal par hôte (req/s)")
+    parser.add_argument("--replay", action="store_true", help="work : re-parser le cache HTTP sans accès réseau")
+    parser.add_argument("--refresh", action="store_true", help="work : ne re-télécharger que les parties périmées")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="work : joueurs par écriture groupée")
+    args = parser.parse_args()
+
+    if args.command == "work":
+        run_worker(args.job, args.worker_id, parse_scopes(args.scopes), args.batch_size, args.claim, args.lease,
+                   args.rate, args.max_rate, args.replay, args.refresh, max_attempts=args.max_attempts)
+    else:
+        conn = get_connection()
+        queue = WorkQueue(conn, args.job, max_attempts=args.max_attempts)
+        if args.command == "enqueue":
+            if not os.path.exists(args.csv):
+                print(f"❌ Fichier {args.csv} introuvable")
+            else:
+                urls = pd.read_csv(args.csv)["url"].tolist()
+                print(f"📥 {queue.enqueue(urls)} tâches ajoutées ({len(urls)} URLs dans {args.csv})")
+        elif args.command == "requeue":
+            print(f"🔁 {queue.requeue(args.statuses.split(','))} tâches remises en attente")
+        print_status(queue)
+        conn.close()